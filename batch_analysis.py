@@ -0,0 +1,215 @@
+import argparse
+import csv
+import json
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import chess
+import chess.pgn
+
+from chess_bot_controller import ChessBotController
+from constants import OPENING_BOOK_PATH, SYZYGY_PATH
+from telemetry import searched_nodes
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ("id", "fen", "bestmove", "score", "depth", "nodes", "time_ms", "source")
+IN_FLIGHT_PER_WORKER = 2  # Submitted positions per worker, so the input is read only as fast as it is analysed
+
+# ChessBotController of the current worker process (created once by _init_worker)
+_worker_controller = None
+
+
+def read_epd(path):
+    """
+    Positions of an EPD file, one per line. Malformed records are reported and skipped.
+
+    :return: Generator of (position id, FEN); the id is the "id" operation or the file name and line number.
+    """
+    with open(path, encoding="utf-8") as epd:
+        for line_number, line in enumerate(epd, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            board = chess.Board()
+            try:
+                operations = board.set_epd(line)
+            except ValueError as error:
+                logger.warning("%s:%d: invalid EPD record skipped: %s", path, line_number, error)
+                continue
+            yield str(operations.get("id", f"{os.path.basename(path)}:{line_number}")), board.fen()
+
+
+def read_pgn(path, min_ply=0):
+    """
+    Positions of the main lines of the games of a PGN file (the games are read one at a time).
+
+    :param min_ply: Number of opening plies of every game that are skipped.
+    :return: Generator of (position id "file:game:ply", FEN).
+    """
+    name = os.path.basename(path)
+    with open(path, encoding="utf-8", errors="replace") as pgn:
+        game_number = 0
+        while True:
+            game = chess.pgn.read_game(pgn)
+            if game is None:
+                break
+            game_number += 1
+            for error in game.errors:  # The game is read up to its first error
+                logger.warning("%s: game %d: %s", path, game_number, error)
+            board = game.board()
+            for ply, move in enumerate(game.mainline_moves()):
+                if ply >= min_ply:
+                    yield f"{name}:{game_number}:{ply}", board.fen()
+                board.push(move)
+
+
+def read_positions(paths, min_ply=0):
+    """
+    Positions of all input files (PGN by the .pgn extension, EPD otherwise).
+    """
+    for path in paths:
+        if path.lower().endswith(".pgn"):
+            yield from read_pgn(path, min_ply)
+        else:
+            yield from read_epd(path)
+
+
+def _init_worker(engine, depth, tt_size_mb, use_book):
+    """
+    Creates the controller of a worker process.
+    """
+    global _worker_controller
+    _worker_controller = ChessBotController(dfs_depth=depth, bfs_depth=depth, bds_depth=depth, tt_size_mb=tt_size_mb,
+                                            engine=engine, book_path=OPENING_BOOK_PATH if use_book else None,
+                                            syzygy_dir=SYZYGY_PATH)
+
+
+def _analyse(position_id, fen, time_limit_ms):
+    """
+    Analyses one position in a worker process.
+
+    :return: Dictionary with the FIELDS of the result.
+    """
+    controller = _worker_controller
+    board = chess.Board(fen)
+    stats = dict(controller.stats)
+    iterations = []
+
+    def on_iteration(depth, move, score):
+        iterations.append((depth, score))
+
+    start = time.perf_counter()
+    move = controller.get_best_move(board, time_limit_ms, on_iteration=on_iteration)
+    elapsed = time.perf_counter() - start
+
+    if controller.stats["book_hits"] > stats["book_hits"]:
+        source = "book"
+    elif controller.stats["tablebase_hits"] > stats["tablebase_hits"]:
+        source = "tablebase"
+    else:
+        source = "search"
+    depth, score = iterations[-1] if iterations else (0, None)
+    return {"id": position_id, "fen": fen, "bestmove": move.uci() if move is not None else None,
+            "score": round(score, 2) if score is not None else None,
+            "depth": depth, "nodes": searched_nodes(controller.choose_bot(board)) if source == "search" else 0,
+            "time_ms": round(elapsed * 1000, 1), "source": source}
+
+
+class ResultWriter:
+    def __init__(self, path, resume=False):
+        """
+        Streams results to a JSONL or CSV file (by extension). Every result is flushed at once, so the file is
+        also the checkpoint of an interrupted run.
+
+        :param path: Output file.
+        :param resume: Append to an existing file and report the ids it already contains.
+        """
+        self.csv = path.lower().endswith(".csv")
+        self.done = set()  # Ids of the positions analysed in a previous run
+        if resume and os.path.exists(path):
+            with open(path, encoding="utf-8", newline="") as previous:
+                if self.csv:
+                    self.done = {row["id"] for row in csv.DictReader(previous)}
+                else:
+                    self.done = {json.loads(line)["id"] for line in previous if line.strip()}
+        append = resume and os.path.exists(path) and os.path.getsize(path) > 0
+        self.file = open(path, "a" if append else "w", encoding="utf-8", newline="")
+        self.writer = csv.DictWriter(self.file, FIELDS) if self.csv else None
+        if self.csv and not append:
+            self.writer.writeheader()
+
+    def write(self, result):
+        if self.csv:
+            self.writer.writerow(result)
+        else:
+            self.file.write(json.dumps(result) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def analyse_positions(positions, writer, workers, time_limit_ms, engine="pvs", depth=4, tt_size_mb=16,
+                      use_book=False):
+    """
+    Analyses positions with a pool of worker processes, keeping a bounded number of them in flight.
+
+    :param positions: Iterable of (position id, FEN).
+    :param writer: ResultWriter; positions in writer.done are skipped.
+    :param workers: Number of worker processes.
+    :param time_limit_ms: Time budget per position (None searches to the given depth).
+    :return: Number of positions analysed.
+    """
+    analysed = 0
+    with ProcessPoolExecutor(workers, initializer=_init_worker,
+                             initargs=(engine, depth, tt_size_mb, use_book)) as executor:
+        pending = set()
+        for position_id, fen in positions:
+            if position_id in writer.done:
+                continue
+            if len(pending) >= workers * IN_FLIGHT_PER_WORKER:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    writer.write(future.result())
+                    analysed += 1
+            pending.add(executor.submit(_analyse, position_id, fen, time_limit_ms))
+        for future in wait(pending).done:
+            writer.write(future.result())
+            analysed += 1
+    return analysed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyses the positions of EPD/PGN files with the chess bots")
+    parser.add_argument("inputs", nargs="+", help="EPD or PGN files")
+    parser.add_argument("-o", "--output", default="analysis.jsonl", help="output .jsonl or .csv file")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="number of worker processes")
+    parser.add_argument("--time", type=int, default=None, help="time budget per position in milliseconds")
+    parser.add_argument("--depth", type=int, default=4, help="search depth (without --time)")
+    parser.add_argument("--engine", default="pvs", choices=("auto", "dfs", "pvs", "bfs", "bds"))
+    parser.add_argument("--hash", type=int, default=16, help="transposition table size of every worker in MB")
+    parser.add_argument("--book", action="store_true", help="answer from the opening book when possible")
+    parser.add_argument("--min-ply", type=int, default=0, help="opening plies of every PGN game that are skipped")
+    parser.add_argument("--resume", action="store_true", help="skip the positions already in the output file")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+
+    writer = ResultWriter(args.output, args.resume)
+    start = time.perf_counter()
+    try:
+        analysed = analyse_positions(read_positions(args.inputs, args.min_ply), writer, args.workers, args.time,
+                                     args.engine, args.depth, args.hash, args.book)
+    finally:
+        writer.close()
+    elapsed = time.perf_counter() - start
+
+    rate = analysed / elapsed if elapsed else 0.0
+    print(f"{analysed} positions analysed in {elapsed:.1f} s ({len(writer.done)} skipped): "
+          f"{rate:.2f} positions/s, {rate / args.workers:.2f} positions/s per core")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+import chess
+import numpy as np
+
+from position_evaluator import CHECKMATE_SCORE, PositionEvaluator
+
+# Column of every (color, piece type) bitboard in an encoded position; column 12 holds the side to move
+COLUMNS = {(color, piece_type): (0 if color == chess.WHITE else 6) + piece_type - 1
+           for color in chess.COLORS for piece_type in chess.PIECE_TYPES}
+TURN_COLUMN = 12
+
+_U = np.uint64
+NOT_FILE_A = _U(chess.BB_ALL & ~chess.BB_FILE_A)
+NOT_FILE_H = _U(chess.BB_ALL & ~chess.BB_FILE_H)
+NOT_FILE_AB = _U(chess.BB_ALL & ~chess.BB_FILE_A & ~chess.BB_FILE_B)
+NOT_FILE_GH = _U(chess.BB_ALL & ~chess.BB_FILE_G & ~chess.BB_FILE_H)
+
+# Shifts of a bitboard by one step in a direction: (left shift, right shift, mask of the valid targets)
+ORTHOGONAL = ((8, 0, None), (0, 8, None), (1, 0, NOT_FILE_A), (0, 1, NOT_FILE_H))
+DIAGONAL = ((9, 0, NOT_FILE_A), (7, 0, NOT_FILE_H), (0, 7, NOT_FILE_A), (0, 9, NOT_FILE_H))
+KNIGHT_JUMPS = ((17, 0, NOT_FILE_A), (15, 0, NOT_FILE_H), (10, 0, NOT_FILE_AB), (6, 0, NOT_FILE_GH),
+                (0, 6, NOT_FILE_AB), (0, 10, NOT_FILE_GH), (0, 15, NOT_FILE_A), (0, 17, NOT_FILE_H))
+
+
+def encode(board):
+    """
+    Encodes a chess.Board as a row of 13 integers: the 12 piece bitboards and the side to move.
+    """
+    white, black = board.occupied_co[chess.WHITE], board.occupied_co[chess.BLACK]
+    pawns, knights, bishops, rooks, queens, kings = (board.pawns, board.knights, board.bishops, board.rooks,
+                                                     board.queens, board.kings)
+    return (pawns & white, knights & white, bishops & white, rooks & white, queens & white, kings & white,
+            pawns & black, knights & black, bishops & black, rooks & black, queens & black, kings & black,
+            int(board.turn))
+
+
+def decode(row):
+    """
+    Builds a chess.Board from an encoded row (without castling rights and en passant square).
+    """
+    board = chess.Board.empty()
+    row = [int(value) for value in row]
+    for (color, piece_type), column in COLUMNS.items():
+        for square in chess.scan_forward(row[column]):
+            board.set_piece_at(square, chess.Piece(piece_type, color))
+    board.turn = bool(row[TURN_COLUMN])
+    return board
+
+
+def _shift(bitboards, left, right, mask):
+    shifted = bitboards << _U(left) if left else bitboards >> _U(right)
+    return shifted & mask if mask is not None else shifted
+
+
+def _popcount(bitboards):
+    return np.bitwise_count(bitboards).astype(np.int64)
+
+
+class BatchEvaluator:
+    def __init__(self, evaluator=None):
+        """
+        Vectorized version of PositionEvaluator.evaluate for many positions at once. The positions are encoded
+        into an (N, 13) uint64 array and every term is computed with NumPy operations over the whole batch:
+        attacks of all pieces are generated direction by direction, counting (piece, target) pairs with
+        popcounts. Only positions in check are looked at one by one, to decide whether they are checkmates
+        (and all positions for the static exchanges of the hanging piece term, if its weight is not zero).
+        The scores are the same as PositionEvaluator.evaluate gives (up to floating point rounding).
+
+        :param evaluator: PositionEvaluator whose piece values and term weights are used.
+        """
+        self.evaluator = evaluator or PositionEvaluator()
+
+    def evaluate_batch(self, positions, is_checkmate=None):
+        """
+        Evaluates positions from the point of view of their side to move.
+
+        :param positions: List of chess.Board, or an array of rows made by encode().
+        :param is_checkmate: Function (index) -> bool called for the positions in check. By default the board is
+            taken from positions or rebuilt from its row.
+        :return: float64 array of the scores.
+        """
+        boards = positions if isinstance(positions, list) and positions and \
+            isinstance(positions[0], chess.BaseBoard) else None
+        if boards is not None:
+            positions = [encode(board) for board in boards]
+        rows = np.asarray(positions, dtype=np.uint64).reshape(-1, 13)
+        count = len(rows)
+        self.evaluator.evaluations += count  # Batched positions count as evaluations of the wrapped evaluator
+        if not count:
+            return np.zeros(0)
+
+        values = self.evaluator.piece_values
+        white = np.bitwise_or.reduce(rows[:, 0:6], axis=1)
+        black = np.bitwise_or.reduce(rows[:, 6:12], axis=1)
+        occupied = white | black
+
+        # Both colors are processed together: rows of white's pieces followed by rows of black's pieces
+        own = np.concatenate((white, black))
+        own_pieces = np.concatenate((rows[:, 0:6], rows[:, 6:12]))
+        their_pieces = np.concatenate((rows[:, 6:12], rows[:, 0:6]))
+        empty = ~np.concatenate((occupied, occupied))
+        victims = np.stack([their_pieces[:, piece_type - 1] for piece_type in (chess.PAWN, chess.KNIGHT, chess.BISHOP,
+                                                                              chess.ROOK, chess.QUEEN)])
+        victim_values = np.array([values[piece_type] for piece_type in (chess.PAWN, chess.KNIGHT, chess.BISHOP,
+                                                                        chess.ROOK, chess.QUEEN)])
+
+        # Target sets of all pieces, one per direction and distance: each piece has at most one target in a set,
+        # so popcounts of the sets count (piece, target) pairs
+        mobile_targets = []  # Knights and sliders (counted in the mobility)
+        other_targets = []  # Kings and pawns
+
+        knights = own_pieces[:, chess.KNIGHT - 1]
+        if knights.any():
+            for left, right, mask in KNIGHT_JUMPS:
+                mobile_targets.append(_shift(knights, left, right, mask))
+
+        # Sliders: one step at a time, continuing only through empty squares
+        queens = own_pieces[:, chess.QUEEN - 1]
+        for sliders, directions in ((own_pieces[:, chess.ROOK - 1] | queens, ORTHOGONAL),
+                                    (own_pieces[:, chess.BISHOP - 1] | queens, DIAGONAL)):
+            if not sliders.any():
+                continue
+            for left, right, mask in directions:
+                ray = _shift(sliders, left, right, mask)
+                while ray.any():
+                    mobile_targets.append(ray)
+                    ray = _shift(ray & empty, left, right, mask)
+
+        kings = own_pieces[:, chess.KING - 1]
+        for left, right, mask in ORTHOGONAL + DIAGONAL:
+            other_targets.append(_shift(kings, left, right, mask))
+        pawns = own_pieces[:, chess.PAWN - 1]
+        white_pawns, black_pawns = pawns[:count], pawns[count:]
+        other_targets.append(np.concatenate(((white_pawns << _U(7)) & NOT_FILE_H,
+                                             (black_pawns >> _U(9)) & NOT_FILE_H)))
+        other_targets.append(np.concatenate(((white_pawns << _U(9)) & NOT_FILE_A,
+                                             (black_pawns >> _U(7)) & NOT_FILE_A)))
+
+        targets = np.stack(mobile_targets + other_targets)  # (sets, 2N)
+        mobility = _popcount(targets[:len(mobile_targets)] & ~own).sum(axis=0)
+        # (types, sets, 2N) popcounts weighted by the value of the victim type
+        threats = np.tensordot(victim_values, _popcount(targets[None, :, :] & victims[:, None, :]).sum(axis=1),
+                               axes=1)
+        attacked = np.bitwise_or.reduce(targets, axis=0)  # Squares attacked by the color of the row
+
+        # Material and center from black's point of view
+        counts = _popcount(rows[:, 0:12])
+        material = sum((counts[:, 6 + piece_type - 1] - counts[:, piece_type - 1]) * values[piece_type]
+                       for piece_type in (chess.PAWN, chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN))
+        center_mask = _U(self.evaluator.center_mask)
+        wider_mask = _U(self.evaluator.wider_center_mask)
+        center = (_popcount(black & center_mask) - _popcount(white & center_mask)) * 0.5
+        center += (_popcount(black & wider_mask) - _popcount(white & wider_mask)) * 0.25
+
+        # Pawn structure: doubled and isolated files of the pawns of both colors
+        all_pawns = rows[:, 0] | rows[:, 6]
+        above = all_pawns << _U(8)
+        above |= above << _U(8)
+        above |= above << _U(16)
+        above |= above << _U(32)
+        files = self.file_occupancy(all_pawns)
+        doubled = self.file_occupancy(all_pawns & above)
+        isolated = files & ~doubled & ~((files << _U(1)) | (files >> _U(1))) & _U(0xFF)
+        pawn_structure = -0.5 * (_popcount(doubled) + _popcount(isolated))
+
+        # Checkmates: only positions whose side to move is attacked on its king square are examined
+        turns = rows[:, TURN_COLUMN].astype(bool)
+        king_of_mover = np.where(turns, rows[:, 5], rows[:, 11])
+        attacks_on_mover = np.where(turns, attacked[count:], attacked[:count])
+        king_safety = np.zeros(count)
+        for index in np.flatnonzero(king_of_mover & attacks_on_mover):
+            if is_checkmate is not None:
+                mated = is_checkmate(index)
+            elif boards is not None:
+                mated = boards[index].is_checkmate()
+            else:
+                mated = decode(rows[index]).is_checkmate()
+            if mated:
+                king_safety[index] = CHECKMATE_SCORE if turns[index] else -CHECKMATE_SCORE
+
+        # Hanging pieces: the static exchanges are evaluated position by position, only if the term is enabled
+        hanging = np.zeros(count)
+        if self.evaluator.weights["hanging"]:
+            for index in range(count):
+                board = boards[index] if boards is not None else decode(rows[index])
+                hanging[index] = self.evaluator.hanging_pieces(board)
+
+        activity = (mobility[count:] - mobility[:count]) * 0.1
+        threat_score = threats[count:] - threats[:count]
+        weights = self.evaluator.weights
+        score = (material * weights["material"] + center * weights["center"] + pawn_structure * weights["pawns"]
+                 + king_safety * weights["king_safety"] + activity * weights["activity"]
+                 + threat_score * weights["threats"] + hanging * weights["hanging"])
+        return np.where(turns, -score, score)
+
+    def evaluate_moves(self, board, moves):
+        """
+        Evaluates the positions after each of the moves in one batch.
+
+        :param board: Position before the moves; it is restored before returning.
+        :param moves: List of legal moves of the position.
+        :return: float64 array of the scores for the side making the moves.
+        """
+        rows = []
+        for move in moves:
+            board.push(move)
+            rows.append(encode(board))
+            board.pop()
+
+        def is_checkmate(index):
+            board.push(moves[index])
+            mated = board.is_checkmate()
+            board.pop()
+            return mated
+
+        # The evaluation is from the point of view of the side to move, i.e. the opponent of the mover
+        return -self.evaluate_batch(rows, is_checkmate)
+
+    @staticmethod
+    def file_occupancy(bitboards):
+        """
+        Vectorized position_evaluator.file_occupancy.
+        """
+        bitboards = bitboards | bitboards >> _U(32)
+        bitboards |= bitboards >> _U(16)
+        bitboards |= bitboards >> _U(8)
+        return bitboards & _U(0xFF)
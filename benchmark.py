@@ -0,0 +1,384 @@
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import chess
+
+from batch_evaluator import BatchEvaluator, encode
+from board import ChessBoard
+from chess_bot_bds import ChessBotBDS
+from chess_bot_bfs import ChessBotBFS
+from chess_bot_controller import ChessBotController
+from chess_bot_dfs import ChessBotDFS
+from chess_bot_pvs import ChessBotPVS
+from parallel_search import ParallelChessBotDFS
+from position_evaluator import PositionEvaluator
+from see import time_see
+from telemetry import searched_nodes
+
+# Fixed position suite: opening, middlegame and endgame positions
+POSITIONS = [
+    chess.STARTING_FEN,
+    "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3",
+    "rnbqkb1r/pp2pppp/3p1n2/8/3NP3/8/PPP2PPP/RNBQKB1R w KQkq - 1 5",
+    "r1bq1rk1/ppp2ppp/2np1n2/2b1p3/2B1P3/2NP1N2/PPP2PPP/R1BQ1RK1 w - - 0 7",
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+    "2rq1rk1/pp1bppbp/2np1np1/8/3NP3/1BN1BP2/PPPQ2PP/2KR3R b - - 5 11",
+    "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+    "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+    "8/8/4k3/8/8/3QK3/8/8 w - - 0 1",
+    "6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1",
+]
+# Stage of the game of every position of the suite
+STAGES = ["opening"] * 3 + ["middlegame"] * 4 + ["endgame"] * 3
+
+SEARCH_ENGINES = ("dfs", "bfs", "bds", "pvs", "controller")
+
+# Positions of the perft benchmark with their known node counts {depth: nodes}
+PERFT_POSITIONS = {
+    chess.STARTING_FEN: {1: 20, 2: 400, 3: 8902, 4: 197281},
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1": {1: 48, 2: 2039, 3: 97862},
+    "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1": {1: 14, 2: 191, 3: 2812, 4: 43238},
+}
+
+# Metrics compared with the baseline and whether a larger value is worse
+REGRESSION_METRICS = {"nodes": True, "time_s": True, "nps": False, "evals_per_s": False, "peak_memory_kb": True}
+
+BATCH_SIZES = (1, 4, 16, 64, 256, 1024, 4096)
+
+
+def time_calls(function, boards, repeat):
+    """
+    Calls function on every board repeat times.
+
+    :return: Average time of one call in microseconds.
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for board in boards:
+            function(board)
+    return (time.perf_counter() - start) / (repeat * len(boards)) * 1e6
+
+
+def benchmark_evaluator(repeat=200):
+    """
+    Compares the per-square and the bitboard backends of PositionEvaluator on the position suite.
+
+    :return: Dictionary {term: (per-square µs, bitboard µs)}.
+    """
+    boards = [chess.Board(fen) for fen in POSITIONS]
+    scan, bitboards = PositionEvaluator(use_bitboards=False), PositionEvaluator(use_bitboards=True)
+
+    results = {}
+    for term in ("material_balance", "center_control", "pawn_structure", "threats", "evaluate"):
+        results[term] = (time_calls(getattr(scan, term), boards, repeat),
+                         time_calls(getattr(bitboards, term), boards, repeat))
+    return results
+
+
+def benchmark_batch(batch_sizes=BATCH_SIZES, positions_per_size=8192):
+    """
+    Compares BatchEvaluator.evaluate_batch at different batch sizes with the scalar evaluator.
+    The batches are built from the children of the position suite.
+
+    :return: Dictionary {batch size: evaluations per second}, the scalar evaluator under the key 0.
+    """
+    rows = []
+    for fen in POSITIONS:
+        board = chess.Board(fen)
+        for move in board.legal_moves:
+            board.push(move)
+            rows.append(encode(board))
+            board.pop()
+    evaluator = PositionEvaluator()
+    batch_evaluator = BatchEvaluator(evaluator)
+
+    boards = [chess.Board(fen) for fen in POSITIONS]
+    results = {0: 1e6 / time_calls(evaluator.evaluate, boards, 200)}
+    for size in batch_sizes:
+        batch = (rows * (size // len(rows) + 1))[:size]
+        calls = max(1, positions_per_size // size)
+        start = time.perf_counter()
+        for _ in range(calls):
+            batch_evaluator.evaluate_batch(batch)
+        results[size] = calls * size / (time.perf_counter() - start)
+    return results
+
+
+def benchmark_see(repeat=200):
+    """
+    Per-call time of the static exchange evaluation on the captures of the position suite, and of the
+    hanging piece term that runs it on every attacked piece.
+
+    :return: (number of captures, see µs per call, hanging_pieces µs per call)
+    """
+    captures, see_time = time_see(repeat, POSITIONS)
+    boards = [chess.Board(fen) for fen in POSITIONS]
+    hanging_time = time_calls(PositionEvaluator().hanging_pieces, boards, repeat)
+    return captures, see_time, hanging_time
+
+
+def benchmark_parallel(worker_counts=(1, 2, 4, 8, 16), depth=4, positions=POSITIONS[1:7]):
+    """
+    Measures the scaling of the root-split parallel search.
+
+    :return: Dictionary {workers: (total nodes, nodes per second, average time to depth in seconds)}.
+    """
+    results = {}
+    for workers in worker_counts:
+        if workers == 1:
+            bot = ChessBotDFS(depth, PositionEvaluator())
+        else:
+            bot = ParallelChessBotDFS(depth, PositionEvaluator(), workers)
+            bot.get_best_move(chess.Board())  # Warm-up: starts the worker processes
+
+        nodes, elapsed = 0, 0.0
+        for fen in positions:
+            board = chess.Board(fen)
+            if workers == 1:
+                bot.transposition_table.clear()
+            start = time.perf_counter()
+            bot.get_best_move(board)
+            elapsed += time.perf_counter() - start
+            nodes += bot.nodes_explored
+        if workers > 1:
+            bot.close()
+        results[workers] = (nodes, nodes / elapsed, elapsed / len(positions))
+    return results
+
+
+def benchmark_pvs(depth=4, positions=POSITIONS[1:]):
+    """
+    Compares ChessBotDFS and ChessBotPVS searching the position suite to the same depth.
+
+    :return: Dictionary {engine name: (total nodes, total quiescence nodes, average time to depth in seconds)}.
+    """
+    results = {}
+    for name, engine in (("DFS", ChessBotDFS), ("PVS", ChessBotPVS)):
+        nodes, qnodes, elapsed = 0, 0, 0.0
+        for fen in positions:
+            bot = engine(depth, PositionEvaluator())
+            start = time.perf_counter()
+            bot.get_best_move(chess.Board(fen))
+            elapsed += time.perf_counter() - start
+            nodes += bot.nodes_explored
+            qnodes += bot.qnodes_explored
+        results[name] = (nodes, qnodes, elapsed / len(positions))
+    return results
+
+
+def create_engine(name, depth, evaluator):
+    """
+    Search engine of the benchmark with a fixed depth (the controller without its opening book).
+    """
+    if name == "dfs":
+        return ChessBotDFS(depth, evaluator)
+    if name == "pvs":
+        return ChessBotPVS(depth, evaluator)
+    if name == "bfs":
+        return ChessBotBFS(depth, evaluator)
+    if name == "bds":
+        return ChessBotBDS(evaluator, depth)
+    return ChessBotController(depth, depth, depth, evaluator=evaluator)
+
+
+def run_search(name, depth, fen):
+    """
+    One search of a fresh engine.
+
+    :return: (engine that searched, evaluator, seconds)
+    """
+    evaluator = PositionEvaluator()
+    engine = create_engine(name, depth, evaluator)
+    board = chess.Board(fen)
+    start = time.perf_counter()
+    engine.get_best_move(board)
+    elapsed = time.perf_counter() - start
+    if name == "controller":
+        engine.close()
+        engine = engine.choose_bot(board) if engine.stats["searches"] else None
+    return engine, evaluator, elapsed
+
+
+def benchmark_search(depth=3, engines=SEARCH_ENGINES, positions=POSITIONS):
+    """
+    Searches every position with every engine to a fixed depth. Peak memory is measured in a second run
+    under tracemalloc, so it does not distort the timing.
+
+    :return: Dictionary {engine: {"positions": [metrics of every position], "total": summed metrics}}.
+    """
+    results = {}
+    for name in engines:
+        rows = []
+        for fen, stage in zip(positions, STAGES):
+            engine, evaluator, elapsed = run_search(name, depth, fen)
+            nodes = searched_nodes(engine) if engine is not None else 0
+            table = getattr(engine, "transposition_table", None)
+
+            tracemalloc.start()
+            run_search(name, depth, fen)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            rows.append({"fen": fen, "stage": stage, "nodes": nodes, "time_s": round(elapsed, 4),
+                         "nps": round(nodes / elapsed), "evaluations": evaluator.evaluations,
+                         "evals_per_s": round(evaluator.evaluations / elapsed),
+                         "tt_hit_rate": round(table.hit_rate(), 4) if table is not None else None,
+                         "pawn_hit_rate": round(evaluator.pawn_cache.hit_rate(), 4),
+                         "peak_memory_kb": round(peak / 1024)})
+
+        nodes = sum(row["nodes"] for row in rows)
+        elapsed = sum(row["time_s"] for row in rows)
+        evaluations = sum(row["evaluations"] for row in rows)
+        results[name] = {"positions": rows,
+                         "total": {"nodes": nodes, "time_s": round(elapsed, 4), "nps": round(nodes / elapsed),
+                                   "evaluations": evaluations, "evals_per_s": round(evaluations / elapsed),
+                                   "peak_memory_kb": max(row["peak_memory_kb"] for row in rows)}}
+    return results
+
+
+def benchmark_perft(max_depth=3):
+    """
+    Move generation speed of the ChessBoard wrapper, checked against the known perft node counts.
+
+    :return: List of {"fen", "depth", "nodes", "expected", "time_s", "nps"}.
+    """
+    results = []
+    wrapper = ChessBoard()
+    for fen, counts in PERFT_POSITIONS.items():
+        depth = min(max_depth, max(counts))
+        wrapper.board = chess.Board(fen)
+        start = time.perf_counter()
+        nodes = wrapper.perft(depth)
+        elapsed = time.perf_counter() - start
+        results.append({"fen": fen, "depth": depth, "nodes": nodes, "expected": counts[depth],
+                        "time_s": round(elapsed, 4), "nps": round(nodes / elapsed)})
+    return results
+
+
+def build_report(depth, perft_depth):
+    """
+    Full benchmark report (JSON-serializable).
+    """
+    return {"depth": depth, "python": platform.python_version(), "chess": chess.__version__,
+            "search": benchmark_search(depth), "perft": benchmark_perft(perft_depth)}
+
+
+def compare_reports(report, baseline, threshold=0.1):
+    """
+    Compares the engine totals of a report with a baseline report.
+
+    :param threshold: Relative change that counts as a regression (0.1 = 10 %).
+    :return: List of regression descriptions (empty if none).
+    """
+    regressions = []
+    if report["depth"] != baseline.get("depth"):
+        return [f"baseline depth {baseline.get('depth')} differs from depth {report['depth']}"]
+    for name, result in report["search"].items():
+        if name not in baseline["search"]:
+            continue
+        old_total = baseline["search"][name]["total"]
+        for metric, larger_is_worse in REGRESSION_METRICS.items():
+            old, new = old_total.get(metric), result["total"][metric]
+            if not old:
+                continue
+            change = (new - old) / old
+            if change > threshold if larger_is_worse else change < -threshold:
+                regressions.append(f"{name} {metric}: {old} -> {new} ({change:+.1%})")
+    for row in report["perft"]:
+        if row["nodes"] != row["expected"]:
+            regressions.append(f"perft {row['fen']} depth {row['depth']}: {row['nodes']} nodes, "
+                               f"expected {row['expected']}")
+    return regressions
+
+
+def print_search_report(report):
+    print(f"{'engine':<12}{'nodes':>10}{'time s':>9}{'NPS':>8}{'evals/s':>9}{'peak KB':>9}")
+    for name, result in report["search"].items():
+        total = result["total"]
+        print(f"{name:<12}{total['nodes']:>10}{total['time_s']:>9.2f}{total['nps']:>8}{total['evals_per_s']:>9}"
+              f"{total['peak_memory_kb']:>9}")
+    print(f"{'perft':<12}{'depth':>6}{'nodes':>10}{'NPS':>10}")
+    for row in report["perft"]:
+        status = "" if row["nodes"] == row["expected"] else f"  (expected {row['expected']})"
+        print(f"{row['fen'][:10]:<12}{row['depth']:>6}{row['nodes']:>10}{row['nps']:>10}{status}")
+
+
+def print_evaluator_benchmark():
+    print(f"{'term':<18}{'per-square µs':>15}{'bitboard µs':>14}{'speedup':>10}")
+    for term, (scan_time, bitboard_time) in benchmark_evaluator().items():
+        print(f"{term:<18}{scan_time:>15.1f}{bitboard_time:>14.1f}{scan_time / bitboard_time:>9.1f}x")
+
+
+def print_batch_benchmark():
+    results = benchmark_batch()
+    scalar = results.pop(0)
+    print(f"{'batch size':<12}{'evals/s':>10}{'vs scalar':>11}")
+    print(f"{'scalar':<12}{scalar:>10.0f}{1:>10.1f}x")
+    for size, evals_per_s in results.items():
+        print(f"{size:<12}{evals_per_s:>10.0f}{evals_per_s / scalar:>10.1f}x")
+
+
+def print_see_benchmark():
+    captures, see_time, hanging_time = benchmark_see()
+    print(f"see: {see_time:.1f} µs per call ({captures} captures), hanging_pieces: {hanging_time:.1f} µs per call")
+
+
+def print_parallel_benchmark(depth):
+    results = benchmark_parallel(depth=depth)
+    base_time = results[1][2]
+    print(f"{'workers':<9}{'nodes':>10}{'NPS':>10}{'time to depth s':>17}{'speedup':>10}")
+    for workers, (nodes, nps, time_to_depth) in results.items():
+        print(f"{workers:<9}{nodes:>10}{nps:>10.0f}{time_to_depth:>17.2f}{base_time / time_to_depth:>9.1f}x")
+
+
+def print_pvs_benchmark(depth):
+    results = benchmark_pvs(depth)
+    print(f"{'engine':<8}{'nodes':>10}{'qnodes':>10}{'time to depth s':>17}")
+    for name, (nodes, qnodes, time_to_depth) in results.items():
+        print(f"{name:<8}{nodes:>10}{qnodes:>10}{time_to_depth:>17.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chess bot benchmarks")
+    parser.add_argument("suite", nargs="?", default="evaluator", choices=("evaluator", "batch", "see", "parallel",
+                                                                              "pvs", "search"))
+    parser.add_argument("--depth", type=int, default=4, help="search depth of the search benchmarks")
+    parser.add_argument("--perft-depth", type=int, default=3, help="depth of the perft benchmark")
+    parser.add_argument("--output", help="JSON file of the search suite report")
+    parser.add_argument("--baseline", help="JSON report the search suite is compared with")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative change reported as a regression")
+    args = parser.parse_args()
+
+    if args.suite == "search":
+        report = build_report(args.depth, args.perft_depth)
+        print_search_report(report)
+        if args.output:
+            with open(args.output, "w") as output:
+                json.dump(report, output, indent=2)
+        if args.baseline:
+            with open(args.baseline) as baseline:
+                regressions = compare_reports(report, json.load(baseline), args.threshold)
+            for regression in regressions:
+                print(f"REGRESSION {regression}")
+            if regressions:
+                sys.exit(1)
+        return
+
+    if args.suite == "evaluator":
+        print_evaluator_benchmark()
+    elif args.suite == "batch":
+        print_batch_benchmark()
+    elif args.suite == "see":
+        print_see_benchmark()
+    elif args.suite == "parallel":
+        print_parallel_benchmark(args.depth)
+    elif args.suite == "pvs":
+        print_pvs_benchmark(args.depth)
+
+
+if __name__ == "__main__":
+    main()
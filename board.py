@@ -38,6 +38,21 @@ class ChessBoard:
         """Перевіряє, чи гра завершена (шах і мат, пат тощо) / Checks if the game is over (checkmate, stalemate, etc.)."""
         return self.board.is_game_over()
 
+    def perft(self, depth):
+        """Кількість позицій на глибині depth (перевірка генератора ходів) /
+        Number of positions at the given depth (move generator check)."""
+        if depth == 0:
+            return 1
+        moves = list(self.board.legal_moves)
+        if depth == 1:
+            return len(moves)
+        nodes = 0
+        for move in moves:
+            self.board.push(move)
+            nodes += self.perft(depth - 1)
+            self.board.pop()
+        return nodes
+
     def reset(self):
         """Скидає дошку до початкового стану / Resets the board to the initial state."""
         self.board = chess.Board()
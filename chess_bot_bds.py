@@ -1,104 +1,306 @@
-import heapq
-from collections import deque
+import array
 
 import chess
 
+import retrograde
+import zobrist
+from batch_evaluator import BatchEvaluator
+from fast_board import FastBoard, decode_move
+from iterative_deepening import iterative_deepening, SearchLimits, MAX_DEPTH
+from position_evaluator import CHECKMATE_SCORE
+from telemetry import SearchStats
+
+MAX_NODES = 200000  # Default node cap of one search (forward and backward nodes together, about 100 bytes each)
+
+
+class NodeStore:
+    def __init__(self):
+        """
+        Compact storage of search tree nodes: a node is only its parent index and the packed move leading to it,
+        positions are rebuilt by replaying the moves from the origin. Origins have a negative parent: -1 - origin.
+        """
+        self.parents = array.array('l')
+        self.moves = array.array('H')
+
+    def __len__(self):
+        return len(self.parents)
+
+    def add(self, parent, packed_move=0):
+        """
+        Appends a node and returns its index.
+        """
+        self.parents.append(parent)
+        self.moves.append(packed_move)
+        return len(self.parents) - 1
+
+    def path(self, index):
+        """
+        :return: (origin, packed moves from the origin to the node).
+        """
+        moves = []
+        while self.parents[index] >= 0:
+            moves.append(self.moves[index])
+            index = self.parents[index]
+        moves.reverse()
+        return -1 - self.parents[index], moves
+
 
 class ChessBotBDS:
-    def __init__(self, evaluator, max_depth):
+    def __init__(self, evaluator, max_depth, max_nodes=MAX_NODES):
         """
         Initialize the bot using bidirectional search.
         :param evaluator: PositionEvaluator object for evaluating positions.
-        :param max_depth: Maximum search depth.
+        :param max_depth: Maximum search depth of each direction.
+        :param max_nodes: Maximum number of stored nodes; beyond it the bot falls back to the evaluator.
         """
         self.evaluator = evaluator
+        self.batch_evaluator = BatchEvaluator(evaluator)  # Scores the root moves of the fallback in one call
         self.max_depth = max_depth
+        self.max_nodes = max_nodes
+        self.limits = SearchLimits()  # Limits of the running search
+        self.forward_nodes = 0  # Nodes stored by the last search in each direction
+        self.backward_nodes = 0
+        self.truncated = False  # The last search stopped at the node cap
+        self.proven = False  # The last search proved a forced mate
+        self.search_stats = None  # SearchStats of the last search
 
-    def bidirectional_search(self, board, target_condition):
+    def goal_seeds(self, board):
         """
-        Perform a bidirectional search to find the best move.
-        :param board: Current state of the chessboard.
-        :param target_condition: Function to check if the target state is reached.
-        :return: The best move or None if no solution is found.
+        Goal positions of the backward search: all checkmates of the opponent with the current material.
+        Only small material against a lone king is enumerated.
+        :return: (piece types of the side to move besides the king, list of mate placements)
         """
-        forward_queue = deque([(board.copy(), None, 0)])  # (board state, move leading here, depth)
-        backward_queue = deque([(board.copy(), None, 0)])  # Simulated backward search
-        visited_forward = {}
-        visited_backward = {}
+        attacker = board.turn
+        if board.occupied_co[not attacker] != board.kings & board.occupied_co[not attacker]:
+            return (), []
+        piece_types = [board.piece_type_at(square) for square in chess.scan_forward(board.occupied_co[attacker])
+                       if board.piece_type_at(square) != chess.KING]
+        return piece_types, retrograde.mate_positions(attacker, piece_types)
 
-        # Initial conditions
-        visited_forward[board.fen()] = None
-        visited_backward[board.fen()] = None
+    def bidirectional_search(self, board, target_condition, max_depth=None):
+        """
+        Perform a bidirectional search to find the best move.
 
-        while forward_queue and backward_queue:
-            # Expand the forward search
-            if forward_queue:
-                current_board, move, depth = forward_queue.popleft()
+        The forward search expands the game tree from the current position breadth-first. The backward search
+        starts from goal positions and takes moves back: it keeps positions where the side to move can force
+        a goal, and positions of the opponent only if all its moves lead to such positions. Forward nodes
+        that reach the backward frontier are proven, and the proofs are backed up to the root with the same
+        rule (one move suffices for the side to move, all replies must be proven for the opponent).
 
-                if depth < self.max_depth:
-                    for legal_move in current_board.legal_moves:
-                        current_board.push(legal_move)
-                        current_fen = current_board.fen()
+        :param board: Current state of the chessboard.
+        :param target_condition: Function of a FastBoard checking if the target state is reached (with the opponent
+            to move).
+        :param max_depth: Search depth of each direction (the configured depth by default).
+        :return: (best move, plies to the target) or (None, None) if no solution is found.
+        """
+        if max_depth is None:
+            max_depth = self.max_depth
+        attacker = board.turn
+        self.truncated = False
 
-                        if current_fen in visited_backward:
-                            # Intersection found
-                            return legal_move
+        # Forward tree: children of a node are stored contiguously; a child that was already visited elsewhere
+        # is not stored again and makes the node incomplete, so it cannot be proven by "all replies" rule
+        forward = NodeStore()
+        forward.add(-1)
+        root_key = zobrist.compute_hash(board)
+        keys = array.array('Q', [root_key])
+        first_child = array.array('l', [0])
+        child_count = array.array('H', [0])
+        complete = bytearray([1])
+        visited = {root_key}
+        forward_level = (0, 1)
+        forward_depth = 0
+        fast_board = FastBoard(board)  # The forward search runs on packed moves without chess.Move objects
 
-                        if current_fen not in visited_forward:
-                            forward_queue.append((current_board.copy(), legal_move, depth + 1))
-                            visited_forward[current_fen] = legal_move
+        # Backward tree: goal key -> number of plies to reach a goal
+        backward = NodeStore()
+        backward_keys = array.array('Q')
+        goals = {}
+        piece_types, seeds = self.goal_seeds(board)
+        for index, placement in enumerate(seeds):
+            key = zobrist.compute_hash(retrograde.placement_board(attacker, piece_types, placement))
+            goals[key] = 0
+            backward.add(-1 - index)
+            backward_keys.append(key)
+        backward_level = (0, len(backward))
+        backward_depth = 0 if seeds else max_depth
 
-                        current_board.pop()
+        while forward_depth < max_depth or backward_depth < max_depth:
+            if len(forward) + len(backward) >= self.max_nodes:
+                self.truncated = True
+                break  # Node cap reached: the caller falls back to the evaluator
 
-            # Expand the backward search
-            if backward_queue:
-                current_board, move, depth = backward_queue.popleft()
+            forward_size = forward_level[1] - forward_level[0]
+            backward_size = backward_level[1] - backward_level[0]
+            if backward_depth >= max_depth or (forward_depth < max_depth and forward_size <= backward_size):
+                # Expand the forward search
+                start = len(forward)
+                for node in range(*forward_level):
+                    _, path = forward.path(node)
+                    for packed in path:
+                        fast_board.make(packed)
+                    first_child[node] = len(forward)
+                    for move in fast_board.legal_moves():
+                        self.limits.check()
+                        fast_board.make(move)
+                        child_key = fast_board.key
+                        if fast_board.turn != attacker and child_key not in goals and target_condition(fast_board):
+                            goals[child_key] = 0
+                        fast_board.unmake()
+                        if child_key in visited:
+                            if child_key not in goals:
+                                complete[node] = 0
+                            continue
+                        visited.add(child_key)
+                        forward.add(node, move)
+                        keys.append(child_key)
+                        first_child.append(0)
+                        child_count.append(0)
+                        complete.append(1)
+                    child_count[node] = len(forward) - first_child[node]
+                    for _ in path:
+                        fast_board.unmake()
+                    if len(forward) + len(backward) >= self.max_nodes:
+                        break
+                forward_level = (start, len(forward))
+                forward_depth += 1
+            else:
+                # Expand the backward search
+                start = len(backward)
+                for node in range(*backward_level):
+                    seed, path = backward.path(node)
+                    position = retrograde.placement_board(attacker, piece_types, seeds[seed])
+                    for packed in path:
+                        retrograde.unmake(position, packed & 63, packed >> 6)
+                    node_key = backward_keys[node]
+                    for from_square, to_square in list(retrograde.retro_moves(position)):
+                        self.limits.check()
+                        piece_keys = zobrist.PIECE_KEYS[not position.turn][position.piece_type_at(from_square)]
+                        if retrograde.unmake(position, from_square, to_square):
+                            # Retrograde positions have no castling rights or en passant squares
+                            key = node_key ^ piece_keys[from_square] ^ piece_keys[to_square] ^ zobrist.TURN_KEY
+                            if key not in goals and (position.turn == attacker
+                                                     or self.all_moves_reach(position, key, goals)):
+                                goals[key] = backward_depth + 1
+                                backward.add(node, from_square | to_square << 6)
+                                backward_keys.append(key)
+                        retrograde.unmake(position, to_square, from_square)
+                    if len(forward) + len(backward) >= self.max_nodes:
+                        break
+                backward_level = (start, len(backward))
+                backward_depth += 1
 
-                if depth < self.max_depth:
-                    for legal_move in current_board.legal_moves:
-                        current_board.push(legal_move)
-                        current_fen = current_board.fen()
+            best_move, plies = self.proven_move(forward, keys, first_child, child_count, complete, goals, attacker,
+                                                board.turn)
+            if best_move is not None:
+                self.forward_nodes, self.backward_nodes = len(forward), len(backward)
+                return best_move, plies
 
-                        if current_fen in visited_forward:
-                            # Intersection found
-                            return visited_forward[current_fen]  # Move from forward search
+        self.forward_nodes, self.backward_nodes = len(forward), len(backward)
+        self.truncated = self.truncated or len(forward) + len(backward) >= self.max_nodes
+        return None, None  # Solution not found
 
-                        if current_fen not in visited_backward:
-                            backward_queue.append((current_board.copy(), legal_move, depth + 1))
-                            visited_backward[current_fen] = legal_move
+    @staticmethod
+    def all_moves_reach(position, key, goals):
+        """
+        Checks whether every legal move of the position leads to a goal position (there must be at least one).
+        """
+        moves = list(position.legal_moves)
+        for move in moves:
+            reached = zobrist.push_move(position, move, key) in goals
+            position.pop()
+            if not reached:
+                return False
+        return bool(moves)
 
-                        current_board.pop()
+    @staticmethod
+    def proven_move(forward, keys, first_child, child_count, complete, goals, attacker, root_turn):
+        """
+        Backs up the proofs over the forward tree.
+        :return: (root move with the shortest proven path to a goal, plies to the goal), or (None, None).
+        """
+        # Turns alternate with the depth, so a node's side to move follows from its parent's
+        turns = bytearray(len(forward))
+        turns[0] = root_turn
+        for node in range(1, len(forward)):
+            turns[node] = not turns[forward.parents[node]]
 
-        return None  # Solution not found
+        distances = {}  # Node index -> plies to a goal
+        for node in range(len(forward) - 1, -1, -1):
+            if keys[node] in goals:
+                distances[node] = goals[keys[node]]
+            elif child_count[node]:
+                children = [distances.get(child) for child in range(first_child[node],
+                                                                    first_child[node] + child_count[node])]
+                if turns[node] == attacker:
+                    proven = [distance for distance in children if distance is not None]
+                    if proven:
+                        distances[node] = min(proven) + 1
+                elif complete[node] and None not in children:
+                    distances[node] = max(children) + 1
 
-    def get_best_move(self, board):
+        root_children = [child for child in range(first_child[0], first_child[0] + child_count[0])
+                         if child in distances]
+        if not root_children:
+            return None, None
+        best = min(root_children, key=distances.get)
+        return decode_move(forward.moves[best]), distances[best] + 1
+
+    def get_best_move(self, board, time_limit_ms=None, token=None, depth=None, node_limit=None, on_iteration=None):
         """
-        Finds the best move using bidirectional search.
+        Finds the best move using iteratively deepened bidirectional search.
         :param board: Current state of the chessboard.
+        :param time_limit_ms: Time budget in milliseconds; without it the search goes to the configured depth.
+        :param token: CancellationToken that stops the search early.
+        :param depth: Maximum depth overriding the configured one.
+        :param node_limit: Node budget of the search.
+        :param on_iteration: Called with (depth, move, score) after every completed iteration.
         :return: The best move.
         """
+        max_depth = depth or (self.max_depth if time_limit_ms is None and node_limit is None else MAX_DEPTH)
+        self.truncated, self.proven = False, False
+        stats = SearchStats("bds", self.evaluator)
+        self.search_stats = stats
+        best_move, score, completed_depth = iterative_deepening(
+            board, self.search_depth, max_depth, time_limit_ms,
+            stats.track(on_iteration, lambda: self.forward_nodes + self.backward_nodes), token, node_limit)
+        stats.nodes = self.forward_nodes + self.backward_nodes
+        stats.finish(best_move, score, completed_depth)
+        return best_move
+
+    def search_depth(self, board, max_depth, limits=None, pv_move=None):
+        """
+        Runs the bidirectional search to a fixed depth.
+        :param board: Current state of the chessboard.
+        :param max_depth: Search depth.
+        :param limits: SearchLimits checked at every expansion.
+        :param pv_move: Best move of the previous iteration (unused, the search is breadth-first).
+        :return: (best move, its evaluation or the mate score of a proven move), or (None, None) if a deeper
+            iteration cannot improve on the previous one (it proved a mate or was cut short by the node cap).
+        """
         def target_condition(b):
             # Target condition: for example, checkmate
             return b.is_checkmate()
 
-        best_move = self.bidirectional_search(board, target_condition)
+        if self.truncated or self.proven:
+            return None, None
+        self.limits = limits or SearchLimits()
+        best_move, plies = self.bidirectional_search(board, target_condition, max_depth)
         if best_move is None:
             # If no solution is found, return the best move evaluated by the evaluator
-            return max(
-                board.legal_moves,
-                key=lambda move: self._evaluate_move(board, move),
-                default=None
-            )
-        return best_move
+            return self._evaluate_moves(board)
+        self.proven = True
+        return best_move, CHECKMATE_SCORE * self.evaluator.weights["king_safety"] - plies
 
-    def _evaluate_move(self, board, move):
+    def _evaluate_moves(self, board):
         """
-        Evaluates a single move on the chessboard.
+        Evaluates all legal moves on the chessboard in one batch.
         :param board: Current state of the chessboard.
-        :param move: The move to be evaluated.
-        :return: Numerical evaluation score of the move.
+        :return: (best move, its evaluation) or (None, None) without legal moves.
         """
-        board.push(move)
-        score = self.evaluator.evaluate(board)
-        board.pop()
-        return score
+        moves = list(board.legal_moves)
+        if not moves:
+            return None, None
+        scores = self.batch_evaluator.evaluate_moves(board, moves)
+        best = int(scores.argmax())  # The first of equal scores, as max() over the moves would pick
+        return moves[best], float(scores[best])
@@ -1,84 +1,144 @@
-import chess
-from queue import PriorityQueue
+import heapq
 
-class ChessBotBFS:
-    def __init__(self, max_depth, evaluator):
-        # Maximum depth to explore moves
-        self.max_depth = 2
-        # Evaluation function to score board positions
-        self.evaluator = evaluator
-        self.nodes_explored = 0
-
-    def get_best_move(self, board):
-
-        best_move = None
-        best_score = float('-inf')  # Initialize with a very low score
-
-        max_depth = self.max_depth
+from batch_evaluator import BatchEvaluator
+from iterative_deepening import iterative_deepening, SearchLimits, MAX_DEPTH
+from position_evaluator import CHECKMATE_SCORE
+from telemetry import SearchStats
 
-        if (board.turn == chess.WHITE):
-            current_player = chess.WHITE
-        elif (board.turn == chess.BLACK):
-            current_player = chess.BLACK
+BEAM_WIDTH = 12  # Number of nodes expanded at every ply and number of children kept per expanded node
+NODE_BUDGET = 20000  # Number of evaluated positions allowed in one search iteration
 
-        # Iterate over all legal moves
-        for move in board.legal_moves:
-            # Get immediate score of the move
-            current_score = self.evaluator.evaluate(board) 
-
-            # Get the long-term score for this move by using greedy_best_move_score
-            long_term_score = self.get_long_term_score(board, move, max_depth, current_player) 
-
-            # Sum short-term score and long-term score
-            combined_score = current_score + long_term_score
-
-            # Check if this move has the highest combined score
-            if combined_score > best_score:
-                best_score = combined_score
-                best_move = move
 
+class ChessBotBFS:
+    def __init__(self, max_depth, evaluator, beam_width=BEAM_WIDTH, node_budget=NODE_BUDGET):
+        """
+        Best-first beam search. The tree is grown ply by ply: every expanded node evaluates all its children
+        and keeps the best ones for the side to move, and at every ply only the most plausible frontier nodes
+        are expanded. The retained tree is then backed up with minimax.
+
+        :param max_depth: Maximum depth to explore moves.
+        :param evaluator: Evaluation function to score board positions.
+        :param beam_width: Number of nodes expanded per ply and number of children kept per expanded node.
+        :param node_budget: Maximum number of evaluated positions in one search iteration.
+        """
+        self.max_depth = max_depth
+        self.evaluator = evaluator
+        self.batch_evaluator = BatchEvaluator(evaluator)  # Scores all children of a node in one call
+        self.beam_width = beam_width
+        self.node_budget = node_budget
+        self.nodes_explored = 0
+        self.limits = SearchLimits()  # Limits of the running search
+        self.search_stats = None  # SearchStats of the last search
+
+    def get_best_move(self, board, time_limit_ms=None, token=None, depth=None, node_limit=None, on_iteration=None):
+        """
+        Finds the best move using iterative deepening.
+        :param board: Current state of the chessboard.
+        :param time_limit_ms: Time budget in milliseconds; without it the search goes to the configured depth.
+        :param token: CancellationToken that stops the search early.
+        :param depth: Maximum depth overriding the configured one.
+        :param node_limit: Node budget of the search.
+        :param on_iteration: Called with (depth, move, score) after every completed iteration.
+        :return: The best move.
+        """
+        self.nodes_explored = 0
+        max_depth = depth or (self.max_depth if time_limit_ms is None and node_limit is None else MAX_DEPTH)
+        stats = SearchStats("bfs", self.evaluator)
+        self.search_stats = stats
+        best_move, score, completed_depth = iterative_deepening(board, self.search_depth, max_depth, time_limit_ms,
+                                                                stats.track(on_iteration, lambda: self.nodes_explored),
+                                                                token, node_limit)
+        stats.nodes = self.nodes_explored
+        stats.finish(best_move, score, completed_depth)
         return best_move
 
-    def get_long_term_score(self, board, move, max_depth, current_player):
-        is_maximizing_player = board.turn == current_player
-       # Initialize local best scores for maximizing player/opponent
-        if(is_maximizing_player):
-            best_score = float('inf')
-        else:
-            best_score = float('-inf')
-
-        def recursive_deepening(board, depth, best_score):
-            
-            is_maximizing_player = board.turn == current_player
-            # Check if depth is 0 and return the evaluation
-            if depth == 0:
-                return self.evaluator.evaluate(board)
-
-            # Explore all legal moves
-            for next_move in board.legal_moves:
-                board.push(next_move)
-                self.nodes_explored += 1
-
-                # Recursive call to evaluate the next depth
-                score = recursive_deepening(board, depth - 1, best_score)
-
-                # Update best score based on whether maximizing or minimizing
-                if is_maximizing_player:
-                    best_score = max(best_score, score)
-                else:
-                    best_score = min(best_score, score)
-
-                board.pop()  # Undo the move
-
-            return best_score
-
-        # Apply the initial move
-        board.push(move)
-        self.nodes_explored += 1
-
-        # Evaluate the board state recursively 
-        best_score = recursive_deepening(board, max_depth - 1, best_score)
-
-        # Undo the initial move
-        board.pop()
-        return best_score
+    def search_depth(self, board, max_depth, limits=None, pv_move=None):
+        """
+        Searches the root position to a fixed depth.
+        :param board: Current state of the chessboard.
+        :param max_depth: Search depth.
+        :param limits: SearchLimits checked at every node.
+        :param pv_move: Best move of the previous iteration, expanded first.
+        :return: (best move, its score)
+        """
+        self.limits = limits or SearchLimits()
+        self.evaluator.reset(board)
+        budget = self.nodes_explored + self.node_budget
+
+        # The tree is stored in flat lists indexed by node; children always come after their parent
+        parents, moves, plies, scores, children = [-1], [None], [0], [0.0], [[]]
+        # Frontier of the next ply: (sum of sibling ranks along the path, -score for the mover, node index),
+        # so lines where both sides play their best-looking moves are expanded first
+        frontier = [(0, 0.0, 0)]
+        expanded = set()  # Expanded nodes; those without children are checkmates or stalemates
+
+        for ply in range(max_depth):
+            next_frontier = []
+            width = len(frontier) if ply == 0 else self.beam_width
+            for _ in range(min(width, len(frontier))):
+                if self.nodes_explored >= budget:
+                    break
+                rank, _, node = heapq.heappop(frontier)
+                keep = None if ply == 0 else self.beam_width  # All root moves are scored
+                scored = self.expand(board, node, parents, moves, pv_move)[:keep]
+                expanded.add(node)
+                for child_rank, (move, mover_score) in enumerate(scored):
+                    parents.append(node)
+                    moves.append(move)
+                    plies.append(ply + 1)
+                    # Scores are stored from the root player's point of view
+                    scores.append(mover_score if ply % 2 == 0 else -mover_score)
+                    children.append([])
+                    children[node].append(len(scores) - 1)
+                    heapq.heappush(next_frontier, (rank + child_rank, -mover_score, len(scores) - 1))
+            frontier = next_frontier
+
+        # Minimax backup over the retained tree (children have larger indices than their parents). Checkmates
+        # are scored by their distance only, so the shortest mate is preferred over a longer one whose final
+        # position happens to evaluate better.
+        values = scores[:]
+        mate_score = CHECKMATE_SCORE * self.evaluator.weights["king_safety"]
+        for node in range(len(values) - 1, 0, -1):
+            if not children[node] and abs(values[node]) >= mate_score / 2:
+                values[node] = (mate_score - plies[node]) * (1 if values[node] > 0 else -1)
+            elif children[node]:
+                child_values = [values[child] for child in children[node]]
+                values[node] = max(child_values) if plies[node] % 2 == 0 else min(child_values)
+
+        # Unexpanded root moves only have a one-ply score, so they are only used if nothing was expanded
+        candidates = [child for child in children[0] if child in expanded] or children[0]
+        if not candidates:
+            return None, None
+        best = max(candidates, key=lambda child: values[child])
+        return moves[best], values[best]
+
+    def expand(self, board, node, parents, moves, pv_move=None):
+        """
+        Evaluates all children of a tree node.
+        :param board: Root position; it is restored before returning.
+        :param node: Index of the expanded node.
+        :param parents: Parent index of every node.
+        :param moves: Move leading to every node.
+        :param pv_move: Move sorted first among the root moves.
+        :return: List of (move, score for the side making the move), best first.
+        """
+        path = []
+        while node > 0:
+            path.append(moves[node])
+            node = parents[node]
+        for move in reversed(path):
+            self.evaluator.on_push(board, move)
+            board.push(move)
+
+        child_moves = list(board.legal_moves)
+        self.nodes_explored += len(child_moves)
+        self.limits.check(len(child_moves))
+        scores = self.batch_evaluator.evaluate_moves(board, child_moves)
+        scored = [(move, float(score)) for move, score in zip(child_moves, scores)]
+
+        for _ in path:
+            board.pop()
+            self.evaluator.on_pop(board)
+
+        scored.sort(key=lambda item: (not path and item[0] == pv_move, item[1]), reverse=True)
+        return scored
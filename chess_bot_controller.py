@@ -1,39 +1,144 @@
+import logging
+import os
+
 from chess_bot_dfs import ChessBotDFS
 from chess_bot_bfs import ChessBotBFS
 from chess_bot_bds import ChessBotBDS
+from chess_bot_pvs import ChessBotPVS
+from opening_book import OpeningBook
+from persistent_cache import PersistentCache
+from parallel_search import ParallelChessBotDFS
 from position_evaluator import PositionEvaluator
+from tablebase import Tablebase
+from telemetry import SearchStats, Telemetry
+
+logger = logging.getLogger(__name__)
+
 
 class ChessBotController:
-    def __init__(self, dfs_depth, bfs_depth, bds_depth):
-        # Create a single instance of PositionEvaluator
-        self.position_evaluator = PositionEvaluator()
+    def __init__(self, dfs_depth, bfs_depth, bds_depth, tt_size_mb=16, evaluator=None, workers=1,
+                 pvs_depth=None, engine="auto", book_path=None, book_selection="weighted", syzygy_dir=None,
+                 use_tablebase=True, cache_path=None, telemetry=None):
+        """
+        :param pvs_depth: Depth of the principal variation search engine (dfs_depth by default)
+        :param engine: "auto" selects the bot by the stage of the game, otherwise one of the keys of self.bots
+        :param book_path: Polyglot opening book consulted before any engine (ignored if the file does not exist)
+        :param book_selection: "weighted" or "best" choice among the book moves
+        :param syzygy_dir: Directory with Syzygy tablebases (the generated 3-piece tables are used without it)
+        :param use_tablebase: Probe endgame tablebases at the root and inside the DFS and PVS searches
+        :param cache_path: SQLite file of search results kept across sessions (None disables it)
+        :param telemetry: Telemetry receiving the statistics of every answer (by default one without sinks,
+            which only runs the searches profiled on request)
+        """
+        # Create a single instance of PositionEvaluator (or use the given one, e.g. IncrementalEvaluator)
+        self.position_evaluator = evaluator or PositionEvaluator()
         
+        self.tablebase = Tablebase(syzygy_dir) if use_tablebase else None
+        self.persistent_cache = None
+        if cache_path is not None:  # Stored scores are only reused with the same evaluation
+            self.persistent_cache = PersistentCache(cache_path, self.position_evaluator.signature())
+
         # Pass it to each bot
-        self.dfs_bot = ChessBotDFS(dfs_depth, self.position_evaluator)
+        if workers > 1:  # Root-split search over several processes
+            self.dfs_bot = ParallelChessBotDFS(dfs_depth, self.position_evaluator, workers, tt_size_mb)
+        else:
+            self.dfs_bot = ChessBotDFS(dfs_depth, self.position_evaluator, tt_size_mb, tablebase=self.tablebase,
+                                       persistent_cache=self.persistent_cache)
         self.bfs_bot = ChessBotBFS(bfs_depth, self.position_evaluator)
-        self.bds_bot = ChessBotBDS(bds_depth, self.position_evaluator)
+        self.bds_bot = ChessBotBDS(self.position_evaluator, bds_depth)
+        self.pvs_bot = ChessBotPVS(pvs_depth or dfs_depth, self.position_evaluator, tt_size_mb,
+                                   tablebase=self.tablebase, persistent_cache=self.persistent_cache)
+
+        # Registered engines that can be selected by name
+        self.bots = {"dfs": self.dfs_bot, "bfs": self.bfs_bot, "bds": self.bds_bot, "pvs": self.pvs_bot}
+        self.engine = engine
+
+        self.opening_book = None
+        if book_path is not None and os.path.exists(book_path):
+            self.opening_book = OpeningBook(book_path, book_selection)
+        # Moves answered from the book, from the tablebase and by an engine
+        self.stats = {"book_hits": 0, "tablebase_hits": 0, "searches": 0}
+        self.telemetry = telemetry if telemetry is not None else Telemetry()
 
     def choose_bot(self, board):
         """
-        Bot selection based on the stage of the game.
+        Bot selection based on the stage of the game (unless an engine was selected by name).
         """
+        if self.engine != "auto":
+            return self.bots[self.engine]
+
         piece_count = sum(1 for square in board.piece_map().values())
         moves_count = sum(1 for _ in board.legal_moves)
 
         if piece_count > 24 and moves_count < 1000000:  # First 30 moves (temporarily replaced with a debug value)
-            print("Use BFS for the initial stage of the game")
+            logger.debug("Use BFS for the initial stage of the game")
             return self.bfs_bot
         elif 20 <= piece_count <= 24 and moves_count <50:  # Middle moves
-            print("Use DFS for the middle stage of the game")
+            logger.debug("Use DFS for the middle stage of the game")
             return self.dfs_bot
         else:
-            print("Use BFS for complex situations") # Endgame
+            logger.debug("Use BFS for complex situations") # Endgame
             # return self.ucs_bot
             return self.bds_bot
 
-    def get_best_move(self, board):
+    def get_best_move(self, board, time_limit_ms=None, token=None, depth=None, node_limit=None, on_iteration=None):
         """
         Getting the best move from the selected bot
+
+        :param time_limit_ms: Time budget in milliseconds (None searches to the configured depth)
+        :param token: CancellationToken that stops the search early
+        :param depth: Maximum search depth overriding the configured one
+        :param node_limit: Node budget of the search
+        :param on_iteration: Called with (depth, move, score) after every completed iteration of the search
         """
+        move, _ = self.analyse(board, time_limit_ms, token, depth, node_limit, on_iteration)
+        return move
+
+    def analyse(self, board, time_limit_ms=None, token=None, depth=None, node_limit=None, on_iteration=None,
+                profile=None):
+        """
+        Same as get_best_move, but also returns the statistics of the answer.
+
+        :param profile: Run the search under cProfile (the setting of the telemetry by default)
+        :return: (move, SearchStats)
+        """
+        if self.opening_book is not None:
+            move = self.opening_book.probe(board)
+            if move is not None:
+                self.stats["book_hits"] += 1
+                return move, self.emit(SearchStats("book").finish(move))
+
+        if self.tablebase is not None:
+            move = self.tablebase.best_move(board)
+            if move is not None:
+                self.stats["tablebase_hits"] += 1
+                return move, self.emit(SearchStats("tablebase").finish(move))
+
+        self.stats["searches"] += 1
         chosen_bot = self.choose_bot(board)
-        return chosen_bot.get_best_move(board)
\ No newline at end of file
+        arguments = (board, time_limit_ms, token, depth, node_limit, on_iteration)
+        move, profile_stats = self.telemetry.run(chosen_bot.get_best_move, *arguments, profile=profile)
+        if self.persistent_cache is not None:
+            self.persistent_cache.flush()  # The results of the search survive the session
+        stats = chosen_bot.search_stats
+        if stats is not None:
+            stats.profile = profile_stats
+            self.emit(stats)
+        return move, stats
+
+    def emit(self, stats):
+        """
+        Passes the statistics of an answer to the telemetry sinks.
+        """
+        self.telemetry.emit(stats)
+        return stats
+
+    def close(self):
+        """
+        Releases the resources of the bots (worker processes, the on-disk cache).
+        """
+        if isinstance(self.dfs_bot, ParallelChessBotDFS):
+            self.dfs_bot.close()
+        if self.persistent_cache is not None:
+            self.persistent_cache.close()
+        self.telemetry.close()
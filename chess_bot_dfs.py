@@ -1,26 +1,145 @@
+import logging
+
+import chess
+
+import zobrist
+from iterative_deepening import iterative_deepening, SearchLimits, MAX_DEPTH
+from move_ordering import MoveOrderer, mvv_lva
+from position_evaluator import CHECKMATE_SCORE
+from see import see
+from telemetry import SearchStats
+from transposition_table import TranspositionTable, EXACT, LOWER, UPPER
+
+logger = logging.getLogger(__name__)
+
+
+# Margin of delta pruning in quiescence search (two pawns in evaluation units)
+DELTA_MARGIN = 2 * 4
+DRAW_SCORE = 0  # Score of drawn positions from either side's point of view
+# From this halfmove clock on, the fifty-move rule may decide lines of the search
+FIFTY_MOVE_HORIZON = 90
+
+
 class ChessBotDFS:
-    def __init__(self, depth, evaluator):
+    engine_name = "dfs"  # Name of the engine in the search statistics
+
+    def __init__(self, depth, evaluator, tt_size_mb=16, quiescence=True, quiescence_evasions=False, tablebase=None,
+                 persistent_cache=None):
         self.depth = depth  # Search depth
         self.evaluator = evaluator  # Position evaluation function
+        self.quiescence_enabled = quiescence  # Resolve captures at the leaves with quiescence search
+        self.quiescence_evasions = quiescence_evasions  # Also search all check evasions in quiescence search
         self.nodes_explored = 0 # Counter for the number of nodes explored
-        self.transposition_table = {}  # Transposition table for storing previously computed positions
+        self.qnodes_explored = 0  # Counter for the number of nodes explored by quiescence search
+        # Fixed-size table of previously searched positions (backed by the optional on-disk cache)
+        self.transposition_table = TranspositionTable(tt_size_mb, persistent_cache)
+        self.limits = SearchLimits()  # Limits of the running search
+        self.move_orderer = MoveOrderer()  # TT move, MVV-LVA, killer and history move ordering
+        self.tablebase = tablebase  # Endgame tablebase probed once few pieces are left (optional)
+        self.search_stats = None  # SearchStats of the last search
 
-    def get_best_move(self, board):
+    def get_best_move(self, board, time_limit_ms=None, token=None, depth=None, node_limit=None, on_iteration=None):
         """
-        Determining the best move for the current position using minimax
+        Determining the best move for the current position using iterative deepening minimax
 
         :param board: chess.Board object representing the current chess position
+        :param time_limit_ms: Time budget in milliseconds; without it the search goes to the configured depth
+        :param token: CancellationToken that stops the search early
+        :param depth: Maximum depth overriding the configured one
+        :param node_limit: Node budget of the search
+        :param on_iteration: Called with (depth, move, score) after every completed iteration
         :return: The best move for the current position
         """
+        self.nodes_explored = 0
+        self.qnodes_explored = 0
+        self.transposition_table.new_search()
+        self.move_orderer.new_search()
+        max_depth = depth or (self.depth if time_limit_ms is None and node_limit is None else MAX_DEPTH)
+        stats = SearchStats(self.engine_name, self.evaluator)
+        self.search_stats = stats
+
+        best_move, score, completed_depth = iterative_deepening(
+            board, self.search_root, max_depth, time_limit_ms,
+            stats.track(on_iteration, lambda: self.nodes_explored + self.qnodes_explored), token, node_limit)
+
+        table = self.transposition_table
+        stats.nodes, stats.qnodes = self.nodes_explored, self.qnodes_explored
+        stats.tt_probes, stats.tt_hits, stats.tt_cutoffs = table.probes, table.hits, table.cutoffs
+        stats.cutoffs = self.move_orderer.cutoffs
+        stats.finish(best_move, score, completed_depth)
+        logger.debug("Nodes explored: %d (+%d quiescence), depth: %d, TT hit rate: %.1f%%, TT cut-off rate: %.1f%%, "
+                     "first move cut-offs: %.1f%%", self.nodes_explored, self.qnodes_explored, completed_depth,
+                     table.hit_rate() * 100, table.cutoff_rate() * 100,
+                     self.move_orderer.first_move_cutoff_rate() * 100)
+        return best_move
+
+    @property
+    def mate_score(self):
+        """
+        Score of giving checkmate at the root; a checkmate given n plies from the root scores mate_score - n.
+        """
+        return CHECKMATE_SCORE * self.evaluator.weights["king_safety"]
+
+    def mate_distance_score(self, score, ply):
+        """
+        Replaces an evaluation that reports a checkmate by the score of a mate at the given ply, so the shortest
+        mate is preferred whatever the evaluation of its final position.
+        """
+        if abs(score) < self.mate_score / 2:
+            return score
+        return self.mate_score - ply if score > 0 else ply - self.mate_score
+
+    def to_table(self, score, ply):
+        """
+        Mate scores are stored relative to the node rather than to the root, as a position may be reached at
+        different plies.
+        """
+        if abs(score) < self.mate_score / 2:
+            return score
+        return score + ply if score > 0 else score - ply
+
+    def from_table(self, score, ply):
+        """
+        Converts a stored score back to the root (see to_table).
+        """
+        if abs(score) < self.mate_score / 2:
+            return score
+        return score - ply if score > 0 else score + ply
+
+    def search_root(self, board, depth, limits=None, pv_move=None, root_moves=None):
+        """
+        Searches the root position to a fixed depth.
+
+        :param board: chess.Board object representing the current chess position
+        :param depth: Search depth
+        :param limits: SearchLimits checked at every node
+        :param pv_move: Best move of the previous iteration, searched first
+        :param root_moves: Searches only these root moves if given (used by the parallel search)
+        :return: (best move, its evaluation)
+        """
         best_move = None  # The best move found
-        best_value = float('-inf')  # Initially set the worst evaluation 
+        best_value = float('-inf')  # Initially set the worst evaluation
         alpha, beta = float('-inf'), float('inf')  # Initialization of values for alpha-beta pruning
 
+        self.limits = limits or SearchLimits()
+        self.evaluator.reset(board)
+        root_key = zobrist.compute_hash(board)
+        entry = self.transposition_table.probe(root_key, depth)
+        if (entry is not None and root_moves is None and entry[1] >= depth and entry[3] == EXACT
+                and entry[4] is not None and board.is_legal(entry[4]) and self.root_entry_usable(board)):
+            return entry[4], entry[2]  # Already searched at least this deep (possibly in an earlier session)
+        if pv_move is None:
+            pv_move = entry[4] if entry is not None else None
+
+        moves = self.get_ordered_moves(board, pv_move)
+        if root_moves is not None:
+            moves = [move for move in moves if move in root_moves]
+
         # We go through all possible moves
-        for move in self.get_ordered_moves(board):
-            board.push(move)  # We make a move
-            value = self.minimax(board, self.depth - 1, alpha, beta, False)  # We calculate the evaluation using minimax
-            board.pop()  # We revert the position
+        for move in moves:
+            child_key = self.push_move(board, move, root_key)  # We make a move
+            value = self.minimax(board, depth - 1, alpha, beta, False, child_key, 1)  # We calculate the evaluation using minimax
+            self.pop_move(board)  # We revert the position
 
             # If the found move is better than the previous one, we update the best
             if value > best_value:
@@ -30,75 +149,205 @@ class ChessBotDFS:
             # We update the alpha value for pruning
             alpha = max(alpha, value)
 
-        print(f"Nodes explored: {self.nodes_explored}")  # Output the number of nodes evaluated for debugging
-        return best_move
+        if best_move is not None and root_moves is None:
+            self.transposition_table.store(root_key, depth, best_value, EXACT, best_move)
+        return best_move, best_value
 
-    def minimax(self, board, depth, alpha, beta, maximizing_player):
+    def minimax(self, board, depth, alpha, beta, maximizing_player, key=None, ply=1):
+        """
+        Alpha-beta minimax from the point of view of the side to move at the root.
 
-        # Generate a key for the hash table to account for the current board, depth, and alpha-beta parameters
-        # We generate a key for the hash table to account for the current board, depth, and alpha-beta parameters
-        board_key = (board.board_fen(), depth, alpha, beta, maximizing_player)
+        :param key: Zobrist key of the position (computed from scratch if omitted).
+        :param ply: Distance from the root.
+        """
+        if key is None:
+            key = zobrist.compute_hash(board)
 
-        # We check if the position has already been evaluated previously
-        if board_key in self.transposition_table:
-            return self.transposition_table[board_key]
+        # Draws depend on the move history, which the transposition table does not know about
+        if self.is_draw(board):
+            return DRAW_SCORE
+
+        # The table stores scores from the side to move's point of view, so we switch the window to it
+        sign = 1 if maximizing_player else -1
+        stm_alpha, stm_beta = (alpha, beta) if maximizing_player else (-beta, -alpha)
+
+        # We check if the position has already been searched deep enough
+        entry = self.transposition_table.probe(key, depth, ply)
+        tt_move = None
+        if entry is not None:
+            tt_move = entry[4]
+            if entry[1] >= depth:
+                score, flag = self.from_table(entry[2], ply), entry[3]
+                if flag == EXACT or (flag == LOWER and score >= stm_beta) or (flag == UPPER and score <= stm_alpha):
+                    self.transposition_table.record_cutoff()
+                    return score * sign
+
+        # Positions with few pieces left are looked up in the endgame tablebase
+        if self.tablebase is not None and chess.popcount(board.occupied) <= self.tablebase.max_pieces:
+            score = self.tablebase.score(board)
+            if score is not None:
+                self.transposition_table.store(key, depth, score, EXACT, None)
+                return score * sign
 
         self.nodes_explored += 1  # We increase the counter of evaluated nodes
+        self.limits.check()  # We stop if the time budget is used up
+
+        # If we have reached the maximum depth, we evaluate the position once the captures are resolved
+        if depth == 0:
+            if self.quiescence_enabled:
+                evaluation = self.quiescence(board, stm_alpha, stm_beta)  # Side to move's point of view
+                flag = UPPER if evaluation <= stm_alpha else LOWER if evaluation >= stm_beta else EXACT
+            else:
+                evaluation, flag = self.evaluator.evaluate(board), EXACT
+            evaluation = self.mate_distance_score(evaluation, ply)
+            self.transposition_table.store(key, depth, self.to_table(evaluation, ply), flag, None)
+            return evaluation * sign
 
-        # If we have reached the maximum depth or the game is over, we evaluate the position
-        if depth == 0 or board.is_game_over():
-            evaluation = self.evaluator.evaluate(board)
-            self.transposition_table[board_key] = evaluation  # We store the evaluation in the hash table
-            return evaluation
+        # Moves are generated in stages; a node without any legal move is terminal
+        moves = self.move_orderer.ordered_moves(board, ply, tt_move)
 
+        best_move = None
+        move_index = -1
         if maximizing_player:
             # Maximizing player (bot)
             max_eval = float('-inf')
-            for move in self.get_ordered_moves(board):
-                board.push(move)
-                eval = self.minimax(board, depth - 1, alpha, beta, False)
-                board.pop()
-                max_eval = max(max_eval, eval)
+            for move_index, move in enumerate(moves):
+                child_key = self.push_move(board, move, key)
+                eval = self.minimax(board, depth - 1, alpha, beta, False, child_key, ply + 1)
+                self.pop_move(board)
+                if eval > max_eval:
+                    max_eval = eval
+                    best_move = move
                 alpha = max(alpha, eval)  # We update alpha
                 if beta <= alpha:  # Pruning
+                    self.move_orderer.record_cutoff(board, move, ply, depth, move_index)
                     break
-            self.transposition_table[board_key] = max_eval  # We store the result in the transposition table
-            return max_eval
+            value = max_eval
         else:
             # Minimizing player (opponent)
             min_eval = float('inf')
-            for move in self.get_ordered_moves(board):
-                board.push(move)
-                eval = self.minimax(board, depth - 1, alpha, beta, True)
-                board.pop()
-                min_eval = min(min_eval, eval)
+            for move_index, move in enumerate(moves):
+                child_key = self.push_move(board, move, key)
+                eval = self.minimax(board, depth - 1, alpha, beta, True, child_key, ply + 1)
+                self.pop_move(board)
+                if eval < min_eval:
+                    min_eval = eval
+                    best_move = move
                 beta = min(beta, eval)  # We update beta
                 if beta <= alpha:  # Pruning
+                    self.move_orderer.record_cutoff(board, move, ply, depth, move_index)
                     break
-            self.transposition_table[board_key] = min_eval  # We store the result in the transposition table
-            return min_eval
+            value = min_eval
+
+        if move_index < 0:  # Checkmate or stalemate
+            evaluation = ply - self.mate_score if board.is_check() else DRAW_SCORE
+            self.transposition_table.store(key, depth, self.to_table(evaluation, ply), EXACT, None)
+            return evaluation * sign
+
+        # We store the result together with the kind of bound it represents
+        stm_value = value * sign
+        if stm_value <= stm_alpha:
+            flag = UPPER
+        elif stm_value >= stm_beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.transposition_table.store(key, depth, self.to_table(stm_value, ply), flag, best_move)
+        return value
+
+    def quiescence(self, board, alpha, beta):
+        """
+        Searches only captures and queen promotions (and check evasions if enabled) until the position is quiet.
+        Scores and the window are from the side to move's point of view (negamax).
+
+        :return: Evaluation of the quiet position.
+        """
+        self.limits.check()
+
+        if self.quiescence_evasions and board.is_check():
+            # Check evasions: standing pat is not allowed, as the position may be lost
+            moves = list(board.legal_moves)
+            if not moves:
+                return self.evaluator.evaluate(board, moves)
+            best_value = float('-inf')
+            stand_pat = None
+        else:
+            stand_pat = self.evaluator.evaluate(board)
+            if stand_pat >= beta:  # Stand-pat cut-off: the side to move does not have to capture
+                return stand_pat
+            alpha = max(alpha, stand_pat)
+            best_value = stand_pat
+            moves = [move for move in board.generate_legal_moves()
+                     if move.promotion == chess.QUEEN or board.is_capture(move)]
+            moves.sort(key=lambda move: mvv_lva(board, move), reverse=True)
+
+        piece_values = self.evaluator.piece_values
+        for move in moves:
+            # Delta pruning: even winning the captured piece with a margin cannot raise alpha
+            if stand_pat is not None:
+                captured_type = chess.PAWN if board.is_en_passant(move) else board.piece_type_at(move.to_square)
+                gain = piece_values.get(captured_type, 0)
+                if move.promotion:
+                    gain += piece_values[move.promotion] - piece_values[chess.PAWN]
+                if stand_pat + gain * self.evaluator.material_weight + DELTA_MARGIN < alpha:
+                    continue
+                # Captures that lose material in the static exchange on the target square are not searched
+                if gain < piece_values[board.piece_type_at(move.from_square)] and see(board, move, piece_values) < 0:
+                    continue
+
+            self.qnodes_explored += 1
+            self.evaluator.on_push(board, move)
+            board.push(move)
+            value = -self.quiescence(board, -beta, -alpha)
+            self.pop_move(board)
+
+            if value > best_value:
+                best_value = value
+                if value > alpha:
+                    alpha = value
+                    if alpha >= beta:
+                        break
+        return best_value
+
+    @staticmethod
+    def is_draw(board):
+        """
+        Draw by the fifty-move rule, insufficient material or repetition. A position that already occurred
+        once is scored as a draw, as the side that could improve on it would have done so the first time.
+        """
+        return board.halfmove_clock >= 100 or board.is_insufficient_material() or board.is_repetition(2)
+
+    @staticmethod
+    def root_entry_usable(board):
+        """
+        Whether a stored result of the root position can be returned without a search. Stored scores do not
+        know the move history, so the root is searched again when repetitions or the fifty-move rule may draw
+        some of its lines.
+        """
+        return not board.is_repetition(2) and board.halfmove_clock < FIFTY_MOVE_HORIZON
 
-    def get_ordered_moves(self, board):
+    def push_move(self, board, move, key):
         """
-        Returns a list of moves ordered by priority (for example, captures above regular moves).
-        
+        Makes a move, notifying the evaluator.
+
+        :return: Zobrist key of the new position.
+        """
+        self.evaluator.on_push(board, move)
+        return zobrist.push_move(board, move, key)
+
+    def pop_move(self, board):
+        """
+        Takes back the last move, notifying the evaluator.
+        """
+        board.pop()
+        self.evaluator.on_pop(board)
+
+    def get_ordered_moves(self, board, tt_move=None):
+        """
+        Returns a list of moves ordered by priority (TT move, captures, killers, quiet moves by history).
+
         :param board: Current chessboard.
+        :param tt_move: Best move stored in the transposition table, searched first.
         :return: List of ordered moves.
         """
-        def move_score(move):
-            """
-            Assigns a weight to moves based on their priority.  
-            Capturing pieces has a higher priority.
-            
-            :param move: Move for evaluation.
-            :return: Move evaluation.
-            """
-            if board.is_capture(move):  # If the move is a capture
-                return 10
-            if board.gives_check(move):  # If the move puts the king in check
-                return 5
-            return 0  # Other moves have the lowest priority
-
-        moves = list(board.legal_moves)  # Get all legal moves
-        moves.sort(key=move_score, reverse=True)  # Sort by evaluation (in descending order)
-        return moves
\ No newline at end of file
+        return list(self.move_orderer.ordered_moves(board, 0, tt_move))
@@ -0,0 +1,199 @@
+import chess
+
+import zobrist
+from chess_bot_dfs import DRAW_SCORE, ChessBotDFS
+from iterative_deepening import SearchLimits
+from transposition_table import EXACT, LOWER, UPPER
+
+# Width of a null window. Scores are arbitrary floats with tuned weights, so a null window search only tells
+# whether the value is above alpha + NULL_WINDOW; values inside the window are re-searched.
+NULL_WINDOW = 0.05
+LMR_MIN_DEPTH = 3  # Late move reductions are applied from this remaining depth
+LMR_MIN_MOVE_INDEX = 3  # Number of moves searched at full depth before reductions start
+NULL_MOVE_MIN_DEPTH = 3  # Null-move pruning is tried from this remaining depth
+
+
+class ChessBotPVS(ChessBotDFS):
+    engine_name = "pvs"
+
+    def __init__(self, depth, evaluator, tt_size_mb=16, null_move=True, late_move_reductions=True, tablebase=None,
+                 persistent_cache=None):
+        """
+        Negamax principal variation search with null-move pruning and late move reductions.
+        Shares the transposition table, move ordering, quiescence search and iterative deepening of ChessBotDFS.
+
+        :param depth: Search depth.
+        :param evaluator: Position evaluation function.
+        :param tt_size_mb: Transposition table size in megabytes.
+        :param null_move: Enables null-move pruning.
+        :param late_move_reductions: Enables late move reductions.
+        :param tablebase: Endgame tablebase probed once few pieces are left (optional).
+        :param persistent_cache: On-disk PersistentCache backing the transposition table (optional).
+        """
+        super().__init__(depth, evaluator, tt_size_mb, tablebase=tablebase, persistent_cache=persistent_cache)
+        self.null_move_enabled = null_move
+        self.lmr_enabled = late_move_reductions
+        self.null_move_cutoffs = 0  # Number of nodes cut off by a null move search
+        self.lmr_researches = 0  # Number of reduced searches that had to be repeated at full depth
+
+    def get_best_move(self, board, time_limit_ms=None, token=None, depth=None, node_limit=None, on_iteration=None):
+        self.null_move_cutoffs = 0
+        self.lmr_researches = 0
+        return super().get_best_move(board, time_limit_ms, token, depth, node_limit, on_iteration)
+
+    def search_root(self, board, depth, limits=None, pv_move=None, root_moves=None):
+        """
+        Searches the root position to a fixed depth.
+
+        :param board: chess.Board object representing the current chess position
+        :param depth: Search depth
+        :param limits: SearchLimits checked at every node
+        :param pv_move: Best move of the previous iteration, searched first
+        :param root_moves: Searches only these root moves if given
+        :return: (best move, its evaluation)
+        """
+        self.limits = limits or SearchLimits()
+        self.evaluator.reset(board)
+        root_key = zobrist.compute_hash(board)
+        entry = self.transposition_table.probe(root_key, depth)
+        if (entry is not None and root_moves is None and entry[1] >= depth and entry[3] == EXACT
+                and entry[4] is not None and board.is_legal(entry[4]) and self.root_entry_usable(board)):
+            return entry[4], entry[2]  # Already searched at least this deep (possibly in an earlier session)
+        if pv_move is None:
+            pv_move = entry[4] if entry is not None else None
+
+        moves = self.get_ordered_moves(board, pv_move)
+        if root_moves is not None:
+            moves = [move for move in moves if move in root_moves]
+
+        best_move, best_value = None, float('-inf')
+        alpha, beta = float('-inf'), float('inf')
+        for move_index, move in enumerate(moves):
+            child_key = self.push_move(board, move, root_key)
+            if move_index == 0:
+                value = -self.negamax(board, depth - 1, -beta, -alpha, child_key, 1)
+            else:
+                value = -self.negamax(board, depth - 1, -alpha - NULL_WINDOW, -alpha, child_key, 1)
+                if value > alpha:  # The move may be better than the principal variation
+                    value = -self.negamax(board, depth - 1, -beta, -alpha, child_key, 1)
+            self.pop_move(board)
+
+            if value > best_value:
+                best_value, best_move = value, move
+            alpha = max(alpha, value)
+
+        if best_move is not None and root_moves is None:
+            self.transposition_table.store(root_key, depth, best_value, EXACT, best_move)
+        return best_move, best_value
+
+    def negamax(self, board, depth, alpha, beta, key, ply, allow_null=True):
+        """
+        Principal variation search. Scores and the window are from the side to move's point of view.
+
+        :param key: Zobrist key of the position.
+        :param ply: Distance from the root.
+        :param allow_null: False right after a null move, so two null moves never follow each other.
+        :return: Evaluation of the position.
+        """
+        if self.is_draw(board):  # Before the table, whose entries do not depend on the move history
+            return DRAW_SCORE
+
+        alpha_orig = alpha
+
+        entry = self.transposition_table.probe(key, depth, ply)
+        tt_move = None
+        if entry is not None:
+            tt_move = entry[4]
+            if entry[1] >= depth:
+                score, flag = self.from_table(entry[2], ply), entry[3]
+                if flag == EXACT or (flag == LOWER and score >= beta) or (flag == UPPER and score <= alpha):
+                    self.transposition_table.record_cutoff()
+                    return score
+
+        if self.tablebase is not None and chess.popcount(board.occupied) <= self.tablebase.max_pieces:
+            score = self.tablebase.score(board)
+            if score is not None:
+                self.transposition_table.store(key, depth, score, EXACT, None)
+                return score
+
+        self.nodes_explored += 1
+        self.limits.check()
+
+        if depth <= 0:
+            value = self.mate_distance_score(self.quiescence(board, alpha, beta), ply)
+            flag = UPPER if value <= alpha else LOWER if value >= beta else EXACT
+            self.transposition_table.store(key, 0, self.to_table(value, ply), flag, None)
+            return value
+
+        in_check = board.is_check()
+        # The bounds of a null window come out of float arithmetic, so its width is only close to NULL_WINDOW
+        pv_node = beta - alpha > NULL_WINDOW * 1.5
+
+        # Null-move pruning: if passing still fails high, a real move will too
+        if (self.null_move_enabled and allow_null and not pv_node and not in_check
+                and depth >= NULL_MOVE_MIN_DEPTH and self.non_pawn_pieces(board)):
+            if self.evaluator.evaluate(board) >= beta:
+                reduction = 3 if depth > 6 else 2
+                child_key = self.push_move(board, chess.Move.null(), key)
+                value = -self.negamax(board, depth - 1 - reduction, -beta, -beta + NULL_WINDOW, child_key,
+                                      ply + 1, False)
+                self.pop_move(board)
+                if value >= beta and self.non_pawn_pieces(board) <= 2:
+                    # Zugzwang-prone endgame: verify with a reduced search without null moves
+                    value = self.negamax(board, depth - 1 - reduction, beta - NULL_WINDOW, beta, key, ply, False)
+                if value >= beta:
+                    self.null_move_cutoffs += 1
+                    return value
+
+        best_move, best_value = None, float('-inf')
+        move_index = -1
+        for move_index, move in enumerate(self.move_orderer.ordered_moves(board, ply, tt_move)):
+            quiet = not move.promotion and not board.is_capture(move)
+            child_key = self.push_move(board, move, key)
+
+            if move_index == 0:
+                value = -self.negamax(board, depth - 1, -beta, -alpha, child_key, ply + 1)
+            else:
+                # Late move reduction: quiet moves late in the ordering are searched shallower first
+                reduction = 0
+                if (self.lmr_enabled and quiet and not in_check and depth >= LMR_MIN_DEPTH
+                        and move_index >= LMR_MIN_MOVE_INDEX and not board.is_check()):
+                    reduction = 1 if move_index < 8 else 2
+                value = -self.negamax(board, depth - 1 - reduction, -alpha - NULL_WINDOW, -alpha, child_key, ply + 1)
+                if value > alpha and reduction:
+                    self.lmr_researches += 1
+                    value = -self.negamax(board, depth - 1, -alpha - NULL_WINDOW, -alpha, child_key, ply + 1)
+                if alpha < value < beta:  # Null window failed high inside the window: full re-search
+                    value = -self.negamax(board, depth - 1, -beta, -alpha, child_key, ply + 1)
+
+            self.pop_move(board)
+
+            if value > best_value:
+                best_value, best_move = value, move
+                if value > alpha:
+                    alpha = value
+                    if alpha >= beta:
+                        self.move_orderer.record_cutoff(board, move, ply, depth, move_index)
+                        break
+
+        if move_index < 0:  # Checkmate or stalemate
+            value = ply - self.mate_score if board.is_check() else DRAW_SCORE
+            self.transposition_table.store(key, depth, self.to_table(value, ply), EXACT, None)
+            return value
+
+        if best_value <= alpha_orig:
+            flag = UPPER
+        elif best_value >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.transposition_table.store(key, depth, self.to_table(best_value, ply), flag, best_move)
+        return best_value
+
+    @staticmethod
+    def non_pawn_pieces(board):
+        """
+        Number of knights, bishops, rooks and queens of the side to move.
+        """
+        pieces = board.knights | board.bishops | board.rooks | board.queens
+        return (pieces & board.occupied_co[board.turn]).bit_count()
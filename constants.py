@@ -1,2 +1,7 @@
 SQUARE_SIZE = 80
-BOARD_COLORS = ["#f0d9b5", "#b58863"]
\ No newline at end of file
+BOARD_COLORS = ["#f0d9b5", "#b58863"]
+HELP_TIME_LIMIT_MS = 500  # Time budget of the Help search in milliseconds
+OPENING_BOOK_PATH = "book.bin"  # Polyglot opening book used by the bot if the file exists
+SYZYGY_PATH = "syzygy"  # Directory with Syzygy endgame tablebases used if it exists
+CACHE_PATH = "search_cache.sqlite"  # On-disk cache of search results shared across sessions
+PONDER_SLICE_MS = 200  # Time budget of one pondering slice in milliseconds
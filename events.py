@@ -1,4 +1,4 @@
-import threading
+import logging
 from ctypes import c_ushort
 
 import chess
@@ -7,11 +7,15 @@ from chess.svg import board
 import promotion
 import queue
 
+import zobrist
 from board import ChessBoard
 from chess_bot_controller import ChessBotController
-from constants import SQUARE_SIZE
+from help_worker import HelpWorker
+from ponder import Ponderer
+from constants import SQUARE_SIZE, HELP_TIME_LIMIT_MS, OPENING_BOOK_PATH, SYZYGY_PATH, CACHE_PATH, PONDER_SLICE_MS
 from tkinter import messagebox
-from threading import Thread, Event
+
+logger = logging.getLogger(__name__)
 
 
 class ChessEvents:
@@ -24,66 +28,40 @@ class ChessEvents:
         self.selected_square = None  # Зберігає вибрану клітинку для ходу / Stores selected square for move
         self.selected_piece = None  # Зберігає вибрану фігуру для ходу / Stores selected piece for move
 
-        self.help_thread = None  # Потік для Help / Thread for Help
         self.help_active = False  # Індикатор активності кнопки Help / Indicator of Help button activity
-        self.help_stop_event = Event()  # Подія для зупинки потоку Help / Event to stop the Help thread
-        self.bot_controller = ChessBotController(dfs_depth=4, bfs_depth=3, bds_depth=2)  # Контролер бота / Bot controller
+        self.bot_controller = ChessBotController(dfs_depth=4, bfs_depth=3, bds_depth=2,
+                                                 book_path=OPENING_BOOK_PATH, syzygy_dir=SYZYGY_PATH,
+                                                 cache_path=CACHE_PATH)  # Контролер бота / Bot controller
+        self.ponderer = Ponderer(self.bot_controller, PONDER_SLICE_MS)  # Обмірковування / Pondering
         self.data_queue = queue.Queue()  # Черга для передачі даних / Queue for data transfer
-
-        self.event = threading.Event()
+        # Єдиний потік Help, новий запит скасовує застарілий пошук /
+        # Single Help thread, a new request cancels the outdated search
+        self.help_worker = HelpWorker(self.ponderer, HELP_TIME_LIMIT_MS, self.data_queue)
 
     def toggle_help(self):
         """Обробник натискання кнопки Help.
         Handler for Help button click. Toggles the Help state: starts/stops the Help thread."""
         if self.help_active:
             self.help_active = False  # Зупиняємо допомогу / Stop Help
-            print("Help stopped")  # Повідомлення в консолі / Console message
+            logger.info("Help stopped")  # Повідомлення в журналі / Log message
             self.chess_app.help_button_text.set("Help OFF")  # Оновлюємо текст кнопки / Update button text
             self.stop_help()  # Зупиняємо потік допомоги / Stop Help thread
         else:
             self.help_active = True  # Включаємо допомогу / Start Help
-            print("Help running")  # Повідомлення в консолі / Console message
+            logger.info("Help running")  # Повідомлення в журналі / Log message
             self.chess_app.help_button_text.set("Help ON")  # Оновлюємо текст кнопки / Update button text
             self.start_help()  # Запускаємо потік допомоги / Start Help thread
 
     def start_help(self):
-        """Запуск потоку Help.
-        Starts the Help thread."""
-        self.help_stop_event.clear()  # Скидаємо стан події / Clear event state
-        self.help_thread = Thread(target=self.help_thread_function,
-                                  args=(self.data_queue, self.bot_controller, self.event,),
-                                  daemon=True)
-        self.help_thread.start()  # Запускаємо допоміжний потік / Start the help thread
+        """Запуск Help для поточної позиції.
+        Starts Help for the current position."""
+        self.help_worker.submit(self.board.get_board())  # Запит на пошук ходу / Request a move search
 
     def stop_help(self):
-        """Зупинка потоку Help.
-        Stops the Help thread."""
+        """Зупинка Help.
+        Stops Help."""
         self.chess_app.canvas.delete("arrow")  # Видаляємо стрілку на шахівниці / Remove the arrow on the chessboard
-        self.help_stop_event.set()  # Встановлюємо подію для зупинки потоку / Set event to stop the thread
-        # self.help_thread.join()
-
-    def help_thread_function(self, data_queue, bot, event):
-        """Функція, яка виконується у потоці Help для отримання кращого ходу від бота.
-        Function that runs in the Help thread to get the best move from the bot."""
-        while not self.help_stop_event.is_set():  # Перевірка на зупинку потоку / Check if the thread is stopped
-            # while True:
-
-            print("The search is searching")
-            if self.board.is_initial_position():
-                print("The chessboard has changed")
-                move = bot.get_best_move(self.board.get_board())  # Отримуємо кращий хід / Get the best move
-                data_queue.put(move)  # Додаємо хід в чергу / Add move to the queue
-
-            else:
-
-                print("The chessboard has changed")
-                move = bot.get_best_move(self.board.get_board())  # Отримуємо кращий хід / Get the best move
-                data_queue.put(move)  # Додаємо хід в чергу / Add move to the queue
-
-            event.wait()
-
-        # event.set()
-        # continue
+        self.help_worker.cancel()  # Скасовуємо поточний пошук / Cancel the running search
 
     def help_thread_function_1(self, data_queue):
         """Функція для введення ходу користувачем через консоль.
@@ -92,7 +70,8 @@ class ChessEvents:
             move_str = input("Enter your move (f.e, e2e4): ").strip()  # Читання ходу / Reading the move
             move = chess.Move.from_uci(
                 move_str)  # Перетворення введеного ходу в об'єкт ходу / Convert input move to a move object
-            data_queue.put(move)  # Додаємо хід в чергу / Add move to the queue
+            # Додаємо хід у чергу разом із ключем позиції / Add the move to the queue with the position key
+            data_queue.put((zobrist.compute_hash(self.board.get_board()), move))
 
     def on_square_click(self, event):
         """Обробка кліку по клітинці на шахівниці.
@@ -100,7 +79,7 @@ class ChessEvents:
         Handler for square click on the chessboard. Determines the move made by the user after selecting a square."""
         col = event.x // SQUARE_SIZE  # Визначаємо стовпчик клітинки / Calculate the column of the clicked square
         row = event.y // SQUARE_SIZE  # Визначаємо рядок клітинки / Calculate the row of the clicked square
-        print("Check passed 0")  # Debug print / Debug message
+        logger.debug("Check passed 0")  # Debug print / Debug message
 
         row = 7 - row  # Інвертуємо рядок для перевернутого відображення шахівниці / Invert row for flipped board view
 
@@ -110,23 +89,21 @@ class ChessEvents:
             move = chess.Move(self.selected_square, square)  # Створюємо хід / Create the move
             if move in self.board.get_legal_moves():  # Якщо хід допустимий / If the move is legal
                 if self.selected_piece and self.selected_piece.piece_type == chess.PAWN:
-                    print("Check passed 1")  # Debug print / Debug message
+                    logger.debug("Check passed 1")  # Debug print / Debug message
                     if (self.selected_piece.color == chess.WHITE and row == 7) or (
                             self.selected_piece.color == chess.BLACK and row == 0):
-                        print("Check passed 2")  # Debug print / Debug message
-                        print(move)
+                        logger.debug("Check passed 2")  # Debug print / Debug message
+                        logger.debug("%s", move)
                         # Виклик функції для перетворення пішака / Call the function for pawn promotion
                         promotion_move = promotion.get_promotion_choice(self.selected_square, square)
                         if promotion_move:
-                            print("Check passed 3")  # Debug print / Debug message
+                            logger.debug("Check passed 3")  # Debug print / Debug message
                             move = promotion_move  # Заміна стандартного ходу на хід із перетворенням / Replace move with promotion move
-                            print(move)
+                            logger.debug("%s", move)
 
                 self.board.make_move(move)  # Виконуємо хід / Execute the move
                 self.chess_app.update_board()  # Оновлюємо шахівницю / Update the chessboard
                 self.chess_app.canvas.delete("arrow")
-                self.event.set()
-                self.event.clear()
 
                 if self.board.is_game_over():  # Перевірка на закінчення гри / Check if the game is over
                     messagebox.showinfo("Game Over",
@@ -134,20 +111,23 @@ class ChessEvents:
                     self.board.reset()  # Скидаємо шахівницю / Reset the chessboard
                     self.chess_app.update_board()  # Оновлюємо шахівницю після скидання / Update the board after reset
 
+                if self.help_active:  # Новий запит замінює застарілий / The new request supersedes the outdated one
+                    self.help_worker.submit(self.board.get_board())
+
                 self.selected_square = None  # Скидаємо вибір фігури / Reset the selected square
             else:
                 self.selected_square = None  # Скидаємо вибір, якщо хід недійсний / Reset if move is invalid
                 self.chess_app.update_board()  # Оновлюємо шахівницю для видалення підсвічених ходів / Update the board to remove highlighted moves
 
         else:
-            print("Just a square")  # Debug print / Debug message
+            logger.debug("Just a square")  # Debug print / Debug message
             piece = self.board.get_board().piece_at(
                 square)  # Перевірка, чи є фігура на клітинці / Check if there is a piece on the square
             if piece:  # Якщо є фігура на клітинці / If there is a piece on the square
-                print("There is a piece")  # Debug print / Debug message
+                logger.debug("There is a piece")  # Debug print / Debug message
                 self.selected_square = square  # Вибираємо фігуру / Select the piece
                 self.selected_piece = piece  # Запам'ятовуємо вибрану фігуру / Store the selected piece
-                print(self.selected_piece)  # Debug print / Debug message
+                logger.debug("%s", self.selected_piece)  # Debug print / Debug message
                 self.chess_app.update_board()  # Оновлюємо шахівницю для відображення можливих ходів / Update the board to show possible moves
 
     def get_board_state(self):
@@ -0,0 +1,454 @@
+import argparse
+import time
+
+import chess
+
+import zobrist
+
+# Moves are packed into 16 bits like in chess_bot_bds: from square, to square << 6, promotion piece type << 12.
+# Castling is stored as the king's two-square move and en passant as the pawn's diagonal move.
+
+WHITE, BLACK = 1, 0
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(1, 7)
+BB_ALL = chess.BB_ALL
+BB_SQUARES = chess.BB_SQUARES
+KNIGHT_ATTACKS = chess.BB_KNIGHT_ATTACKS
+KING_ATTACKS = chess.BB_KING_ATTACKS
+PAWN_ATTACKS = [chess.BB_PAWN_ATTACKS[chess.BLACK], chess.BB_PAWN_ATTACKS[chess.WHITE]]  # Indexed by color
+DIAG_ATTACKS, DIAG_MASKS = chess.BB_DIAG_ATTACKS, chess.BB_DIAG_MASKS
+FILE_ATTACKS, FILE_MASKS = chess.BB_FILE_ATTACKS, chess.BB_FILE_MASKS
+RANK_ATTACKS, RANK_MASKS = chess.BB_RANK_ATTACKS, chess.BB_RANK_MASKS
+LINE_RAYS = chess.BB_RAYS  # Full line through two aligned squares
+BETWEEN = [[chess.between(a, b) for b in chess.SQUARES] for a in chess.SQUARES]
+# Squares attacked by a rook or a bishop on an empty board
+ROOK_RAYS = [RANK_ATTACKS[square][0] | FILE_ATTACKS[square][0] for square in chess.SQUARES]
+BISHOP_RAYS = [DIAG_ATTACKS[square][0] for square in chess.SQUARES]
+PROMOTION_RANKS = [chess.BB_RANK_1, chess.BB_RANK_8]  # Indexed by color
+DOUBLE_PUSH_RANKS = [chess.BB_RANK_7, chess.BB_RANK_2]
+
+# Polyglot keys of the castling rights (by corner rook square) and en passant files
+CASTLING_KEYS = {chess.H1: zobrist._RANDOM[768], chess.A1: zobrist._RANDOM[769],
+                 chess.H8: zobrist._RANDOM[770], chess.A8: zobrist._RANDOM[771]}
+EP_KEYS = zobrist._RANDOM[772:780]
+CASTLING_CORNERS = chess.BB_A1 | chess.BB_H1 | chess.BB_A8 | chess.BB_H8
+
+
+def encode_move(move):
+    """
+    Packs a chess.Move (standard castling notation) into an int.
+    """
+    return move.from_square | move.to_square << 6 | (move.promotion or 0) << 12
+
+
+def decode_move(packed):
+    """
+    Unpacks an int into a chess.Move.
+    """
+    return chess.Move(packed & 63, packed >> 6 & 63, packed >> 12 or None)
+
+
+class FastBoard:
+    def __init__(self, board=None):
+        """
+        Search-oriented board: piece-type and color bitboards, a mailbox of piece types, moves packed into ints,
+        legal move generation from pins and checkers (no trial make/unmake) and make/unmake with an undo
+        stack. The Zobrist key is updated incrementally and equals zobrist.compute_hash of the same position.
+        Standard chess only (no Chess960 castling).
+
+        :param board: chess.Board to copy (the starting position by default).
+        """
+        board = board or chess.Board()
+        self.pieces = [0, board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings]
+        self.occupied_co = [board.occupied_co[chess.BLACK], board.occupied_co[chess.WHITE]]
+        self.mailbox = [board.piece_type_at(square) or 0 for square in chess.SQUARES]
+        self.turn = WHITE if board.turn == chess.WHITE else BLACK
+        self.castling = board.clean_castling_rights() & CASTLING_CORNERS
+        self.ep_square = board.ep_square
+        self.halfmove_clock = board.halfmove_clock
+        self.fullmove_number = board.fullmove_number
+        self.key = zobrist.compute_hash(board)
+        self.stack = []  # (move, moved piece type, captured piece type, castling, ep square, halfmove clock, key)
+
+    def to_board(self):
+        """
+        Converts the position (without the move history) to a chess.Board.
+        """
+        board = chess.Board.empty()
+        board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings = self.pieces[1:]
+        board.occupied_co[chess.WHITE], board.occupied_co[chess.BLACK] = self.occupied_co[WHITE], self.occupied_co[BLACK]
+        board.occupied = self.occupied_co[WHITE] | self.occupied_co[BLACK]
+        board.turn = self.turn == WHITE
+        board.castling_rights = self.castling
+        board.ep_square = self.ep_square
+        board.halfmove_clock = self.halfmove_clock
+        board.fullmove_number = self.fullmove_number
+        return board
+
+    def attackers(self, color, square, occupied):
+        """
+        Pieces of color attacking square with the given occupancy.
+        """
+        pieces = self.pieces
+        queens = pieces[QUEEN]
+        return self.occupied_co[color] & (
+            KNIGHT_ATTACKS[square] & pieces[KNIGHT]
+            | KING_ATTACKS[square] & pieces[KING]
+            | PAWN_ATTACKS[color ^ 1][square] & pieces[PAWN]
+            | (RANK_ATTACKS[square][occupied & RANK_MASKS[square]]
+               | FILE_ATTACKS[square][occupied & FILE_MASKS[square]]) & (pieces[ROOK] | queens)
+            | DIAG_ATTACKS[square][occupied & DIAG_MASKS[square]] & (pieces[BISHOP] | queens))
+
+    def is_check(self):
+        king = (self.pieces[KING] & self.occupied_co[self.turn]).bit_length() - 1
+        return bool(self.attackers(self.turn ^ 1, king, self.occupied_co[0] | self.occupied_co[1]))
+
+    def is_checkmate(self):
+        return self.is_check() and not self.legal_moves()
+
+    def legal_moves(self):
+        """
+        Generates the legal moves.
+
+        :return: List of packed moves.
+        """
+        us = self.turn
+        them = us ^ 1
+        pieces = self.pieces
+        our = self.occupied_co[us]
+        their = self.occupied_co[them]
+        occupied = our | their
+        not_our = ~our & BB_ALL
+        king = (pieces[KING] & our).bit_length() - 1
+        moves = []
+        append = moves.append
+
+        # King moves: the king itself must not block the ray of a slider checking it
+        without_king = occupied ^ BB_SQUARES[king]
+        targets = KING_ATTACKS[king] & not_our
+        while targets:
+            to_bb = targets & -targets
+            targets ^= to_bb
+            to_square = to_bb.bit_length() - 1
+            if not self.attackers(them, to_square, without_king):
+                append(king | to_square << 6)
+
+        checkers = self.attackers(them, king, occupied)
+        if checkers & (checkers - 1):
+            return moves  # Double check: only the king can move
+        if checkers:
+            # Capture the checker or block its ray
+            target_mask = BETWEEN[king][checkers.bit_length() - 1] | checkers
+        else:
+            target_mask = BB_ALL
+            self.castling_moves(us, king, occupied, append)
+
+        # Pinned pieces may only move along the line of the pin
+        rook_likes = pieces[ROOK] | pieces[QUEEN]
+        bishop_likes = pieces[BISHOP] | pieces[QUEEN]
+        snipers = (ROOK_RAYS[king] & rook_likes | BISHOP_RAYS[king] & bishop_likes) & their
+        pins = {}
+        while snipers:
+            sniper_bb = snipers & -snipers
+            snipers ^= sniper_bb
+            sniper = sniper_bb.bit_length() - 1
+            blockers = BETWEEN[king][sniper] & occupied
+            if blockers and not blockers & (blockers - 1) and blockers & our:
+                pins[blockers] = LINE_RAYS[king][sniper]
+
+        target_mask &= not_our
+        for piece_type in (KNIGHT, BISHOP, ROOK, QUEEN):
+            sources = pieces[piece_type] & our
+            while sources:
+                from_bb = sources & -sources
+                sources ^= from_bb
+                from_square = from_bb.bit_length() - 1
+                if piece_type == KNIGHT:
+                    if from_bb in pins:
+                        continue  # A pinned knight can never stay on the line
+                    targets = KNIGHT_ATTACKS[from_square]
+                elif piece_type == BISHOP:
+                    targets = DIAG_ATTACKS[from_square][occupied & DIAG_MASKS[from_square]]
+                elif piece_type == ROOK:
+                    targets = (RANK_ATTACKS[from_square][occupied & RANK_MASKS[from_square]]
+                               | FILE_ATTACKS[from_square][occupied & FILE_MASKS[from_square]])
+                else:
+                    targets = (DIAG_ATTACKS[from_square][occupied & DIAG_MASKS[from_square]]
+                               | RANK_ATTACKS[from_square][occupied & RANK_MASKS[from_square]]
+                               | FILE_ATTACKS[from_square][occupied & FILE_MASKS[from_square]])
+                targets &= target_mask
+                if from_bb in pins:
+                    targets &= pins[from_bb]
+                while targets:
+                    to_bb = targets & -targets
+                    targets ^= to_bb
+                    append(from_square | (to_bb.bit_length() - 1) << 6)
+
+        self.pawn_moves(us, king, occupied, their, target_mask, pins, append)
+        return moves
+
+    def pawn_moves(self, us, king, occupied, their, target_mask, pins, append):
+        """
+        Appends the legal pawn moves (target_mask: squares that resolve a check, without our pieces).
+        """
+        forward = 8 if us == WHITE else -8
+        promotion_rank = PROMOTION_RANKS[us]
+        double_push_rank = DOUBLE_PUSH_RANKS[us]
+        attacks = PAWN_ATTACKS[us]
+        ep_square = self.ep_square
+        ep_bb = BB_SQUARES[ep_square] if ep_square is not None else 0
+
+        sources = self.pieces[PAWN] & self.occupied_co[us]
+        while sources:
+            from_bb = sources & -sources
+            sources ^= from_bb
+            from_square = from_bb.bit_length() - 1
+            mask = target_mask & pins[from_bb] if from_bb in pins else target_mask
+
+            targets = attacks[from_square] & their & mask
+            to_square = from_square + forward
+            to_bb = BB_SQUARES[to_square]
+            if not to_bb & occupied:
+                targets |= to_bb & mask
+                if from_bb & double_push_rank:
+                    double_bb = BB_SQUARES[to_square + forward]
+                    if not double_bb & occupied:
+                        targets |= double_bb & mask
+            while targets:
+                to_bb = targets & -targets
+                targets ^= to_bb
+                move = from_square | (to_bb.bit_length() - 1) << 6
+                if to_bb & promotion_rank:
+                    append(move | QUEEN << 12)
+                    append(move | ROOK << 12)
+                    append(move | BISHOP << 12)
+                    append(move | KNIGHT << 12)
+                else:
+                    append(move)
+
+            if attacks[from_square] & ep_bb:
+                # En passant removes two pieces from a line, so its legality is checked on the resulting occupancy
+                captured_bb = BB_SQUARES[ep_square - forward]
+                after = occupied ^ from_bb ^ captured_bb | ep_bb
+                if not self.attackers(us ^ 1, king, after) & ~captured_bb:
+                    append(from_square | ep_square << 6)
+
+    def castling_moves(self, us, king, occupied, append):
+        """
+        Appends the legal castling moves (the king is not in check).
+        """
+        rights = self.castling & (chess.BB_RANK_1 if us == WHITE else chess.BB_RANK_8)
+        if not rights:
+            return
+        them = us ^ 1
+        back_rank = king & 56
+        if rights & BB_SQUARES[back_rank + 7] and not occupied & BETWEEN[king][back_rank + 7] and \
+                not self.attackers(them, king + 1, occupied) and not self.attackers(them, king + 2, occupied):
+            append(king | (king + 2) << 6)
+        if rights & BB_SQUARES[back_rank] and not occupied & BETWEEN[king][back_rank] and \
+                not self.attackers(them, king - 1, occupied) and not self.attackers(them, king - 2, occupied):
+            append(king | (king - 2) << 6)
+
+    def state_key(self):
+        """
+        Part of the Zobrist key that depends on the castling rights and the en passant square.
+        """
+        key = 0
+        castling = self.castling
+        while castling:
+            corner = castling & -castling
+            castling ^= corner
+            key ^= CASTLING_KEYS[corner.bit_length() - 1]
+        ep_square = self.ep_square
+        if ep_square is not None and \
+                PAWN_ATTACKS[self.turn ^ 1][ep_square] & self.pieces[PAWN] & self.occupied_co[self.turn]:
+            key ^= EP_KEYS[ep_square & 7]
+        return key
+
+    def make(self, move):
+        """
+        Makes a legal packed move.
+        """
+        from_square = move & 63
+        to_square = move >> 6 & 63
+        promotion = move >> 12
+        us = self.turn
+        them = us ^ 1
+        pieces = self.pieces
+        occupied_co = self.occupied_co
+        mailbox = self.mailbox
+        our_keys = zobrist.PIECE_KEYS[us]
+        from_bb = BB_SQUARES[from_square]
+        to_bb = BB_SQUARES[to_square]
+        piece_type = mailbox[from_square]
+        captured = mailbox[to_square]
+        self.stack.append((move, piece_type, captured, self.castling, self.ep_square, self.halfmove_clock, self.key))
+
+        key = self.key ^ self.state_key()
+        self.halfmove_clock += 1
+        if captured:
+            pieces[captured] ^= to_bb
+            occupied_co[them] ^= to_bb
+            key ^= zobrist.PIECE_KEYS[them][captured][to_square]
+            self.halfmove_clock = 0
+
+        pieces[piece_type] ^= from_bb | to_bb
+        occupied_co[us] ^= from_bb | to_bb
+        mailbox[from_square] = 0
+        mailbox[to_square] = piece_type
+        key ^= our_keys[piece_type][from_square] ^ our_keys[piece_type][to_square]
+
+        ep_square = self.ep_square
+        self.ep_square = None
+        if piece_type == PAWN:
+            self.halfmove_clock = 0
+            if to_square == ep_square:
+                captured_square = to_square - 8 if us == WHITE else to_square + 8
+                captured_bb = BB_SQUARES[captured_square]
+                pieces[PAWN] ^= captured_bb
+                occupied_co[them] ^= captured_bb
+                mailbox[captured_square] = 0
+                key ^= zobrist.PIECE_KEYS[them][PAWN][captured_square]
+            elif to_square - from_square in (16, -16):
+                self.ep_square = (from_square + to_square) // 2
+            elif promotion:
+                pieces[PAWN] ^= to_bb
+                pieces[promotion] |= to_bb
+                mailbox[to_square] = promotion
+                key ^= our_keys[PAWN][to_square] ^ our_keys[promotion][to_square]
+        elif piece_type == KING:
+            self.castling &= ~(chess.BB_RANK_1 if us == WHITE else chess.BB_RANK_8)
+            if to_square - from_square in (2, -2):
+                rook_from = to_square + 1 if to_square > from_square else to_square - 2
+                rook_to = (from_square + to_square) // 2
+                rook_bb = BB_SQUARES[rook_from] | BB_SQUARES[rook_to]
+                pieces[ROOK] ^= rook_bb
+                occupied_co[us] ^= rook_bb
+                mailbox[rook_from] = 0
+                mailbox[rook_to] = ROOK
+                key ^= our_keys[ROOK][rook_from] ^ our_keys[ROOK][rook_to]
+        self.castling &= ~(from_bb | to_bb)
+
+        if us == BLACK:
+            self.fullmove_number += 1
+        self.turn = them
+        self.key = key ^ self.state_key() ^ zobrist.TURN_KEY
+
+    def unmake(self):
+        """
+        Takes back the last move.
+        """
+        move, piece_type, captured, self.castling, self.ep_square, self.halfmove_clock, self.key = self.stack.pop()
+        from_square = move & 63
+        to_square = move >> 6 & 63
+        promotion = move >> 12
+        them = self.turn
+        us = them ^ 1
+        self.turn = us
+        if us == BLACK:
+            self.fullmove_number -= 1
+        pieces = self.pieces
+        occupied_co = self.occupied_co
+        mailbox = self.mailbox
+        from_bb = BB_SQUARES[from_square]
+        to_bb = BB_SQUARES[to_square]
+
+        if promotion:
+            pieces[promotion] ^= to_bb
+            pieces[PAWN] |= to_bb
+        pieces[piece_type] ^= from_bb | to_bb
+        occupied_co[us] ^= from_bb | to_bb
+        mailbox[from_square] = piece_type
+        mailbox[to_square] = captured
+        if captured:
+            pieces[captured] |= to_bb
+            occupied_co[them] |= to_bb
+        elif piece_type == PAWN and to_square == self.ep_square:
+            captured_square = to_square - 8 if us == WHITE else to_square + 8
+            captured_bb = BB_SQUARES[captured_square]
+            pieces[PAWN] |= captured_bb
+            occupied_co[them] |= captured_bb
+            mailbox[captured_square] = PAWN
+        elif piece_type == KING and to_square - from_square in (2, -2):
+            rook_from = to_square + 1 if to_square > from_square else to_square - 2
+            rook_to = (from_square + to_square) // 2
+            rook_bb = BB_SQUARES[rook_from] | BB_SQUARES[rook_to]
+            pieces[ROOK] ^= rook_bb
+            occupied_co[us] ^= rook_bb
+            mailbox[rook_from] = ROOK
+            mailbox[rook_to] = 0
+
+    def perft(self, depth):
+        """
+        Number of leaf positions at the given depth (the last ply is counted without making the moves).
+        """
+        moves = self.legal_moves()
+        if depth <= 1:
+            return len(moves) if depth == 1 else 1
+        nodes = 0
+        make, unmake, perft = self.make, self.unmake, self.perft
+        for move in moves:
+            make(move)
+            nodes += perft(depth - 1)
+            unmake()
+        return nodes
+
+
+def python_chess_perft(board, depth):
+    """
+    Reference perft on chess.Board with the same leaf counting.
+    """
+    moves = list(board.generate_legal_moves())
+    if depth <= 1:
+        return len(moves) if depth == 1 else 1
+    nodes = 0
+    for move in moves:
+        board.push(move)
+        nodes += python_chess_perft(board, depth - 1)
+        board.pop()
+    return nodes
+
+
+# Standard perft positions with their node counts {depth: nodes}
+PERFT_SUITE = {
+    chess.STARTING_FEN: {1: 20, 2: 400, 3: 8902, 4: 197281},
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1": {1: 48, 2: 2039, 3: 97862},
+    "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1": {1: 14, 2: 191, 3: 2812, 4: 43238, 5: 674624},
+    "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1": {1: 6, 2: 264, 3: 9467, 4: 422333},
+    "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8": {1: 44, 2: 1486, 3: 62379},
+    "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10": {1: 46, 2: 2079, 3: 89890},
+}
+
+
+def compare_perft(max_depth=3):
+    """
+    Runs the perft suite on FastBoard and chess.Board.
+
+    :return: List of (FEN, depth, nodes, expected nodes, FastBoard NPS, python-chess NPS).
+    """
+    results = []
+    for fen, counts in PERFT_SUITE.items():
+        depth = min(max_depth, max(counts))
+        start = time.perf_counter()
+        nodes = FastBoard(chess.Board(fen)).perft(depth)
+        fast_time = time.perf_counter() - start
+        start = time.perf_counter()
+        python_chess_perft(chess.Board(fen), depth)
+        reference_time = time.perf_counter() - start
+        results.append((fen, depth, nodes, counts[depth], nodes / fast_time, nodes / reference_time))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perft of FastBoard compared with python-chess")
+    parser.add_argument("--depth", type=int, default=3, help="maximum perft depth")
+    args = parser.parse_args()
+
+    print(f"{'position':<12}{'depth':>6}{'nodes':>10}{'FastBoard NPS':>15}{'python-chess NPS':>18}{'speedup':>9}")
+    for fen, depth, nodes, expected, fast_nps, reference_nps in compare_perft(args.depth):
+        status = "" if nodes == expected else f"  MISMATCH (expected {expected})"
+        print(f"{fen[:10]:<12}{depth:>6}{nodes:>10}{fast_nps:>15.0f}{reference_nps:>18.0f}"
+              f"{fast_nps / reference_nps:>8.1f}x{status}")
+
+
+if __name__ == "__main__":
+    main()
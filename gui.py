@@ -1,3 +1,4 @@
+import logging
 import time
 import tkinter as tk
 
@@ -9,6 +10,8 @@ from events import ChessEvents
 from constants import SQUARE_SIZE, BOARD_COLORS
 from graphics import Graphics
 
+logger = logging.getLogger(__name__)
+
 
 class ChessApp:
     def __init__(self, root):
@@ -85,7 +88,7 @@ class ChessApp:
             for move in legal_moves:
                 if move.from_square == self.events.selected_square:
                     move_count += 1  # Інкрементуємо лічильник / Increment the counter
-                    print(f"{move} - Кількість: {move_count}")  # Виводимо хід і кількість виконаних ходів / Print move and count
+                    logger.debug("%s - Кількість: %d", move, move_count)  # Виводимо хід і кількість виконаних ходів / Log move and count
                     dest_row, dest_col = divmod(move.to_square, 8)
                     dest_row = 7 - dest_row  # Інвертуємо рядок для відображення на перевернутій шахівниці / Invert row for flipped board
 
@@ -121,7 +124,7 @@ class ChessApp:
                     # Визначаємо колір фігури та її тип / Determine piece color and type
                     color = 'w' if piece.color else 'b'
                     piece_name = f"{color}{piece.symbol()}".lower()  # Наприклад: 'wr', 'bn' / Example: 'wr', 'bn'
-                    print(piece_name)
+                    logger.debug("%s", piece_name)
                     row = 7 - i
                     col = j
                     # Створюємо зображення фігури на нових координатах / Create piece image at new coordinates
@@ -0,0 +1,64 @@
+import logging
+import threading
+
+import zobrist
+from iterative_deepening import CancellationToken
+
+logger = logging.getLogger(__name__)
+
+
+class HelpWorker:
+    def __init__(self, ponderer, time_limit_ms, results):
+        """
+        Single long-lived thread computing the Help moves. A new request supersedes the running one, whose search
+        is cancelled cooperatively, so no search keeps running for a position that no longer exists. Between
+        requests the thread ponders. Results are tagged with the Zobrist key of their position, so the receiver
+        can drop answers that arrive after the position has changed.
+
+        :param ponderer: Ponderer answering the requests and pondering between them.
+        :param time_limit_ms: Time budget of one search in milliseconds.
+        :param results: Queue receiving (position key, move) tuples.
+        """
+        self.ponderer = ponderer
+        self.time_limit_ms = time_limit_ms
+        self.results = results
+        self.condition = threading.Condition()
+        self.request = None  # Copy of the board of the newest request
+        self.token = CancellationToken()  # Token of the running search session
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def submit(self, board):
+        """
+        Requests a move for the position, cancelling the running search.
+        """
+        with self.condition:
+            self.token.cancel()
+            self.request = board.copy()
+            self.condition.notify()
+
+    def cancel(self):
+        """
+        Cancels the running search and any waiting request.
+        """
+        with self.condition:
+            self.token.cancel()
+            self.request = None
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.request is None:
+                    self.condition.wait()
+                board, self.request = self.request, None
+                # The token is replaced under the lock, so a later submit() always cancels this session
+                token = self.token = CancellationToken()
+
+            key = zobrist.compute_hash(board)
+            move = self.ponderer.best_move(board.copy(), self.time_limit_ms, token)
+            if move is None or token.cancelled:
+                continue  # Superseded by a newer request
+            self.results.put((key, move))
+            logger.info("Ponder hit rate: %.0f%%, average Help latency: %.0f ms", self.ponderer.hit_rate() * 100,
+                        self.ponderer.average_latency_ms())
+            self.ponderer.ponder(board, move, token)
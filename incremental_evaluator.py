@@ -0,0 +1,134 @@
+import chess
+
+from position_evaluator import PositionEvaluator
+
+
+class IncrementalEvaluator(PositionEvaluator):
+    def __init__(self, use_bitboards=True, weights_file=None):
+        """
+        Position evaluator that keeps the material, center (piece-square) and pawn structure terms
+        as running accumulators. The search calls on_push/on_pop around every move, so a leaf
+        evaluation only has to compute the dynamic terms. The score is identical to PositionEvaluator.evaluate.
+
+        :param use_bitboards: Compute the dynamic terms with bitboards (see PositionEvaluator).
+        :param weights_file: JSON file with the piece values and term weights (see PositionEvaluator).
+        """
+        super().__init__(use_bitboards, weights_file)
+
+        # Piece-square values of the center term for a black piece (white pieces count negatively)
+        self.center_table = [0.0] * 64
+        for square in self.center_squares:
+            self.center_table[square] = 0.5
+        for square in self.wider_center:
+            self.center_table[square] = 0.25
+
+        self.material = 0  # Material balance from black's point of view
+        self.center = 0  # Center control from black's point of view
+        self.pawn_files = [0] * 8  # Number of pawns (of both colors) on each file
+        self.pawns = 0  # Pawn structure score computed from pawn_files
+        self.history = []  # Accumulator values before every pushed move
+        self.synced_length = None  # Length of the move stack the accumulators belong to
+
+    def reset(self, board):
+        """
+        Recomputes the accumulators from scratch for the given position.
+        """
+        self.material = self.material_balance(board)
+        self.center = self.center_control(board)
+        self.pawn_files = [0] * 8
+        for square in board.pieces(chess.PAWN, chess.WHITE) | board.pieces(chess.PAWN, chess.BLACK):
+            self.pawn_files[chess.square_file(square)] += 1
+        self.pawns = self.pawn_files_score(self.pawn_files)
+        self.history = []
+        self.synced_length = len(board.move_stack)
+
+    def on_push(self, board, move):
+        """
+        Updates the accumulators for a move that is about to be pushed.
+        """
+        self.history.append((self.material, self.center, self.pawns, self.pawn_files))
+        self.synced_length += 1
+        if not move:  # Null move
+            return
+
+        color = board.turn
+        sign = 1 if color == chess.BLACK else -1
+        from_square, to_square = move.from_square, move.to_square
+        piece_type = board.piece_type_at(from_square)
+        pawn_files = None  # Copy of pawn_files, made only if a pawn moves or disappears
+
+        if board.is_castling(move):
+            back_rank = from_square & 56
+            kingside = board.is_kingside_castling(move)
+            if board.piece_type_at(to_square) == chess.ROOK:
+                rook_from = to_square
+            else:
+                rook_from = back_rank + (7 if kingside else 0)
+            king_to = back_rank + (6 if kingside else 2)
+            rook_to = back_rank + (5 if kingside else 3)
+            table = self.center_table
+            self.center += sign * (table[king_to] - table[from_square] + table[rook_to] - table[rook_from])
+            return
+
+        # The captured piece leaves the board
+        if board.is_en_passant(move):
+            captured_square = to_square - 8 if color == chess.WHITE else to_square + 8
+            captured_type = chess.PAWN
+        else:
+            captured_square = to_square
+            captured_type = board.piece_type_at(to_square)
+        if captured_type:
+            self.material += sign * self.piece_values[captured_type]
+            self.center += sign * self.center_table[captured_square]
+            if captured_type == chess.PAWN:
+                pawn_files = self.pawn_files[:]
+                pawn_files[chess.square_file(captured_square)] -= 1
+
+        # The moving piece changes square (and possibly type)
+        self.center += sign * (self.center_table[to_square] - self.center_table[from_square])
+        if piece_type == chess.PAWN:
+            if pawn_files is None:
+                pawn_files = self.pawn_files[:]
+            pawn_files[chess.square_file(from_square)] -= 1
+            if move.promotion:
+                self.material += sign * (self.piece_values[move.promotion] - self.piece_values[chess.PAWN])
+            else:
+                pawn_files[chess.square_file(to_square)] += 1
+
+        if pawn_files is not None:
+            self.pawn_files = pawn_files
+            self.pawns = self.pawn_files_score(pawn_files)
+
+    def on_pop(self, board):
+        """
+        Restores the accumulators after a move was popped.
+        """
+        self.material, self.center, self.pawns, self.pawn_files = self.history.pop()
+        self.synced_length -= 1
+
+    def evaluate(self, board, moves=None):
+        """
+        Overall position evaluation using the accumulated static terms
+
+        :param moves: Legal moves of the position if the search has already generated them
+        """
+        self.evaluations += 1
+        if self.synced_length != len(board.move_stack):  # The board was changed without the hooks
+            self.reset(board)
+
+        multiplier = 1 if board.turn == chess.BLACK else -1
+        return self.combine_terms(board, self.material, self.center, self.pawns, moves) * multiplier
+
+    @staticmethod
+    def pawn_files_score(pawn_files):
+        """
+        Pawn structure score (same as PositionEvaluator.pawn_structure) from the pawn count of every file.
+        """
+        score = 0
+        for file, count in enumerate(pawn_files):
+            if count > 1:
+                score -= 0.5  # Doubled pawns
+            if count == 1:
+                if not ((file > 0 and pawn_files[file - 1]) or (file < 7 and pawn_files[file + 1])):
+                    score -= 0.5  # Isolated pawns
+        return score
@@ -0,0 +1,102 @@
+import time
+
+MAX_DEPTH = 64  # Depth cap of a search limited only by time
+
+
+class SearchAborted(Exception):
+    """
+    Raised inside a search when its limits are exceeded.
+    """
+
+
+class CancellationToken:
+    def __init__(self):
+        """
+        Cooperative cancellation of a search session: another thread calls cancel(), and the search notices it
+        at its next limits check and unwinds.
+        """
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class SearchLimits:
+    CHECK_INTERVAL = 256  # Number of nodes between two clock checks
+
+    def __init__(self, time_limit_ms=None, token=None, node_limit=None):
+        """
+        Limits of a single search.
+
+        :param time_limit_ms: Wall-clock budget in milliseconds (None for no limit).
+        :param token: CancellationToken of the search session (optional).
+        :param node_limit: Node budget (None for no limit), enforced with a precision of CHECK_INTERVAL nodes.
+        """
+        self.deadline = None if time_limit_ms is None else time.monotonic() + time_limit_ms / 1000
+        self.token = token
+        self.node_limit = node_limit
+        self.nodes = 0  # Nodes checked so far, counted every CHECK_INTERVAL nodes
+        self.countdown = self.CHECK_INTERVAL
+
+    def check(self, nodes=1):
+        """
+        Called once per node (or once per batch of nodes). Raises SearchAborted when the budget is used up.
+        """
+        self.countdown -= nodes
+        if self.countdown > 0:
+            return
+        self.nodes += self.CHECK_INTERVAL - self.countdown
+        self.countdown = self.CHECK_INTERVAL
+        if self.expired():
+            raise SearchAborted()
+
+    def expired(self):
+        """
+        Checks whether the budget is used up or the search was cancelled.
+        """
+        if self.token is not None and self.token.cancelled:
+            return True
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            return True
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+
+def iterative_deepening(board, search_depth, max_depth, time_limit_ms=None, on_iteration=None, token=None,
+                        node_limit=None):
+    """
+    Searches depth 1, 2, 3... until max_depth is reached or the time budget runs out.
+
+    :param board: chess.Board object; it is restored if an iteration is aborted.
+    :param search_depth: Function (board, depth, limits, pv_move) -> (move, score) searching one iteration.
+        pv_move is the best move of the previous iteration and should be searched first.
+    :param max_depth: Deepest iteration to search.
+    :param time_limit_ms: Wall-clock budget in milliseconds (None for no limit).
+    :param on_iteration: Optional function (depth, move, score) called after every completed iteration.
+    :param token: CancellationToken of the search session; unlike the time budget it also interrupts
+        the first iteration, so a cancelled search may return no move.
+    :param node_limit: Node budget of the iterations after the first one.
+    :return: (best move, its score, depth of the last fully searched iteration).
+    """
+    limits = SearchLimits(time_limit_ms, token, node_limit)
+    stack_size = len(board.move_stack)
+    best_move, best_score, completed_depth = None, None, 0
+
+    for depth in range(1, max_depth + 1):
+        # The first iteration is always completed, so that there is a move to return
+        try:
+            move, score = search_depth(board, depth, limits if depth > 1 else SearchLimits(None, token), best_move)
+        except SearchAborted:
+            while len(board.move_stack) > stack_size:  # We revert the moves of the interrupted iteration
+                board.pop()
+            break
+
+        if move is None:
+            break
+        best_move, best_score, completed_depth = move, score, depth
+        if on_iteration is not None:
+            on_iteration(depth, move, score)
+
+        if limits.expired() or board.legal_moves.count() == 1:
+            break
+
+    return best_move, best_score, completed_depth
@@ -1,20 +1,26 @@
+import logging
 import tkinter as tk
 
+import zobrist
 from gui import ChessApp
 
+logger = logging.getLogger(__name__)
+
 
 def main():
+    # Налагоджувальні повідомлення вмикаються рівнем DEBUG / Debug messages are enabled with the DEBUG level
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
     root = tk.Tk()
     app = ChessApp(root)
-    app.events.event.set()
-    app.events.event.clear()
 
     # Постійне оновлення головного вікна для перевірки нових даних /
     # Constantly refreshing the main window to check for new data
     def check_for_data():
         while not app.events.data_queue.empty():
-            move = app.events.data_queue.get()
-            print(f"Move obtained: {move}")  # Received move
+            key, move = app.events.data_queue.get()
+            if not app.events.help_active or key != zobrist.compute_hash(app.events.board.get_board()):
+                continue  # Відповідь для застарілої позиції / Answer for an outdated position
+            logger.info("Move obtained: %s", move)  # Отриманий хід / Received move
             app.draw_move_arrow(move)  # Виклик функції для відображення ходу / Calling the function to display the move
         root.after(100, check_for_data)
 
@@ -0,0 +1,124 @@
+import chess
+
+from see import SEE_VALUES, see
+
+MAX_PLY = 128  # Deepest ply with killer move slots
+
+
+def mvv_lva(board, move):
+    """
+    Most valuable victim / least valuable attacker score of a capture (promotions count as captures).
+    """
+    victim = chess.PAWN if board.is_en_passant(move) else (board.piece_type_at(move.to_square) or 0)
+    return victim * 8 - board.piece_type_at(move.from_square) + (move.promotion or 0) * 8
+
+
+class MoveOrderer:
+    def __init__(self):
+        """
+        Move ordering for alpha-beta search: the transposition table move first, then captures by MVV-LVA,
+        then two killer moves per ply, then captures that lose material in the static exchange, then quiet
+        moves by the history heuristic. Moves are generated in stages, so quiet moves are not generated at all
+        when a capture causes a cut-off.
+        """
+        self.killers = [[None, None] for _ in range(MAX_PLY)]  # Quiet moves that caused cut-offs at every ply
+        self.history = [0] * (2 * 64 * 64)  # Butterfly table indexed by color, from square and to square
+        self.reset_stats()
+
+    def reset_stats(self):
+        """
+        Resets the cut-off statistics.
+        """
+        self.cutoffs = 0  # Number of beta cut-offs
+        self.first_move_cutoffs = 0  # Number of beta cut-offs caused by the first searched move
+
+    def new_search(self):
+        """
+        Prepares the tables for a new search: killers are cleared and the history is aged.
+        """
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        self.history = [value // 2 for value in self.history]
+        self.reset_stats()
+
+    def ordered_moves(self, board, ply, tt_move=None):
+        """
+        Generates the legal moves of the position in stages.
+
+        :param board: Current chessboard.
+        :param ply: Distance from the root (selects the killer slots).
+        :param tt_move: Best move stored in the transposition table, searched first.
+        :return: Generator of legal moves.
+        """
+        searched = set()
+
+        # Stage 1: the transposition table move (it may come from a key collision, so legality is checked)
+        if tt_move is not None and board.is_legal(tt_move):
+            searched.add(tt_move)
+            yield tt_move
+
+        # Stage 2: captures and promotions, most valuable victim first
+        them = board.occupied_co[not board.turn]
+        captures = [move for move in board.generate_legal_moves(chess.BB_ALL, them) if move not in searched]
+        captures += [move for move in board.generate_legal_ep() if move not in searched]
+        captures += [move for move in board.generate_legal_moves(board.pawns, chess.BB_BACKRANKS & ~them)
+                     if move.promotion and move not in searched]
+        captures.sort(key=lambda move: mvv_lva(board, move), reverse=True)
+        losing_captures = []
+        for move in captures:
+            # Only captures of a cheaper piece can lose material, the exchange is evaluated for them only
+            victim = chess.PAWN if board.is_en_passant(move) else board.piece_type_at(move.to_square)
+            if (not move.promotion and SEE_VALUES[victim] < SEE_VALUES[board.piece_type_at(move.from_square)]
+                    and see(board, move) < 0):
+                losing_captures.append(move)
+                continue
+            searched.add(move)
+            yield move
+
+        # Stage 3: killer moves of this ply
+        for killer in self.killers[min(ply, MAX_PLY - 1)]:
+            if killer is not None and killer not in searched and board.is_legal(killer):
+                searched.add(killer)
+                yield killer
+
+        # Stage 4: captures that lose material, in MVV-LVA order
+        for move in losing_captures:
+            if move not in searched:
+                searched.add(move)
+                yield move
+
+        # Stage 5: the remaining quiet moves, ordered by history
+        history = self.history
+        offset = 4096 if board.turn == chess.WHITE else 0
+        quiets = [move for move in board.generate_legal_moves(chess.BB_ALL, ~them & chess.BB_ALL)
+                  if move not in searched]
+        quiets.sort(key=lambda move: history[offset + move.from_square * 64 + move.to_square], reverse=True)
+        yield from quiets
+
+    def record_cutoff(self, board, move, ply, depth, move_index):
+        """
+        Updates the killer and history tables after a beta cut-off.
+
+        :param board: Position in which the move caused the cut-off (before the move is made).
+        :param move: Move that caused the cut-off.
+        :param ply: Distance from the root.
+        :param depth: Remaining depth of the node.
+        :param move_index: Position of the move in the ordering (0 for the first move).
+        """
+        self.cutoffs += 1
+        if move_index == 0:
+            self.first_move_cutoffs += 1
+
+        if board.is_capture(move) or move.promotion:
+            return
+        killers = self.killers[min(ply, MAX_PLY - 1)]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+        offset = 4096 if board.turn == chess.WHITE else 0
+        self.history[offset + move.from_square * 64 + move.to_square] += depth * depth
+
+    def first_move_cutoff_rate(self):
+        """
+        Share of beta cut-offs caused by the first searched move (ideally above 90%).
+        """
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
@@ -0,0 +1,171 @@
+import argparse
+import mmap
+import os
+import random
+import struct
+
+import chess
+import chess.pgn
+
+import zobrist
+
+ENTRY_FORMAT = ">QHHI"  # Polyglot entry: key, move, weight, learn (big-endian)
+ENTRY_SIZE = struct.calcsize(ENTRY_FORMAT)  # 16 bytes
+_KEY = struct.Struct(">Q")
+_ENTRY = struct.Struct(ENTRY_FORMAT)
+
+
+def decode_move(board, raw_move):
+    """
+    Converts a Polyglot move to a chess.Move. Castling is stored as king takes rook.
+
+    :return: The move, or None if it is not legal in the position (e.g. a key collision).
+    """
+    to_square = raw_move & 63
+    from_square = raw_move >> 6 & 63
+    promotion = raw_move >> 12 & 7
+    move = chess.Move(from_square, to_square, promotion + 1 if promotion else None)
+
+    if not promotion and from_square == board.king(board.turn) and \
+            board.rooks & board.occupied_co[board.turn] & chess.BB_SQUARES[to_square]:
+        move = chess.Move(from_square, (from_square & 56) + (6 if to_square > from_square else 2))
+    return move if board.is_legal(move) else None
+
+
+def encode_move(board, move):
+    """
+    Converts a chess.Move to a Polyglot move (castling as king takes rook).
+    """
+    to_square = move.to_square
+    if board.is_castling(move):
+        to_square = (move.from_square & 56) + (7 if board.is_kingside_castling(move) else 0)
+    return to_square | move.from_square << 6 | ((move.promotion - 1) if move.promotion else 0) << 12
+
+
+class OpeningBook:
+    def __init__(self, path, selection="weighted", seed=None):
+        """
+        Polyglot opening book. The file is memory-mapped and searched with a binary search over its sorted keys,
+        so only the probed entries are ever read.
+
+        :param path: Path to the .bin book.
+        :param selection: "weighted" picks a move at random proportionally to its weight, "best" the heaviest one.
+        :param seed: Seed of the random generator of the weighted selection.
+        """
+        self.path = path
+        self.selection = selection
+        self.random = random.Random(seed)
+        self.file = open(path, "rb")
+        size = os.fstat(self.file.fileno()).st_size
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self.num_entries = size // ENTRY_SIZE
+
+    def find_first(self, key):
+        """
+        Binary search for the first entry whose key is not smaller than key.
+        """
+        low, high = 0, self.num_entries
+        while low < high:
+            middle = (low + high) // 2
+            if _KEY.unpack_from(self.data, middle * ENTRY_SIZE)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def entries(self, board, key=None):
+        """
+        All book moves of the position.
+
+        :param key: Zobrist key of the position (computed if not given).
+        :return: List of (move, weight) with legal moves and positive weights.
+        """
+        if key is None:
+            key = zobrist.compute_hash(board)
+        result = []
+        index = self.find_first(key)
+        while index < self.num_entries:
+            entry_key, raw_move, weight, _ = _ENTRY.unpack_from(self.data, index * ENTRY_SIZE)
+            if entry_key != key:
+                break
+            index += 1
+            move = decode_move(board, raw_move)
+            if move is not None and weight > 0:
+                result.append((move, weight))
+        return result
+
+    def probe(self, board, key=None):
+        """
+        Chooses a book move for the position.
+
+        :return: The move, or None if the position is not in the book.
+        """
+        entries = self.entries(board, key)
+        if not entries:
+            return None
+        if self.selection == "best":
+            return max(entries, key=lambda entry: entry[1])[0]
+        moves, weights = zip(*entries)
+        return self.random.choices(moves, weights)[0]
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.file.close()
+
+
+def build_book(pgn_paths, output_path, max_ply=20, min_count=2):
+    """
+    Builds a Polyglot book from PGN collections. A move is weighted by the results of the games it was played in
+    (2 for a win of the side that played it, 1 for a draw, 0 for a loss).
+
+    :param pgn_paths: PGN files to read.
+    :param output_path: Path of the .bin book to write.
+    :param max_ply: Number of plies of every game added to the book.
+    :param min_count: Minimum number of games a move must appear in.
+    :return: Number of entries written.
+    """
+    counts = {}  # (key, raw move) -> [games, weight]
+    for pgn_path in pgn_paths:
+        with open(pgn_path, encoding="utf-8", errors="replace") as pgn:
+            while True:
+                game = chess.pgn.read_game(pgn)
+                if game is None:
+                    break
+                result = game.headers.get("Result", "*")
+                board = game.board()
+                key = zobrist.compute_hash(board)
+                for ply, move in enumerate(game.mainline_moves()):
+                    if ply >= max_ply:
+                        break
+                    if result == "1/2-1/2":
+                        score = 1
+                    else:
+                        score = 2 if result == ("1-0" if board.turn == chess.WHITE else "0-1") else 0
+                    counter = counts.setdefault((key, encode_move(board, move)), [0, 0])
+                    counter[0] += 1
+                    counter[1] += score
+                    key = zobrist.push_move(board, move, key)
+
+    entries = sorted((key, raw_move, min(weight, 0xFFFF))
+                     for (key, raw_move), (games, weight) in counts.items() if games >= min_count)
+    with open(output_path, "wb") as book:
+        for key, raw_move, weight in entries:
+            book.write(_ENTRY.pack(key, raw_move, weight, 0))
+    return len(entries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Builds a Polyglot opening book from PGN files")
+    parser.add_argument("pgn", nargs="+", help="PGN files")
+    parser.add_argument("-o", "--output", default="book.bin", help="output .bin book")
+    parser.add_argument("--max-ply", type=int, default=20, help="number of plies of every game added to the book")
+    parser.add_argument("--min-count", type=int, default=2, help="minimum number of games of a book move")
+    args = parser.parse_args()
+
+    entries = build_book(args.pgn, args.output, args.max_ply, args.min_count)
+    print(f"{entries} entries written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
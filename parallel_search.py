@@ -0,0 +1,178 @@
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_EXCEPTION, ProcessPoolExecutor, wait
+
+import chess
+
+from chess_bot_dfs import ChessBotDFS
+from iterative_deepening import MAX_DEPTH, iterative_deepening
+from position_evaluator import PositionEvaluator
+from telemetry import SearchStats
+
+logger = logging.getLogger(__name__)
+
+# Workers are spawned rather than forked: a fork from the search thread copies the locks held by the other
+# threads (e.g. the UCI loop blocked on stdin), and the child deadlocks on them
+_CONTEXT = multiprocessing.get_context("spawn")
+
+# ChessBotDFS and stop flag of the current worker process (created once by _init_worker)
+_worker_bot = None
+_worker_token = None
+
+
+class ProcessCancellationToken:
+    def __init__(self):
+        """
+        CancellationToken shared by processes: the parent process cancels, and the searches of the worker
+        processes notice it at their next limits check.
+        """
+        self.event = _CONTEXT.Event()
+
+    @property
+    def cancelled(self):
+        return self.event.is_set()
+
+    def cancel(self):
+        self.event.set()
+
+    def reset(self):
+        self.event.clear()
+
+
+def _init_worker(depth, evaluator, tt_size_mb, token):
+    """
+    Creates the search engine of a worker process.
+    """
+    global _worker_bot, _worker_token
+    _worker_bot = ChessBotDFS(depth, evaluator, tt_size_mb)
+    _worker_token = token
+
+
+def _search_root_moves(root_fen, move_stack, root_moves, max_depth, deadline, node_limit=None):
+    """
+    Searches a subset of the root moves in a worker process.
+
+    :param root_fen: FEN of the starting position of the game.
+    :param move_stack: Moves (UCI) played from the starting position, so repetitions are known.
+    :param root_moves: Root moves (UCI) assigned to this worker.
+    :param deadline: time.time() at which the search must end (None for no time limit); it is set by the
+        parent process, so the start-up of the workers counts against the budget.
+    :return: ([(move UCI, score) of every completed depth], number of nodes explored)
+    """
+    board = chess.Board(root_fen)
+    for uci in move_stack:
+        board.push_uci(uci)
+    moves = [chess.Move.from_uci(uci) for uci in root_moves]
+    time_limit_ms = None if deadline is None else max(0.0, (deadline - time.time()) * 1000)
+
+    bot = _worker_bot
+    bot.nodes_explored = 0
+    bot.qnodes_explored = 0
+    bot.transposition_table.new_search()
+    bot.move_orderer.new_search()
+    iterations = []
+
+    def search_depth(board, depth, limits, pv_move):
+        return bot.search_root(board, depth, limits, pv_move, moves)
+
+    def on_iteration(depth, move, score):
+        iterations.append((move.uci(), score))
+
+    iterative_deepening(board, search_depth, max_depth, time_limit_ms, on_iteration, _worker_token, node_limit)
+    return iterations, bot.nodes_explored
+
+
+class ParallelChessBotDFS:
+    def __init__(self, depth, evaluator=None, workers=None, tt_size_mb=16):
+        """
+        Root-split parallel version of ChessBotDFS: the root moves are distributed over worker processes,
+        each searching its share with its own transposition table, and the results are merged.
+
+        :param depth: Search depth.
+        :param evaluator: Evaluator copied into every worker (PositionEvaluator by default).
+        :param workers: Number of worker processes (all CPU cores by default).
+        :param tt_size_mb: Transposition table size of every worker in megabytes.
+        """
+        self.depth = depth
+        self.evaluator = evaluator or PositionEvaluator()
+        self.workers = workers or os.cpu_count() or 1
+        self.tt_size_mb = tt_size_mb
+        self.nodes_explored = 0
+        self.completed_depth = 0
+        self.best_score = None
+        self.executor = None  # Created on first use, as starting the processes is expensive
+        self.stop_token = ProcessCancellationToken()  # Stops the searches of all workers
+        self.search_stats = None  # SearchStats of the last search (nodes summed over the workers)
+
+    def get_best_move(self, board, time_limit_ms=None, token=None, depth=None, node_limit=None, on_iteration=None):
+        """
+        Determining the best move for the current position with all workers
+
+        :param board: chess.Board object representing the current chess position
+        :param time_limit_ms: Time budget in milliseconds; without it the search goes to the configured depth
+        :param token: CancellationToken; cancelling it stops the workers, and the best move of the iterations
+            they completed is returned
+        :param depth: Maximum depth overriding the configured one
+        :param node_limit: Node budget, shared equally by the workers
+        :param on_iteration: Called with (depth, move, score) once, for the merged result
+        :return: The best move for the current position
+        """
+        # The clock starts before the worker processes are created
+        deadline = None if time_limit_ms is None else time.time() + time_limit_ms / 1000
+        stats = SearchStats("parallel")
+        self.search_stats = stats
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(self.workers, mp_context=_CONTEXT, initializer=_init_worker,
+                                                initargs=(self.depth, self.evaluator, self.tt_size_mb,
+                                                          self.stop_token))
+
+        # Moves are dealt round-robin with captures first, so every worker gets a share of the promising ones
+        moves = sorted(board.legal_moves, key=board.is_capture, reverse=True)
+        if not moves:
+            return None
+        shares = [moves[index::self.workers] for index in range(min(self.workers, len(moves)))]
+
+        max_depth = depth or (self.depth if time_limit_ms is None and node_limit is None else MAX_DEPTH)
+        worker_node_limit = None if node_limit is None else node_limit // len(shares)
+        root_fen = board.root().fen()
+        move_stack = [move.uci() for move in board.move_stack]
+        self.stop_token.reset()
+        futures = [self.executor.submit(_search_root_moves, root_fen, move_stack, [move.uci() for move in share],
+                                        max_depth, deadline, worker_node_limit)
+                   for share in shares]
+        pending = futures
+        while pending:
+            if token is not None and token.cancelled and not self.stop_token.cancelled:
+                self.stop_token.cancel()  # The workers return the iterations they have completed
+            _, pending = wait(pending, timeout=0.05, return_when=FIRST_EXCEPTION)
+        results = [future.result() for future in futures]
+        self.nodes_explored = sum(nodes for _, nodes in results)
+
+        # Scores are only comparable at the same depth, so we merge at the deepest depth every worker completed
+        # (a worker stopped before its first iteration has no result, and its moves are left out)
+        completed = [iterations for iterations, _ in results if iterations]
+        if not completed:
+            return None
+        self.completed_depth = min(len(iterations) for iterations in completed)
+        best_uci, self.best_score = max((iterations[self.completed_depth - 1] for iterations in completed),
+                                        key=lambda result: result[1])
+
+        logger.debug("Nodes explored: %d, depth: %d, workers: %d", self.nodes_explored, self.completed_depth,
+                     len(shares))
+        best_move = chess.Move.from_uci(best_uci)
+        stats.nodes = self.nodes_explored
+        stats.finish(best_move, self.best_score, self.completed_depth)
+        if on_iteration is not None:
+            on_iteration(self.completed_depth, best_move, self.best_score)
+        return best_move
+
+    def close(self):
+        """
+        Stops the worker processes.
+        """
+        if self.executor is not None:
+            self.stop_token.cancel()
+            self.executor.shutdown()
+            self.executor = None
@@ -0,0 +1,135 @@
+from collections import namedtuple
+
+import chess
+
+# Masks removing the squares that pawn attack shifts wrap around the board edge
+NOT_FILE_A = chess.BB_ALL & ~chess.BB_FILE_A
+NOT_FILE_H = chess.BB_ALL & ~chess.BB_FILE_H
+
+# Pawn structure of a pawn skeleton. passed and backward are bitboards of the pawns of both colors,
+# doubled and isolated are file bytes (bit i for file i) of (white, black).
+PawnEntry = namedtuple("PawnEntry", ("white", "black", "score", "passed", "backward", "doubled", "isolated"))
+
+
+def file_occupancy(mask):
+    """
+    Collapses a bitboard into a byte with bit i set if file i has any square of the mask.
+    """
+    mask |= mask >> 32
+    mask |= mask >> 16
+    mask |= mask >> 8
+    return mask & 0xFF
+
+
+def north_fill(mask):
+    """
+    Squares of the mask and all squares above them on the same file.
+    """
+    mask |= (mask << 8) & chess.BB_ALL
+    mask |= (mask << 16) & chess.BB_ALL
+    mask |= (mask << 32) & chess.BB_ALL
+    return mask
+
+
+def south_fill(mask):
+    """
+    Squares of the mask and all squares below them on the same file.
+    """
+    mask |= mask >> 8
+    mask |= mask >> 16
+    mask |= mask >> 32
+    return mask
+
+
+def sides(mask):
+    """
+    Squares on the adjacent files of the squares of the mask, on the same rank.
+    """
+    return ((mask << 1) & NOT_FILE_A) | ((mask >> 1) & NOT_FILE_H)
+
+
+def pawn_structure(white, black):
+    """
+    Computes the pawn structure of a skeleton.
+
+    :param white: Bitboard of the white pawns.
+    :param black: Bitboard of the black pawns.
+    :return: PawnEntry; its score is the same as PositionEvaluator.pawn_structure.
+    """
+    pawns = white | black
+    # The score counts files with several pawns and files with a single pawn without neighbours, of both colors
+    files = file_occupancy(pawns)
+    doubled_files = file_occupancy(pawns & north_fill(pawns << 8 & chess.BB_ALL))
+    isolated_files = files & ~doubled_files & ~((files << 1) | (files >> 1))
+    score = -0.5 * (doubled_files.bit_count() + isolated_files.bit_count())
+
+    # Passed: no opposing pawn ahead on the same or an adjacent file
+    white_passed = white & ~south_fill((black | sides(black)) >> 8)
+    black_passed = black & ~north_fill(((white | sides(white)) << 8) & chess.BB_ALL)
+
+    # Backward: no own pawn beside or behind on an adjacent file, and the stop square is attacked by a pawn
+    white_attacks = ((white << 7) & NOT_FILE_H | (white << 9) & NOT_FILE_A) & chess.BB_ALL
+    black_attacks = (black >> 9) & NOT_FILE_H | (black >> 7) & NOT_FILE_A
+    white_backward = white & ~north_fill(sides(white)) & (black_attacks >> 8)
+    black_backward = black & ~south_fill(sides(black)) & ((white_attacks << 8) & chess.BB_ALL)
+
+    doubled, isolated = [], []
+    for own in (white, black):
+        own_files = file_occupancy(own)
+        doubled.append(file_occupancy(own & north_fill(own << 8 & chess.BB_ALL)))
+        isolated.append(own_files & ~((own_files << 1) | (own_files >> 1)))
+
+    return PawnEntry(white, black, score, white_passed | black_passed, white_backward | black_backward,
+                     tuple(doubled), tuple(isolated))
+
+
+class PawnCache:
+    def __init__(self, bits=14):
+        """
+        Direct-mapped pawn hash table: the pawn structure of a skeleton (pawn bitboards of both colors)
+        is computed once and reused while only pieces move. A new skeleton replaces the entry of its slot.
+
+        :param bits: The table has 2 ** bits slots.
+        """
+        self.shift = 64 - bits
+        self.size = 1 << bits
+        self.slots = [None] * self.size
+        self.reset_stats()
+
+    def reset_stats(self):
+        """
+        Resets the probe statistics.
+        """
+        self.probes = 0
+        self.hits = 0
+
+    def clear(self):
+        """
+        Removes all entries from the table.
+        """
+        self.slots = [None] * self.size
+
+    def probe(self, white, black):
+        """
+        Looks up a pawn skeleton, computing and storing it if it is not in the table.
+
+        :param white: Bitboard of the white pawns.
+        :param black: Bitboard of the black pawns.
+        :return: PawnEntry of the skeleton.
+        """
+        self.probes += 1
+        # Multiplicative hashing: the top bits of the mixed bitboards select the slot
+        index = ((white * 0x9E3779B97F4A7C15 ^ black * 0xC2B2AE3D27D4EB4F) & chess.BB_ALL) >> self.shift
+        entry = self.slots[index]
+        if entry is not None and entry.white == white and entry.black == black:
+            self.hits += 1
+            return entry
+        entry = pawn_structure(white, black)
+        self.slots[index] = entry
+        return entry
+
+    def hit_rate(self):
+        """
+        Share of probes that found the skeleton in the table.
+        """
+        return self.hits / self.probes if self.probes else 0.0
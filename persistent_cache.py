@@ -0,0 +1,132 @@
+import sqlite3
+import threading
+import time
+
+import chess
+
+MIN_DEPTH = 2  # Shallower results are cheap to recompute and are not persisted
+BATCH_SIZE = 1000  # Number of pending results written to disk at once
+MAX_ENTRIES = 1000000  # Size cap of the store
+MAX_PLY = 2  # Only nodes this close to the root look positions up on disk
+
+
+def _signed(key):
+    """
+    Converts a 64-bit Zobrist key to the signed integer range of SQLite.
+    """
+    return key - (1 << 64) if key >= 1 << 63 else key
+
+
+class PersistentCache:
+    def __init__(self, path, signature=None, max_entries=MAX_ENTRIES, min_depth=MIN_DEPTH, max_ply=MAX_PLY,
+                 batch_size=BATCH_SIZE):
+        """
+        On-disk store of search results shared across sessions, used as a second-level transposition table.
+        The database is opened on first use, results are written in batches, and when the store grows beyond
+        max_entries the oldest and shallowest entries are evicted. Scores are only valid for the evaluation
+        that computed them, so the store is emptied when it was written with another signature.
+
+        :param path: Path of the SQLite database.
+        :param signature: Identifier of the evaluation (see PositionEvaluator.signature).
+        :param max_entries: Maximum number of stored positions.
+        :param min_depth: Minimum search depth of a stored (and probed) result.
+        :param max_ply: Maximum distance from the root of a node probing the store.
+        :param batch_size: Number of pending results that triggers a write.
+        """
+        self.path = path
+        self.signature = signature
+        self.max_entries = max_entries
+        self.min_depth = min_depth
+        self.max_ply = max_ply
+        self.batch_size = batch_size
+        self.connection = None  # Opened lazily
+        self.lock = threading.Lock()  # The GUI and the help thread may use the cache
+        self.pending = {}  # Key -> (depth, score, flag, move UCI) not yet written
+        self.probes = 0
+        self.hits = 0
+
+    def connect(self):
+        if self.connection is None:
+            self.connection = sqlite3.connect(self.path, check_same_thread=False)
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS positions (key INTEGER PRIMARY KEY, depth INTEGER, score REAL, "
+                "flag INTEGER, move TEXT, updated REAL)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS positions_age ON positions (updated, depth)")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+            row = self.connection.execute("SELECT value FROM meta WHERE name = 'signature'").fetchone()
+            if row is None or row[0] != self.signature:
+                with self.connection:  # Results of another evaluation (e.g. before the weights were retuned)
+                    self.connection.execute("DELETE FROM positions")
+                    self.connection.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('signature', ?)",
+                                            (self.signature,))
+        return self.connection
+
+    def probe(self, key):
+        """
+        Looks up a position.
+
+        :param key: Zobrist key of the position.
+        :return: (depth, score, flag, move) or None.
+        """
+        self.probes += 1
+        with self.lock:
+            result = self.pending.get(key)
+            if result is None:
+                row = self.connect().execute("SELECT depth, score, flag, move FROM positions WHERE key = ?",
+                                             (_signed(key),)).fetchone()
+                if row is None:
+                    return None
+                result = row
+        self.hits += 1
+        depth, score, flag, move = result
+        return depth, score, flag, chess.Move.from_uci(move) if move else None
+
+    def store(self, key, depth, score, flag, move):
+        """
+        Queues a search result; deeper results replace shallower ones.
+        """
+        if depth < self.min_depth:
+            return
+        with self.lock:
+            pending = self.pending.get(key)
+            if pending is None or depth >= pending[0]:
+                self.pending[key] = (depth, score, flag, move.uci() if move else None)
+            full = len(self.pending) >= self.batch_size
+        if full:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes the pending results and evicts entries beyond the size cap.
+        """
+        with self.lock:
+            if not self.pending:
+                return
+            now = time.time()
+            rows = [(_signed(key), depth, score, flag, move, now)
+                    for key, (depth, score, flag, move) in self.pending.items()]
+            self.pending = {}
+            connection = self.connect()
+            with connection:
+                connection.executemany(
+                    "INSERT INTO positions (key, depth, score, flag, move, updated) VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET depth = excluded.depth, score = excluded.score, "
+                    "flag = excluded.flag, move = excluded.move, updated = excluded.updated "
+                    "WHERE excluded.depth >= positions.depth", rows)
+                excess = connection.execute("SELECT COUNT(*) FROM positions").fetchone()[0] - self.max_entries
+                if excess > 0:
+                    connection.execute("DELETE FROM positions WHERE key IN "
+                                       "(SELECT key FROM positions ORDER BY updated, depth LIMIT ?)", (excess,))
+
+    def close(self):
+        """
+        Writes the pending results and closes the database.
+        """
+        self.flush()
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+
+    def hit_rate(self):
+        return self.hits / self.probes if self.probes else 0.0
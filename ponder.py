@@ -0,0 +1,98 @@
+import time
+
+import zobrist
+
+
+class Ponderer:
+    def __init__(self, bot, slice_ms):
+        """
+        Pondering for the Help arrow: while the player thinks, the position expected after the suggested move
+        is searched in short slices. Every slice resumes from the transposition table (completed depths of the
+        root are answered from it), so the search keeps deepening and a slice can be cut short without losing
+        the work; the answer is the move of the deepest iteration any slice completed. Engines without a table
+        start again from depth 1, so a slice that does not get deeper doubles the budget of the next one.
+        If the player plays the expected move and pondering got at least as deep as the last normal search,
+        the pondered answer is shown at once (ponder hit); otherwise a new search runs on the warm table.
+
+        :param bot: ChessBotController (or any bot with get_best_move(board, time_limit_ms, token, depth,
+            node_limit, on_iteration)).
+        :param slice_ms: Time budget of one pondering slice in milliseconds.
+        """
+        self.bot = bot
+        self.slice_ms = slice_ms
+        self.expected_key = None  # Zobrist key of the pondered position
+        self.ponder_move = None  # Best move found for it so far
+        self.ponder_depth = 0  # Depth of the iteration that found ponder_move
+        self.search_depth = 0  # Depth reached by the last search of an answer
+        self.hits = 0
+        self.misses = 0
+        self.latencies = []  # Seconds between the request of an answer and the answer
+
+    def best_move(self, board, time_limit_ms, token=None):
+        """
+        Answer for the position: the pondered move on a ponder hit, otherwise the result of a new search.
+
+        :param board: Copy of the current position.
+        :param time_limit_ms: Time budget of a new search.
+        :param token: CancellationToken of the search.
+        """
+        start = time.perf_counter()
+        move, depth = None, 0
+        if self.expected_key is not None:
+            if self.ponder_move is not None and zobrist.compute_hash(board) == self.expected_key:
+                # The pondered answer is kept as a fallback if it is too shallow
+                move, depth = self.ponder_move, self.ponder_depth
+            if move is not None and depth >= self.search_depth:
+                self.hits += 1
+            else:
+                self.misses += 1
+        self.expected_key, self.ponder_move, self.ponder_depth = None, None, 0
+
+        if move is None or depth < self.search_depth:
+            iterations = []
+            searched_move = self.bot.get_best_move(board, time_limit_ms, token,
+                                                   on_iteration=lambda *iteration: iterations.append(iteration))
+            searched_depth = iterations[-1][0] if iterations else 0
+            if move is None or searched_depth >= depth:
+                move = searched_move
+            self.search_depth = max(searched_depth, depth)
+        self.latencies.append(time.perf_counter() - start)
+        return move
+
+    def ponder(self, board, move, token):
+        """
+        Searches the position after move until the token is cancelled or there is nothing left to search.
+
+        :param board: Copy of the current position (modified).
+        :param move: Move expected to be played.
+        :param token: CancellationToken, also checked inside the slices.
+        """
+        board.push(move)
+        self.expected_key, self.ponder_move, self.ponder_depth = zobrist.compute_hash(board), None, 0
+
+        def on_iteration(depth, ponder_move, score):
+            # A slice cut short may end shallower than the previous one, whose answer is kept then
+            if depth >= self.ponder_depth:
+                self.ponder_move, self.ponder_depth = ponder_move, depth
+
+        slice_ms = self.slice_ms
+        while not token.cancelled and not board.is_game_over():
+            start = time.perf_counter()
+            previous_depth = self.ponder_depth
+            ponder_move = self.bot.get_best_move(board, slice_ms, token, on_iteration=on_iteration)
+            if self.ponder_move is None:
+                self.ponder_move = ponder_move  # Book or tablebase move, found without iterations
+            if time.perf_counter() - start < slice_ms / 2000:
+                break  # The answer came without using the budget (book, tablebase, finished search)
+            if self.ponder_depth <= previous_depth:
+                slice_ms *= 2  # The slice only repeated known depths
+
+    def hit_rate(self):
+        """
+        Share of answers that were ready from pondering.
+        """
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def average_latency_ms(self):
+        return sum(self.latencies) / len(self.latencies) * 1000 if self.latencies else 0.0
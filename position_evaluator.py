@@ -1,7 +1,74 @@
+import hashlib
+import json
+import os
+
 import chess
 
+from pawn_cache import NOT_FILE_A, NOT_FILE_H, PawnCache, file_occupancy
+from see import see_square
+
+# Versioned weights file loaded by default (written by tuner.py)
+WEIGHTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "weights.json")
+WEIGHTS_VERSION = 1
+
+# Weights of the terms in the overall evaluation, used when there is no weights file
+DEFAULT_WEIGHTS = {"material": 4, "center": 3, "pawns": 2, "king_safety": 5, "activity": 1, "threats": 3,
+                   "hanging": 0}
+
+# King safety score of a checkmate (before its weight)
+CHECKMATE_SCORE = 10000
+
+# Piece types with a value in the material and threat terms
+VALUED_PIECE_TYPES = (chess.PAWN, chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN)
+
+# Names of the entries of PositionEvaluator.features: material and attacked pieces per piece type, and the other terms
+FEATURE_NAMES = ([f"material_{chess.piece_name(piece_type)}" for piece_type in VALUED_PIECE_TYPES]
+                 + ["center", "pawns", "king_safety", "activity"]
+                 + [f"threats_{chess.piece_name(piece_type)}" for piece_type in VALUED_PIECE_TYPES]
+                 + ["hanging"])
+
+
+def load_weights(path=WEIGHTS_FILE):
+    """
+    Reads a weights file.
+
+    :return: (piece values {piece type: value}, term weights {term name: weight})
+    """
+    with open(path) as file:
+        data = json.load(file)
+    if data.get("version") != WEIGHTS_VERSION:
+        raise ValueError(f"{path}: unsupported weights version {data.get('version')!r}, expected {WEIGHTS_VERSION}")
+    piece_values = {chess.PIECE_NAMES.index(name): value for name, value in data["piece_values"].items()}
+    weights = dict(DEFAULT_WEIGHTS, **data["weights"])
+    return piece_values, weights
+
+
+def save_weights(path, piece_values, weights, **metadata):
+    """
+    Writes a weights file readable by load_weights.
+
+    :param metadata: Additional entries of the file (e.g. how the weights were tuned).
+    """
+    data = {"version": WEIGHTS_VERSION,
+            "piece_values": {chess.piece_name(piece_type): value for piece_type, value in sorted(piece_values.items())},
+            "weights": weights}
+    data.update(metadata)
+    with open(path, "w") as file:
+        json.dump(data, file, indent=2)
+        file.write("\n")
+
+
 class PositionEvaluator:
-    def __init__(self):
+    def __init__(self, use_bitboards=True, weights_file=None):
+        """
+        :param use_bitboards: Compute the terms with bitboard masks and popcounts instead of per-square loops
+            (the scores are the same).
+        :param weights_file: JSON file with the piece values and term weights (see load_weights). By default
+            weights.json next to this module is loaded if it exists, otherwise the built-in values are used.
+        """
+        self.use_bitboards = use_bitboards
+        self.evaluations = 0  # Number of evaluate calls (search telemetry)
+
         # Piece values
         self.piece_values = {
             chess.PAWN: 1,
@@ -11,6 +78,13 @@ class PositionEvaluator:
             chess.QUEEN: 9,
             chess.KING: 0 #The evaluation of the king is meaningless, as the king cannot be captured; checkmate is the only goal, and this is handled by king_safety.
         }
+        self.weights = dict(DEFAULT_WEIGHTS)  # Weights of the terms in the overall evaluation
+
+        if weights_file is None and os.path.exists(WEIGHTS_FILE):
+            weights_file = WEIGHTS_FILE
+        if weights_file is not None:
+            piece_values, self.weights = load_weights(weights_file)
+            self.piece_values.update(piece_values)
 
         # Central squares
         self.center_squares = [chess.E4, chess.D4, chess.E5, chess.D5]
@@ -20,28 +94,112 @@ class PositionEvaluator:
             chess.C5, chess.F5,
             chess.C6, chess.D6, chess.E6, chess.F6
         ]
+        self.center_mask = chess.SquareSet(self.center_squares).mask
+        self.wider_center_mask = chess.SquareSet(self.wider_center).mask
+
+        self.attack_cache = None  # (position key, attack maps) of the last position, see piece_attacks
+        self.pawn_cache = PawnCache()  # Pawn structure of the pawn skeletons seen, see pawn_structure_bitboards
+
+    @property
+    def material_weight(self):
+        """
+        Weight of the material term in the overall evaluation
+        """
+        return self.weights["material"]
+
+    def signature(self):
+        """
+        Hash of the piece values and term weights, which identifies the scores stored by a search
+        (e.g. in the persistent cache).
+        """
+        data = {"piece_values": {chess.piece_name(piece_type): value for piece_type, value
+                                 in sorted(self.piece_values.items())},
+                "weights": dict(sorted(self.weights.items()))}
+        return hashlib.sha1(json.dumps(data).encode()).hexdigest()
 
-    def evaluate(self, board):
+    def evaluate(self, board, moves=None):
         """
         Overall position evaluation
+
+        :param moves: Legal moves of the position if the search has already generated them
+            (used for the terminal-state check instead of generating them again)
         """
+        self.evaluations += 1
         if board.turn == chess.BLACK:
             multiplier = 1
         else: 
             multiplier = -1  # We change the sign depending on the color 
-        score = 0
-        score += self.material_balance(board) * 4
-        score += self.center_control(board) * 3
-        score += self.pawn_structure(board) * 2
-        score += self.king_safety(board) * 5
-        score += self.piece_activity(board) * 1
-        score += self.threats(board) * 3
+        score = self.combine_terms(board, self.material_balance(board), self.center_control(board),
+                                   self.pawn_structure(board), moves)
         return score * multiplier
 
+    def combine_terms(self, board, material, center, pawns, moves=None):
+        """
+        Weighted sum of the static terms (given) and the dynamic terms (computed from the board),
+        from black's point of view
+        """
+        weights = self.weights
+        score = 0
+        score += material * weights["material"]
+        score += center * weights["center"]
+        score += pawns * weights["pawns"]
+        score += self.king_safety(board, moves) * weights["king_safety"]
+        score += self.piece_activity(board) * weights["activity"]
+        score += self.threats(board) * weights["threats"]
+        if weights["hanging"]:  # The exchange evaluation is skipped while the term is disabled
+            score += self.hanging_pieces(board) * weights["hanging"]
+        return score
+
+    def features(self, board, moves=None):
+        """
+        Feature vector of the position from black's point of view, in the order of FEATURE_NAMES: the piece
+        count difference and the difference of attacks on the opponent's pieces of every piece type, and the
+        center, pawn structure, king safety, activity and hanging piece terms. The evaluation is linear in the features,
+        see feature_coefficients, so the tuner works on features extracted once.
+        """
+        white, black = board.occupied_co[chess.WHITE], board.occupied_co[chess.BLACK]
+        type_masks = (board.pawns, board.knights, board.bishops, board.rooks, board.queens)
+        material = [(mask & black).bit_count() - (mask & white).bit_count() for mask in type_masks]
+        black_hits = self.attack_hits(board, chess.BLACK, white)
+        white_hits = self.attack_hits(board, chess.WHITE, black)
+        threats = [black_hits[piece_type] - white_hits[piece_type] for piece_type in VALUED_PIECE_TYPES]
+        return (material + [self.center_control_bitboards(board), self.pawn_structure_bitboards(board),
+                            self.king_safety(board, moves), self.piece_activity(board)] + threats
+                + [self.hanging_pieces(board)])
+
+    def feature_coefficients(self):
+        """
+        Coefficients of the features: the evaluation from black's point of view is their dot product
+        with the features.
+        """
+        weights = self.weights
+        return ([self.piece_values[piece_type] * weights["material"] for piece_type in VALUED_PIECE_TYPES]
+                + [weights["center"], weights["pawns"], weights["king_safety"], weights["activity"]]
+                + [self.piece_values[piece_type] * weights["threats"] for piece_type in VALUED_PIECE_TYPES]
+                + [weights["hanging"]])
+
+    def reset(self, board):
+        """
+        Called at the root of a search. A full-scan evaluator keeps no state between positions.
+        """
+
+    def on_push(self, board, move):
+        """
+        Called right before board.push(move) during a search.
+        """
+
+    def on_pop(self, board):
+        """
+        Called right after board.pop() during a search.
+        """
+
     def material_balance(self, board):
         """
         Evaluation of material difference.
         """
+        if self.use_bitboards:
+            return self.material_balance_bitboards(board)
+
         score = 0
         for square in chess.SQUARES:
             piece = board.piece_at(square)
@@ -53,10 +211,24 @@ class PositionEvaluator:
                     score += value
         return score
 
+    def material_balance_bitboards(self, board):
+        """
+        Evaluation of material difference using piece counts of the bitboards.
+        """
+        white, black = board.occupied_co[chess.WHITE], board.occupied_co[chess.BLACK]
+        score = 0
+        for piece_type, mask in ((chess.PAWN, board.pawns), (chess.KNIGHT, board.knights), (chess.BISHOP, board.bishops),
+                                 (chess.ROOK, board.rooks), (chess.QUEEN, board.queens)):
+            score += ((mask & black).bit_count() - (mask & white).bit_count()) * self.piece_values[piece_type]
+        return score
+
     def center_control(self, board):
         """
         Evaluation of central control
         """
+        if self.use_bitboards:
+            return self.center_control_bitboards(board)
+
         score = 0
         for square in self.center_squares:
             piece = board.piece_at(square)
@@ -70,10 +242,22 @@ class PositionEvaluator:
 
         return score
 
+    def center_control_bitboards(self, board):
+        """
+        Evaluation of central control using the center masks
+        """
+        white, black = board.occupied_co[chess.WHITE], board.occupied_co[chess.BLACK]
+        score = ((black & self.center_mask).bit_count() - (white & self.center_mask).bit_count()) * 0.5
+        score += ((black & self.wider_center_mask).bit_count() - (white & self.wider_center_mask).bit_count()) * 0.25
+        return score
+
     def pawn_structure(self, board):
         """
         Evaluation of pawn structure: isolated, doubled
         """
+        if self.use_bitboards:
+            return self.pawn_structure_bitboards(board)
+
         score = 0
         pawns = list(board.pieces(chess.PAWN, chess.BLACK)) + list(board.pieces(chess.PAWN, chess.WHITE))
         pawn_files = {file: [] for file in range(8)}
@@ -93,10 +277,20 @@ class PositionEvaluator:
 
         return score
 
-    def king_safety(self, board):
+    def pawn_structure_bitboards(self, board):
+        """
+        Evaluation of pawn structure from the pawn hash table: isolated, doubled
+        """
+        pawns = board.pawns
+        entry = self.pawn_cache.probe(pawns & board.occupied_co[chess.WHITE], pawns & board.occupied_co[chess.BLACK])
+        return entry.score
+
+    def king_safety(self, board, moves=None):
         score = 0
         """
         King safety evaluation (LOTS OF POINTS FOR CHECKMATE)
+
+        :param moves: Legal moves of the position, if already generated by the search
         """
 
         """
@@ -109,28 +303,66 @@ class PositionEvaluator:
             score += 1000  # Black wins if the white king is in checkmate
         """
 
-        if board.is_checkmate() and board.turn == chess.WHITE:
-            score += 10000  #We add points to the bot for a white checkmate.
-        elif board.is_checkmate() and board.turn == chess.BLACK:
-            score -= 10000 
+        # A single terminal-state check: the side to move is mated if it is in check without legal moves
+        if not board.is_check():
+            return score
+        if moves is None:
+            checkmate = not any(board.generate_legal_moves())
+        else:
+            checkmate = not moves
+
+        if checkmate and board.turn == chess.WHITE:
+            score += CHECKMATE_SCORE  #We add points to the bot for a white checkmate.
+        elif checkmate and board.turn == chess.BLACK:
+            score -= CHECKMATE_SCORE
         return score
 
     def piece_activity(self, board):
         """
-        Piece activity evaluation: number of available moves.
+        Piece activity evaluation: pseudo-legal mobility of the pieces (except pawns and kings) of both colors.
         """
-        score = 0
-        for move in board.legal_moves:
-            if board.color_at(move.from_square) == chess.BLACK:
-                score += 0.1
-            else:
-                score -= 0.1
-        return score
+        if self.use_bitboards:
+            white_maps, black_maps = self.piece_attacks(board)
+            white_mobility = sum((attacks & ~board.occupied_co[chess.WHITE]).bit_count() for attacks in white_maps)
+            black_mobility = sum((attacks & ~board.occupied_co[chess.BLACK]).bit_count() for attacks in black_maps)
+        else:
+            white_mobility = black_mobility = 0
+            for square in chess.SQUARES:
+                piece = board.piece_at(square)
+                if piece and piece.piece_type not in (chess.PAWN, chess.KING):
+                    mobility = sum(1 for target in board.attacks(square) if board.color_at(target) != piece.color)
+                    if piece.color == chess.BLACK:
+                        black_mobility += mobility
+                    else:
+                        white_mobility += mobility
+        return (black_mobility - white_mobility) * 0.1
+
+    def piece_attacks(self, board):
+        """
+        Attack bitboards of the knights, bishops, rooks and queens of both colors.
+        The result for the last position is cached, as mobility and threats both use it.
+
+        :return: (list of white attack masks, list of black attack masks)
+        """
+        key = (board.occupied_co[chess.WHITE], board.occupied_co[chess.BLACK],
+               board.knights, board.bishops, board.rooks, board.queens)
+        cached = self.attack_cache
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        pieces = board.knights | board.bishops | board.rooks | board.queens
+        maps = ([board.attacks_mask(square) for square in chess.scan_forward(pieces & board.occupied_co[chess.WHITE])],
+                [board.attacks_mask(square) for square in chess.scan_forward(pieces & board.occupied_co[chess.BLACK])])
+        self.attack_cache = (key, maps)
+        return maps
 
     def threats(self, board):
         """
         Threat evaluation: attacked opponent pieces.
         """
+        if self.use_bitboards:
+            return self.threats_bitboards(board)
+
         score = 0
         for square in chess.SQUARES:
             attackers = board.attackers(chess.BLACK, square)
@@ -143,4 +375,62 @@ class PositionEvaluator:
             if piece and piece.color == chess.BLACK:
                 score -= len(attackers) * self.piece_values.get(piece.piece_type, 0)
 
-        return score
\ No newline at end of file
+        return score
+
+    def hanging_pieces(self, board):
+        """
+        Hanging piece evaluation: the material the side to move wins by the best static exchange
+        on an opponent piece (defended pieces only count if the exchange still wins material).
+        """
+        mover = board.turn
+        best = 0
+        for square in chess.scan_forward(board.occupied_co[not mover] & ~board.kings):
+            if board.is_attacked_by(mover, square):
+                best = max(best, see_square(board, square, mover, self.piece_values))
+        return best if mover == chess.BLACK else -best
+
+    def threats_bitboards(self, board):
+        """
+        Threat evaluation using attack maps: every attacker-victim pair adds the victim's value.
+        """
+        white, black = board.occupied_co[chess.WHITE], board.occupied_co[chess.BLACK]
+        return (self.attacked_value(board, chess.BLACK, white) -
+                self.attacked_value(board, chess.WHITE, black))
+
+    def attacked_value(self, board, color, victims):
+        """
+        Sum of the values of the victims attacked by each piece of the given color.
+        """
+        score = 0
+        for piece_type, count in self.attack_hits(board, color, victims).items():
+            score += count * self.piece_values[piece_type]
+        return score
+
+    def attack_hits(self, board, color, victims):
+        """
+        Number of (attacker, victim) pairs of the pieces of the given color, by piece type of the victim.
+        """
+        pawns = board.pawns & board.occupied_co[color]
+        if color == chess.WHITE:
+            pawn_attacks = ((pawns << 7) & NOT_FILE_H, (pawns << 9) & NOT_FILE_A)
+        else:
+            pawn_attacks = ((pawns >> 9) & NOT_FILE_H, (pawns >> 7) & NOT_FILE_A)
+
+        # Number of attacks on the victims of every piece type
+        hits = {piece_type: 0 for piece_type in (chess.PAWN, chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN)}
+        type_masks = ((chess.PAWN, board.pawns), (chess.KNIGHT, board.knights), (chess.BISHOP, board.bishops),
+                      (chess.ROOK, board.rooks), (chess.QUEEN, board.queens))
+
+        attack_maps = [attacks & victims for attacks in pawn_attacks]
+        for attacks in self.piece_attacks(board)[color == chess.BLACK]:
+            attacks &= victims
+            if attacks:
+                attack_maps.append(attacks)
+        king = board.kings & board.occupied_co[color]
+        if king:
+            attack_maps.append(chess.BB_KING_ATTACKS[chess.msb(king)] & victims)
+
+        for attacks in attack_maps:
+            for piece_type, mask in type_masks:
+                hits[piece_type] += (attacks & mask).bit_count()
+        return hits
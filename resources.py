@@ -1,5 +1,8 @@
+import logging
 import tkinter as tk
 
+logger = logging.getLogger(__name__)
+
 
 class Resources:
     def __init__(self, sq_size):
@@ -21,9 +24,9 @@ class Resources:
 
                 self.piece_images[f"{color}{piece}"] = image
 
-        print(self.piece_images)
+        logger.debug("%s", self.piece_images)
 
     def get_piece_images(self):
         """Returns a dictionary of figure images."""
-        print(self.piece_images)
+        logger.debug("%s", self.piece_images)
         return self.piece_images
@@ -0,0 +1,135 @@
+import itertools
+
+import chess
+
+MAX_SEED_PIECES = 3  # Mate positions are enumerated for material of at most this many pieces (kings included)
+
+# Mate positions of every enumerated material signature (computed once per process)
+_mate_cache = {}
+
+
+def material_signature(board):
+    """
+    Material of both sides as a string such as "KQvK" (white pieces first).
+    """
+    sides = []
+    for color in (chess.WHITE, chess.BLACK):
+        sides.append("".join(chess.piece_symbol(piece_type).upper() * len(board.pieces(piece_type, color))
+                             for piece_type in reversed(chess.PIECE_TYPES)))
+    return "v".join(sides)
+
+
+def attacks(piece_type, color, square, occupied):
+    """
+    Attack bitboard of a piece standing on square for the given occupancy.
+    """
+    if piece_type == chess.PAWN:
+        return chess.BB_PAWN_ATTACKS[color][square]
+    if piece_type == chess.KNIGHT:
+        return chess.BB_KNIGHT_ATTACKS[square]
+    if piece_type == chess.KING:
+        return chess.BB_KING_ATTACKS[square]
+    result = 0
+    if piece_type in (chess.BISHOP, chess.QUEEN):
+        result |= chess.BB_DIAG_ATTACKS[square][chess.BB_DIAG_MASKS[square] & occupied]
+    if piece_type in (chess.ROOK, chess.QUEEN):
+        result |= (chess.BB_RANK_ATTACKS[square][chess.BB_RANK_MASKS[square] & occupied]
+                   | chess.BB_FILE_ATTACKS[square][chess.BB_FILE_MASKS[square] & occupied])
+    return result
+
+
+def mate_positions(attacker, piece_types):
+    """
+    Enumerates all positions in which a lone king is checkmated by the given pieces.
+
+    :param attacker: Color of the mating side.
+    :param piece_types: Piece types of the mating side besides its king.
+    :return: List of placements (defending king square, attacking king square, squares of piece_types...);
+        the defending side is to move in all of them.
+    """
+    piece_types = tuple(sorted(piece_types, reverse=True))
+    cache_key = (attacker, piece_types)
+    if cache_key in _mate_cache:
+        return _mate_cache[cache_key]
+
+    placements = []
+    if len(piece_types) + 2 <= MAX_SEED_PIECES:
+        for defender_king in chess.SQUARES:
+            escapes = chess.BB_KING_ATTACKS[defender_king]
+            for attacker_king in chess.SQUARES:
+                if chess.BB_KING_ATTACKS[attacker_king] & chess.BB_SQUARES[defender_king] or \
+                        attacker_king == defender_king:
+                    continue
+                for squares in itertools.product(chess.SQUARES, repeat=len(piece_types)):
+                    if len(set(squares) | {defender_king, attacker_king}) != len(squares) + 2:
+                        continue
+                    if any(piece_type == chess.PAWN and chess.BB_SQUARES[square] & chess.BB_BACKRANKS
+                           for piece_type, square in zip(piece_types, squares)):
+                        continue
+                    # Sliders see through the defending king, so it cannot escape along the checking line
+                    occupied = chess.BB_SQUARES[attacker_king]
+                    for square in squares:
+                        occupied |= chess.BB_SQUARES[square]
+                    attacked = chess.BB_KING_ATTACKS[attacker_king]
+                    for piece_type, square in zip(piece_types, squares):
+                        attacked |= attacks(piece_type, attacker, square, occupied)
+                    if attacked & chess.BB_SQUARES[defender_king] and escapes & ~attacked == 0:
+                        placements.append((defender_king, attacker_king) + squares)
+
+    _mate_cache[cache_key] = placements
+    return placements
+
+
+def placement_board(attacker, piece_types, placement):
+    """
+    Builds the board of a placement returned by mate_positions (the defending side is to move).
+    """
+    board = chess.Board(None)
+    board.set_piece_at(placement[0], chess.Piece(chess.KING, not attacker))
+    board.set_piece_at(placement[1], chess.Piece(chess.KING, attacker))
+    for piece_type, square in zip(sorted(piece_types, reverse=True), placement[2:]):
+        board.set_piece_at(square, chess.Piece(piece_type, attacker))
+    board.turn = not attacker
+    return board
+
+
+def retro_moves(board):
+    """
+    Generates the non-capturing moves that could have led to the position (no un-promotions or castling).
+
+    :param board: Position without castling rights; the last move was made by the side not to move.
+    :return: Generator of (from square, to square) pairs: the piece on from square goes back to to square.
+    """
+    mover = not board.turn
+    occupied = board.occupied
+    for square in chess.scan_forward(board.occupied_co[mover]):
+        piece_type = board.piece_type_at(square)
+        if piece_type == chess.PAWN:
+            step = -8 if mover == chess.WHITE else 8
+            rank = chess.square_rank(square)
+            if (rank >= 2) if mover == chess.WHITE else (rank <= 5):
+                origins = [square + step]
+                if rank == (3 if mover == chess.WHITE else 4):
+                    origins.append(square + 2 * step)
+                for origin in origins:
+                    if occupied & chess.BB_SQUARES[origin]:
+                        break
+                    yield square, origin
+            continue
+        # Moves of non-pawn pieces are symmetric, so the squares the piece attacks are its possible origins
+        for origin in chess.scan_forward(attacks(piece_type, mover, square, occupied) & ~occupied):
+            yield square, origin
+
+
+def unmake(board, from_square, to_square):
+    """
+    Takes back a move returned by retro_moves in place. Calling it again with the squares swapped redoes it.
+
+    :return: False if the resulting position is illegal (the side that is not to move would be in check).
+    """
+    # The BaseBoard methods do not clear the move stack, which is empty anyway for retrograde positions
+    piece = chess.BaseBoard.remove_piece_at(board, from_square)
+    chess.BaseBoard.set_piece_at(board, to_square, piece)
+    board.turn = not board.turn
+    king = board.king(not board.turn)
+    return king is None or not board.is_attacked_by(board.turn, king)
@@ -0,0 +1,139 @@
+import argparse
+import time
+
+import chess
+
+# Piece values of the exchanges (the values of PositionEvaluator). The king is never captured, as the
+# exchange stops before a king would have to capture on a defended square.
+SEE_VALUES = {chess.PAWN: 1, chess.KNIGHT: 3, chess.BISHOP: 3.5, chess.ROOK: 5, chess.QUEEN: 9, chess.KING: 0}
+
+# Positions timed by main: middlegames with many captures
+TIMING_POSITIONS = [
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+    "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+    "2rq1rk1/pp1bppbp/2np1np1/8/3NP3/1BN1BP2/PPPQ2PP/2KR3R b - - 5 11",
+    "1k1r3q/1ppn3p/p4b2/4p3/8/P2N2P1/1PP1R1BP/2K1Q3 w - - 0 1",
+]
+
+
+def attackers_to(board, square, occupied):
+    """
+    Pieces of both colors among the occupied squares that attack the square. Sliders are looked up
+    with the given occupancy, so removing a piece from it reveals the x-ray attackers behind it.
+    """
+    queens = board.queens
+    rank_file = (chess.BB_RANK_ATTACKS[square][chess.BB_RANK_MASKS[square] & occupied]
+                 | chess.BB_FILE_ATTACKS[square][chess.BB_FILE_MASKS[square] & occupied])
+    diagonal = chess.BB_DIAG_ATTACKS[square][chess.BB_DIAG_MASKS[square] & occupied]
+    pawns = board.pawns
+    return ((rank_file & (board.rooks | queens)) | (diagonal & (board.bishops | queens))
+            | (chess.BB_KNIGHT_ATTACKS[square] & board.knights) | (chess.BB_KING_ATTACKS[square] & board.kings)
+            | (chess.BB_PAWN_ATTACKS[chess.WHITE][square] & pawns & board.occupied_co[chess.BLACK])
+            | (chess.BB_PAWN_ATTACKS[chess.BLACK][square] & pawns & board.occupied_co[chess.WHITE])) & occupied
+
+
+def exchange(board, square, occupied, piece_type, color, gain, values):
+    """
+    Swap algorithm: both sides recapture on the square with their least valuable attacker, and every side may
+    stop the sequence when continuing would lose material.
+
+    :param occupied: Occupancy after the first capture (the first attacker removed from its square).
+    :param piece_type: Type of the piece standing on the square after the first capture.
+    :param color: Color of the side that recaptures first.
+    :param gain: Material won by the first capture.
+    :return: Material won by the first capture after the best exchange.
+    """
+    gains = [gain]
+    while True:
+        attackers = attackers_to(board, square, occupied) & board.occupied_co[color]
+        if not attackers:
+            break
+        for attacker_type, mask in ((chess.PAWN, board.pawns), (chess.KNIGHT, board.knights),
+                                    (chess.BISHOP, board.bishops), (chess.ROOK, board.rooks),
+                                    (chess.QUEEN, board.queens), (chess.KING, board.kings)):
+            if attackers & mask:
+                break
+        attacker = attackers & mask & -(attackers & mask)  # One attacker of the least valuable type
+        occupied ^= attacker
+        if attacker_type == chess.KING and attackers_to(board, square, occupied) & board.occupied_co[not color]:
+            break  # The king cannot capture on a defended square
+        gains.append(values[piece_type] - gains[-1])
+        piece_type = attacker_type
+        color = not color
+
+    # Every side takes the better of stopping before its capture and continuing
+    for index in range(len(gains) - 1, 0, -1):
+        gains[index - 1] = -max(-gains[index - 1], gains[index])
+    return gains[0]
+
+
+def see(board, move, values=None):
+    """
+    Static exchange evaluation of a move: the material the side to move wins on the target square when both
+    sides recapture there, including x-ray attackers behind the capturing pieces (pins are not considered).
+    A quiet move gives the value of the exchange that the opponent can start on the target square.
+
+    :param board: Position before the move.
+    :param move: Legal move of the position.
+    :param values: Piece values (SEE_VALUES by default).
+    :return: Material balance of the exchange for the side to move.
+    """
+    values = values or SEE_VALUES
+    from_square, to_square = move.from_square, move.to_square
+    occupied = board.occupied ^ chess.BB_SQUARES[from_square]
+    if board.is_en_passant(move):
+        captured_type = chess.PAWN
+        occupied ^= chess.BB_SQUARES[to_square - 8 if board.turn == chess.WHITE else to_square + 8]
+    else:
+        captured_type = board.piece_type_at(to_square)
+    gain = values[captured_type] if captured_type else 0
+    piece_type = board.piece_type_at(from_square)
+    if move.promotion:
+        gain += values[move.promotion] - values[chess.PAWN]
+        piece_type = move.promotion
+    return exchange(board, to_square, occupied | chess.BB_SQUARES[to_square], piece_type, not board.turn, gain,
+                    values)
+
+
+def see_square(board, square, color, values=None):
+    """
+    Static exchange evaluation of capturing the piece on the square with the least valuable attacker.
+
+    :param color: Side that captures.
+    :return: Material the capturing side wins (0 if the piece is not attacked or capturing it loses material).
+    """
+    values = values or SEE_VALUES
+    captured_type = board.piece_type_at(square)
+    # Starting the exchange one ply earlier: the captured piece is "moved" to the square by the opponent
+    return -exchange(board, square, board.occupied, captured_type, color, 0, values)
+
+
+def time_see(repeat=1000, fens=None):
+    """
+    Average time of one see call over the captures of the positions.
+
+    :return: (number of captures, microseconds per call)
+    """
+    calls = []
+    for fen in fens or TIMING_POSITIONS:
+        board = chess.Board(fen)
+        calls += [(board, move) for move in board.generate_legal_captures()]
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for board, move in calls:
+            see(board, move)
+    return len(calls), (time.perf_counter() - start) / (repeat * len(calls)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Times the static exchange evaluation of captures")
+    parser.add_argument("fens", nargs="*", help="positions whose captures are timed (middlegames by default)")
+    parser.add_argument("--repeat", type=int, default=1000, help="repetitions of the timing")
+    args = parser.parse_args()
+
+    captures, microseconds = time_see(args.repeat, args.fens)
+    print(f"{captures} captures, {microseconds:.1f} µs per call")
+
+
+if __name__ == "__main__":
+    main()
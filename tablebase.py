@@ -0,0 +1,261 @@
+import os
+import threading
+
+import chess
+import chess.syzygy
+
+import retrograde
+
+TB_WIN = 20000  # Score of a tablebase win (below checkmate scores, so a mate found by the search is preferred)
+GENERATED_PIECE_TYPES = (chess.QUEEN, chess.ROOK, chess.BISHOP, chess.KNIGHT)  # Pieces of the generated KXK tables
+
+
+def _transpose(square):
+    return chess.square(chess.square_rank(square), chess.square_file(square))
+
+
+# The eight symmetries of the board (pawnless positions without castling rights look the same in all of them)
+SYMMETRIES = []
+for _flip_file in (False, True):
+    for _flip_rank in (False, True):
+        for _transposed in (False, True):
+            _mapping = []
+            for _square in chess.SQUARES:
+                _square = _square ^ 7 if _flip_file else _square
+                _square = _square ^ 56 if _flip_rank else _square
+                _mapping.append(_transpose(_square) if _transposed else _square)
+            SYMMETRIES.append(_mapping)
+
+
+# Symmetries that map each defending king square to the smallest square of its class
+# (one symmetry, or two for squares on the a1-h8 diagonal)
+KING_SYMMETRIES = [[mapping for mapping in SYMMETRIES
+                    if mapping[square] == min(other[square] for other in SYMMETRIES)]
+                   for square in chess.SQUARES]
+
+
+def canonical_index(defender_king, attacker_king, piece_square):
+    """
+    Index of a KXK placement that is the same for all its symmetric images.
+    """
+    index = None
+    for mapping in KING_SYMMETRIES[defender_king]:
+        image = mapping[defender_king] << 12 | mapping[attacker_king] << 6 | mapping[piece_square]
+        if index is None or image < index:
+            index = image
+    return index
+
+
+class GeneratedTable:
+    def __init__(self, piece_type):
+        """
+        Distance-to-mate table of king and piece against a lone king, built by retrograde analysis.
+        Positions are stored once per symmetry class; the attacking side's color does not matter.
+
+        :param piece_type: Piece of the attacking side besides its king.
+        """
+        self.piece_type = piece_type
+        # Distance to mate in plies + 1 of every won position (0: draw or illegal)
+        self.attacker_to_move = bytearray(1 << 18)
+        self.defender_to_move = bytearray(1 << 18)
+        self.generate()
+
+    def attacked(self, attacker_king, piece_square, occupied):
+        """
+        Squares attacked by the attacking side.
+        """
+        return chess.BB_KING_ATTACKS[attacker_king] | retrograde.attacks(self.piece_type, chess.WHITE, piece_square,
+                                                                         occupied)
+
+    def generate(self):
+        """
+        Labels the positions ply by ply backwards from all checkmates.
+        """
+        frontier = []
+        for placement in retrograde.mate_positions(chess.WHITE, [self.piece_type]):
+            index = canonical_index(*placement)
+            if not self.defender_to_move[index]:
+                self.defender_to_move[index] = 1
+                frontier.append(placement)
+
+        distance = 0
+        while frontier:
+            # Attacker to move: one move into a lost position of the defender is enough
+            won = []
+            for defender_king, attacker_king, piece_square in frontier:
+                occupied = (chess.BB_SQUARES[attacker_king] | chess.BB_SQUARES[piece_square]
+                            | chess.BB_SQUARES[defender_king])
+                predecessors = [(origin, piece_square) for origin in chess.scan_forward(
+                    chess.BB_KING_ATTACKS[attacker_king] & ~occupied & ~chess.BB_KING_ATTACKS[defender_king])]
+                predecessors += [(attacker_king, origin) for origin in chess.scan_forward(
+                    retrograde.attacks(self.piece_type, chess.WHITE, piece_square, occupied) & ~occupied)]
+                for king, square in predecessors:
+                    # The defender must not be in check with the attacker to move
+                    occupied = chess.BB_SQUARES[king] | chess.BB_SQUARES[square]
+                    if self.attacked(king, square, occupied) & chess.BB_SQUARES[defender_king]:
+                        continue
+                    index = canonical_index(defender_king, king, square)
+                    if not self.attacker_to_move[index]:
+                        self.attacker_to_move[index] = distance + 2
+                        won.append((defender_king, king, square))
+
+            # Defender to move: lost only if every move leads to a won position of the attacker
+            frontier = []
+            for defender_king, attacker_king, piece_square in won:
+                occupied = chess.BB_SQUARES[attacker_king] | chess.BB_SQUARES[piece_square]
+                attacked = self.attacked(attacker_king, piece_square, occupied)
+                for origin in chess.scan_forward(chess.BB_KING_ATTACKS[defender_king] & ~occupied
+                                                 & ~chess.BB_KING_ATTACKS[attacker_king]):
+                    index = canonical_index(origin, attacker_king, piece_square)
+                    if self.defender_to_move[index]:
+                        continue
+                    escapes = chess.BB_KING_ATTACKS[origin] & ~attacked
+                    if not escapes or escapes & chess.BB_SQUARES[piece_square]:
+                        continue  # Stalemate (checkmates are already labelled) or the piece can be captured
+                    if all(self.attacker_to_move[canonical_index(escape, attacker_king, piece_square)]
+                           for escape in chess.scan_forward(escapes)):
+                        self.defender_to_move[index] = distance + 3
+                        frontier.append((origin, attacker_king, piece_square))
+            distance += 2
+
+    def probe(self, board):
+        """
+        :return: (WDL from the side to move's point of view, distance to mate in plies)
+        """
+        attacker = chess.WHITE if board.occupied_co[chess.WHITE] & ~board.kings else chess.BLACK
+        piece_square = chess.lsb(board.occupied_co[attacker] & ~board.kings)
+        index = canonical_index(board.king(not attacker), board.king(attacker), piece_square)
+        if board.turn == attacker:
+            distance = self.attacker_to_move[index]
+            return (2, distance - 1) if distance else (0, None)
+        distance = self.defender_to_move[index]
+        return (-2, distance - 1) if distance else (0, None)
+
+
+# Generated tables of the process (piece type -> GeneratedTable), shared by all Tablebase instances
+_generated_tables = {}
+_generation_lock = threading.Lock()
+_generation_thread = None
+
+
+def _generate_tables():
+    for piece_type in GENERATED_PIECE_TYPES:
+        if piece_type not in _generated_tables:
+            _generated_tables[piece_type] = GeneratedTable(piece_type)
+
+
+def start_generation():
+    """
+    Starts generating the tables of king and piece against a lone king on a background thread (once per process;
+    generating them all takes a few seconds).
+
+    :return: The generation thread.
+    """
+    global _generation_thread
+    with _generation_lock:
+        if _generation_thread is None:
+            _generation_thread = threading.Thread(target=_generate_tables, name="tablebase-generation", daemon=True)
+            _generation_thread.start()
+        return _generation_thread
+
+
+class Tablebase:
+    def __init__(self, syzygy_dir=None):
+        """
+        Endgame tablebases: Syzygy files from a local directory if available, otherwise tables of king and piece
+        against a lone king. These are generated on a background thread started here, and their positions are
+        not covered until they are ready, so a search never waits for the generation.
+
+        :param syzygy_dir: Directory with Syzygy .rtbw/.rtbz files (optional).
+        """
+        self.syzygy = None
+        if syzygy_dir is not None and os.path.isdir(syzygy_dir):
+            self.syzygy = chess.syzygy.open_tablebase(syzygy_dir)
+        # Largest number of pieces that can be probed
+        self.max_pieces = max(3, self.syzygy.largest_wdl()) if self.syzygy is not None else 3
+        self.generated = _generated_tables  # Piece type -> GeneratedTable (filled in by the generation thread)
+        self.generation_thread = start_generation()
+        self.hits = 0
+
+    def wait_for_tables(self, timeout=None):
+        """
+        Waits until the generated tables are ready.
+
+        :return: True if they are ready.
+        """
+        self.generation_thread.join(timeout)
+        return not self.generation_thread.is_alive()
+
+    def probe(self, board):
+        """
+        Probes the position.
+
+        :return: (WDL from the side to move's point of view: 2 win, 0 draw, -2 loss; distance in plies or None),
+            or None if the position is not covered.
+        """
+        if chess.popcount(board.occupied) > self.max_pieces or board.castling_rights:
+            return None
+
+        if self.syzygy is not None:
+            try:
+                wdl = self.syzygy.probe_wdl(board)
+            except KeyError:
+                wdl = None  # The table of this material is missing
+            if wdl is not None:
+                distance = None
+                if wdl:
+                    try:
+                        distance = abs(self.syzygy.probe_dtz(board))
+                    except KeyError:
+                        pass  # The DTZ table is missing: the WDL result is still valid, without a distance
+                self.hits += 1
+                # Cursed wins and blessed losses are draws under the fifty-move rule
+                return (2 if wdl == 2 else -2 if wdl == -2 else 0), distance
+
+        if chess.popcount(board.occupied) > 3:
+            return None
+        if chess.popcount(board.occupied) == 2:
+            self.hits += 1
+            return 0, None
+        piece_type = board.piece_type_at(chess.lsb(board.occupied & ~board.kings))
+        table = self.generated.get(piece_type)
+        if table is None:
+            return None  # Not a generated material, or its table is not ready yet
+        self.hits += 1
+        return table.probe(board)
+
+    def score(self, board):
+        """
+        Tablebase result as a search score from the side to move's point of view (faster wins score higher).
+
+        :return: The score, or None if the position is not covered.
+        """
+        result = self.probe(board)
+        if result is None:
+            return None
+        wdl, distance = result
+        if wdl == 0:
+            return 0
+        return (TB_WIN - (distance or 0)) * (1 if wdl > 0 else -1)
+
+    def best_move(self, board):
+        """
+        Chooses the move with the best tablebase result: the fastest win, the slowest loss or a draw.
+
+        :return: The move, or None if the position is not covered.
+        """
+        if self.probe(board) is None:
+            return None
+        best_move, best_score = None, None
+        for move in board.legal_moves:
+            board.push(move)
+            if board.is_checkmate():
+                board.pop()
+                return move
+            score = self.score(board)
+            board.pop()
+            if score is None:
+                return None
+            if best_score is None or -score > best_score:
+                best_move, best_score = move, -score
+        return best_move
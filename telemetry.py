@@ -0,0 +1,190 @@
+import cProfile
+import io
+import json
+import logging
+import pstats
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def searched_nodes(bot):
+    """
+    Number of nodes visited by the current search of a bot.
+    """
+    if hasattr(bot, "forward_nodes"):
+        return bot.forward_nodes + bot.backward_nodes
+    return getattr(bot, "nodes_explored", 0) + getattr(bot, "qnodes_explored", 0)
+
+
+class SearchStats:
+    def __init__(self, engine, evaluator=None):
+        """
+        Counters of a single search, filled in by the engine that ran it.
+
+        :param engine: Name of the engine ("dfs", "pvs", "bfs", "bds", "parallel") or the source of the move
+            ("book", "tablebase").
+        :param evaluator: Evaluator of the search; its evaluate calls and pawn hash table probes during the search
+            are counted.
+        """
+        self.engine = engine
+        self.evaluator = evaluator
+        self.evaluations_before = getattr(evaluator, "evaluations", 0)
+        pawn_cache = getattr(evaluator, "pawn_cache", None)
+        self.pawn_probes_before = pawn_cache.probes if pawn_cache is not None else 0
+        self.pawn_hits_before = pawn_cache.hits if pawn_cache is not None else 0
+        self.start = time.perf_counter()
+        self.move = None
+        self.score = None
+        self.depth = 0  # Depth of the last completed iteration
+        self.nodes = 0
+        self.qnodes = 0
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.tt_cutoffs = 0
+        self.cutoffs = 0  # Beta cut-offs of the search
+        self.evaluations = 0
+        self.pawn_probes = 0  # Pawn hash table probes of the evaluator
+        self.pawn_hits = 0
+        self.iterations = []  # {"depth", "move", "score", "nodes", "time_s"} of every completed iteration
+        self.time_s = 0.0
+        self.profile = None  # pstats.Stats of a profiled search
+
+    def track(self, on_iteration, count_nodes):
+        """
+        Wraps an iteration callback of iterative_deepening so the time and nodes of every depth are recorded.
+
+        :param on_iteration: Callback of the caller (optional).
+        :param count_nodes: Function returning the nodes searched so far.
+        """
+        def callback(depth, move, score):
+            self.iterations.append({"depth": depth, "move": move.uci(), "score": score, "nodes": count_nodes(),
+                                    "time_s": round(time.perf_counter() - self.start, 4)})
+            if on_iteration is not None:
+                on_iteration(depth, move, score)
+        return callback
+
+    def finish(self, move, score=None, depth=None):
+        """
+        Records the result and the duration of the search.
+        """
+        self.time_s = time.perf_counter() - self.start
+        self.move = move
+        if self.iterations:
+            self.score = self.iterations[-1]["score"] if score is None else score
+            self.depth = self.iterations[-1]["depth"] if depth is None else depth
+        else:
+            self.score, self.depth = score, depth or 0
+        if self.evaluator is not None:
+            self.evaluations = getattr(self.evaluator, "evaluations", 0) - self.evaluations_before
+            pawn_cache = getattr(self.evaluator, "pawn_cache", None)
+            if pawn_cache is not None:
+                self.pawn_probes = pawn_cache.probes - self.pawn_probes_before
+                self.pawn_hits = pawn_cache.hits - self.pawn_hits_before
+        return self
+
+    def nps(self):
+        return (self.nodes + self.qnodes) / self.time_s if self.time_s else 0.0
+
+    def tt_hit_rate(self):
+        return self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+
+    def pawn_hit_rate(self):
+        return self.pawn_hits / self.pawn_probes if self.pawn_probes else 0.0
+
+    def as_dict(self):
+        return {"engine": self.engine, "move": self.move.uci() if self.move is not None else None,
+                "score": self.score, "depth": self.depth, "nodes": self.nodes, "qnodes": self.qnodes,
+                "tt_probes": self.tt_probes, "tt_hits": self.tt_hits, "tt_cutoffs": self.tt_cutoffs,
+                "cutoffs": self.cutoffs, "evaluations": self.evaluations, "pawn_probes": self.pawn_probes,
+                "pawn_hits": self.pawn_hits, "time_s": round(self.time_s, 4),
+                "nps": round(self.nps()), "iterations": self.iterations}
+
+    def summary(self):
+        return (f"{self.engine}: move {self.move}, depth {self.depth}, {self.nodes} nodes (+{self.qnodes} quiescence), "
+                f"{self.time_s:.2f} s, {self.nps():.0f} nps, TT hit rate {self.tt_hit_rate():.1%}, "
+                f"{self.cutoffs} cut-offs, {self.evaluations} evaluations, "
+                f"pawn hash hit rate {self.pawn_hit_rate():.1%}")
+
+
+class LoggingSink:
+    def __init__(self, log=None, level=logging.INFO):
+        """
+        Writes a one-line summary of every search to a logger.
+        """
+        self.log = log or logger
+        self.level = level
+
+    def emit(self, stats):
+        self.log.log(self.level, "%s", stats.summary())
+
+    def close(self):
+        pass
+
+
+class JsonlSink:
+    def __init__(self, path):
+        """
+        Appends every search as a JSON line to a file.
+        """
+        self.file = open(path, "a", encoding="utf-8")
+
+    def emit(self, stats):
+        self.file.write(json.dumps(stats.as_dict()) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class MemorySink:
+    def __init__(self):
+        """
+        Keeps the SearchStats of every search (for tests and benchmarks).
+        """
+        self.records = []
+
+    def emit(self, stats):
+        self.records.append(stats)
+
+    def close(self):
+        pass
+
+
+class Telemetry:
+    def __init__(self, sinks=(), profile=False, profile_lines=20):
+        """
+        Collects the statistics of the searches of a controller. Without sinks and profiling nothing is done
+        besides filling the SearchStats the engines keep anyway.
+
+        :param sinks: Objects with emit(stats) and close() receiving every search.
+        :param profile: Run every search under cProfile (can also be requested per search).
+        :param profile_lines: Number of functions of the profile written to the log.
+        """
+        self.sinks = list(sinks)
+        self.profile = profile
+        self.profile_lines = profile_lines
+
+    def run(self, function, *args, profile=None):
+        """
+        Calls function(*args), under cProfile if profiling is enabled.
+
+        :return: (result, pstats.Stats or None)
+        """
+        if not (self.profile if profile is None else profile):
+            return function(*args), None
+        profiler = cProfile.Profile()
+        result = profiler.runcall(function, *args)
+        stream = io.StringIO()
+        profile_stats = pstats.Stats(profiler, stream=stream)
+        profile_stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.profile_lines)
+        logger.info("Search profile:\n%s", stream.getvalue())
+        return result, profile_stats
+
+    def emit(self, stats):
+        for sink in self.sinks:
+            sink.emit(stats)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
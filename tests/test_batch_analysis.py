@@ -0,0 +1,30 @@
+import logging
+
+import chess
+
+from batch_analysis import read_epd, read_pgn
+
+
+def test_malformed_epd_records_are_skipped(tmp_path, caplog):
+    path = tmp_path / "positions.epd"
+    path.write_text("rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - id \"e4\";\n"
+                    "not a position\n"
+                    "# comment\n"
+                    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR x KQkq -\n"
+                    "4k3/8/8/8/8/8/8/4K2R w K - bm O-O;\n", encoding="utf-8")
+    with caplog.at_level(logging.WARNING, logger="batch_analysis"):
+        positions = list(read_epd(str(path)))
+    assert [position_id for position_id, _ in positions] == ["e4", "positions.epd:5"]
+    assert positions[1][1] == "4k3/8/8/8/8/8/8/4K2R w K - 0 1"
+    assert "positions.epd:2" in caplog.text and "positions.epd:4" in caplog.text
+
+
+def test_pgn_errors_are_reported(tmp_path, caplog):
+    path = tmp_path / "games.pgn"
+    path.write_text("1. e4 e5 2. Qxf7 Nc6 *\n\n1. d4 d5 *\n", encoding="utf-8")
+    with caplog.at_level(logging.WARNING, logger="batch_analysis"):
+        positions = list(read_pgn(str(path)))
+    assert [position_id for position_id, _ in positions] == ["games.pgn:1:0", "games.pgn:1:1", "games.pgn:2:0",
+                                                             "games.pgn:2:1"]
+    assert positions[0][1] == chess.STARTING_FEN
+    assert "game 1" in caplog.text
@@ -0,0 +1,71 @@
+import random
+
+import chess
+import numpy as np
+import pytest
+
+from batch_evaluator import BatchEvaluator, decode, encode
+from position_evaluator import PositionEvaluator
+
+# Positions ending the games early: checkmates (of both colors) and a stalemate
+TERMINAL = [
+    "rnb1kbnr/pppp1ppp/8/4p3/6Pq/5P2/PPPPP2P/RNBQKBNR w KQkq - 1 3",
+    "r1bqkb1r/pppp1Qpp/2n2n2/4p3/2B1P3/8/PPPP1PPP/RNB1K1NR b KQkq - 0 4",
+    "7k/5Q2/6K1/8/8/8/8/8 b - - 0 1",
+]
+
+
+def random_positions(seed, count=200):
+    """
+    Positions of seeded random games.
+    """
+    rng = random.Random(seed)
+    positions = []
+    board = chess.Board()
+    while len(positions) < count:
+        moves = list(board.legal_moves)
+        if not moves or board.is_insufficient_material() or len(board.move_stack) > 150:
+            board = chess.Board()
+            continue
+        board.push(rng.choice(moves))
+        positions.append(board.copy(stack=False))
+    return positions + [chess.Board(fen) for fen in TERMINAL]
+
+
+@pytest.fixture(params=[0, 2], ids=["hanging off", "hanging on"])
+def evaluator(request):
+    evaluator = PositionEvaluator()
+    evaluator.weights["hanging"] = request.param
+    return evaluator
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_batch_matches_scalar_evaluation(evaluator, seed):
+    boards = random_positions(seed)
+    expected = [evaluator.evaluate(board) for board in boards]
+    batch_evaluator = BatchEvaluator(evaluator)
+    np.testing.assert_allclose(batch_evaluator.evaluate_batch(boards), expected, rtol=1e-9, atol=1e-9)
+    rows = np.array([encode(board) for board in boards], dtype=np.uint64)
+    np.testing.assert_allclose(batch_evaluator.evaluate_batch(rows), expected, rtol=1e-9, atol=1e-9)
+
+
+def test_evaluate_moves_matches_scalar_evaluation(evaluator):
+    batch_evaluator = BatchEvaluator(evaluator)
+    for board in random_positions(3, 40):
+        moves = list(board.legal_moves)
+        if not moves:
+            continue
+        fen = board.fen()
+        expected = []
+        for move in moves:
+            board.push(move)
+            expected.append(-evaluator.evaluate(board))
+            board.pop()
+        np.testing.assert_allclose(batch_evaluator.evaluate_moves(board, moves), expected, rtol=1e-9, atol=1e-9)
+        assert board.fen() == fen
+
+
+def test_encode_decode_round_trip():
+    for board in random_positions(4, 50):
+        decoded = decode(encode(board))  # Castling rights and the en passant square are not encoded
+        assert decoded.board_fen() == board.board_fen() and decoded.turn == board.turn
@@ -0,0 +1,37 @@
+import logging
+import pstats
+
+import chess
+
+from chess_bot_controller import ChessBotController
+from telemetry import MemorySink, Telemetry
+
+MIDDLEGAME = "r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4"
+
+
+def make_controller(telemetry=None):
+    return ChessBotController(dfs_depth=2, bfs_depth=2, bds_depth=1, engine="pvs", use_tablebase=False,
+                              telemetry=telemetry)
+
+
+def test_profile_without_telemetry(caplog):
+    controller = make_controller()
+    with caplog.at_level(logging.INFO, logger="telemetry"):
+        move, stats = controller.analyse(chess.Board(MIDDLEGAME), profile=True)
+    assert move in chess.Board(MIDDLEGAME).legal_moves
+    assert isinstance(stats.profile, pstats.Stats)
+    assert "Search profile" in caplog.text
+
+
+def test_no_profile_by_default():
+    controller = make_controller()
+    _, stats = controller.analyse(chess.Board(MIDDLEGAME))
+    assert stats.profile is None
+
+
+def test_telemetry_receives_the_searches():
+    sink = MemorySink()
+    controller = make_controller(Telemetry([sink], profile=True))
+    _, stats = controller.analyse(chess.Board(MIDDLEGAME))
+    assert isinstance(stats.profile, pstats.Stats)
+    assert sink.records == [stats]
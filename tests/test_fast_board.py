@@ -0,0 +1,49 @@
+import random
+
+import chess
+import pytest
+
+import zobrist
+from fast_board import PERFT_SUITE, FastBoard, decode_move, encode_move
+
+PERFT_DEPTH = 3  # Deepest perft of the suite run by the tests
+
+
+@pytest.mark.parametrize("fen, counts", PERFT_SUITE.items(), ids=[fen.split()[0] for fen in PERFT_SUITE])
+def test_perft(fen, counts):
+    fast_board = FastBoard(chess.Board(fen))
+    for depth in range(1, PERFT_DEPTH + 1):
+        assert fast_board.perft(depth) == counts[depth]
+    assert fast_board.to_board().fen() == chess.Board(fen).fen()  # Unmake restored the position
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_random_games_match_python_chess(seed):
+    rng = random.Random(seed)
+    board = chess.Board()
+    fast_board = FastBoard(board)
+    for _ in range(200):
+        moves = sorted(fast_board.legal_moves())
+        assert moves == sorted(encode_move(move) for move in board.legal_moves)
+        assert fast_board.is_check() == board.is_check()
+        if not moves:
+            assert fast_board.is_checkmate() == board.is_checkmate()
+            break
+        move = rng.choice(moves)
+        fast_board.make(move)
+        board.push(decode_move(move))
+        assert fast_board.key == zobrist.compute_hash(board)
+        assert fast_board.to_board().fen() == board.fen()
+
+    while board.move_stack:
+        fast_board.unmake()
+        board.pop()
+        assert fast_board.key == zobrist.compute_hash(board)
+        assert fast_board.to_board().fen() == board.fen()
+
+
+@pytest.mark.parametrize("uci", ["e2e4", "e1g1", "e8c8", "a7a8q", "b2a1n", "h7g8r"])
+def test_encode_decode_move(uci):
+    move = chess.Move.from_uci(uci)
+    assert decode_move(encode_move(move)) == move
+    assert encode_move(move) < 1 << 16  # Fits the unsigned short node store of ChessBotBDS
@@ -0,0 +1,92 @@
+import random
+
+import chess
+import pytest
+
+from incremental_evaluator import IncrementalEvaluator
+from position_evaluator import PositionEvaluator
+
+# Positions where castling, en passant and promotion (with and without capture) are legal
+SPECIAL_MOVES = [
+    ("r3k2r/pppq1ppp/2n1bn2/2b1p3/2B1P3/2N1BN2/PPPQ1PPP/R3K2R w KQkq - 0 1", ["e1g1", "e1c1"]),
+    ("r3k2r/pppq1ppp/2n1bn2/2b1p3/2B1P3/2N1BN2/PPPQ1PPP/R3K2R b KQkq - 0 1", ["e8g8", "e8c8"]),
+    ("rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPP1PPP/RNBQKBNR w KQkq f6 0 3", ["e5f6"]),
+    ("4k3/8/8/8/2pP4/8/8/4K3 b - d3 0 1", ["c4d3"]),
+    ("1r2k3/P7/8/8/8/8/7p/4K1N1 w - - 0 1", ["a7a8q", "a7b8n", "a7a8r"]),
+    ("4k3/8/8/8/8/8/7p/4K1N1 b - - 0 1", ["h2g1q", "h2h1b", "h2h1q"]),
+]
+
+
+def assert_same_evaluation(incremental, reference, board):
+    moves = list(board.legal_moves)
+    assert incremental.evaluate(board) == pytest.approx(reference.evaluate(board))
+    assert incremental.evaluate(board, moves) == pytest.approx(reference.evaluate(board, moves))
+
+
+@pytest.mark.parametrize("use_bitboards", [True, False])
+@pytest.mark.parametrize("seed", range(8))
+def test_random_games_match_full_evaluation(seed, use_bitboards):
+    rng = random.Random(seed)
+    incremental = IncrementalEvaluator(use_bitboards)
+    reference = PositionEvaluator(use_bitboards)
+    board = chess.Board()
+    incremental.reset(board)
+
+    for _ in range(300):
+        moves = list(board.legal_moves)
+        if not moves:
+            break
+        if len(board.move_stack) > 2 and rng.random() < 0.2:  # Take back a move now and then
+            board.pop()
+            incremental.on_pop(board)
+        else:
+            move = rng.choice(moves)
+            incremental.on_push(board, move)
+            board.push(move)
+        assert_same_evaluation(incremental, reference, board)
+        assert incremental.synced_length == len(board.move_stack)
+
+    # The accumulators come back to the starting position
+    while board.move_stack:
+        board.pop()
+        incremental.on_pop(board)
+        assert_same_evaluation(incremental, reference, board)
+    assert incremental.history == []
+
+
+@pytest.mark.parametrize("fen, ucis", SPECIAL_MOVES)
+def test_special_moves_match_full_evaluation(fen, ucis):
+    incremental = IncrementalEvaluator()
+    reference = PositionEvaluator()
+    board = chess.Board(fen)
+    incremental.reset(board)
+    before = incremental.evaluate(board)
+
+    for uci in ucis:
+        move = chess.Move.from_uci(uci)
+        assert move in board.legal_moves
+        incremental.on_push(board, move)
+        board.push(move)
+        assert_same_evaluation(incremental, reference, board)
+        board.pop()
+        incremental.on_pop(board)
+        assert incremental.evaluate(board) == pytest.approx(before)
+
+
+def test_null_move_keeps_accumulators():
+    incremental = IncrementalEvaluator()
+    reference = PositionEvaluator()
+    board = chess.Board("r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3")
+    incremental.reset(board)
+    incremental.on_push(board, chess.Move.null())
+    board.push(chess.Move.null())
+    assert_same_evaluation(incremental, reference, board)
+
+
+def test_board_changed_without_hooks_is_resynced():
+    incremental = IncrementalEvaluator()
+    reference = PositionEvaluator()
+    board = chess.Board()
+    incremental.reset(board)
+    board.push_san("e4")  # The hooks are not called
+    assert_same_evaluation(incremental, reference, board)
@@ -0,0 +1,40 @@
+import chess
+import pytest
+
+from chess_bot_dfs import ChessBotDFS
+from parallel_search import ParallelChessBotDFS
+from position_evaluator import PositionEvaluator
+
+# Positions with a single clearly best move
+POSITIONS = [
+    "rnb1kbnr/pppp1ppp/8/4p1q1/3P4/8/PPP1PPPP/RNBQKBNR w KQkq - 0 3",  # The bishop takes the queen
+    "6k1/5ppp/8/8/8/8/5PPP/R5K1 w - - 0 1",  # Back rank mate
+]
+
+
+@pytest.fixture(scope="module")
+def parallel_bot():
+    bot = ParallelChessBotDFS(2, PositionEvaluator(), workers=2, tt_size_mb=1)
+    yield bot
+    bot.close()
+
+
+@pytest.mark.parametrize("fen", POSITIONS)
+def test_parallel_and_serial_search_agree(parallel_bot, fen):
+    serial_bot = ChessBotDFS(2, PositionEvaluator(), tt_size_mb=1)
+    board = chess.Board(fen)
+    serial_move = serial_bot.get_best_move(board.copy())
+    assert parallel_bot.get_best_move(board.copy()) == serial_move
+    assert parallel_bot.completed_depth == 2
+    assert parallel_bot.best_score == pytest.approx(serial_bot.search_stats.score)
+
+
+def test_time_limit_includes_worker_start_up():
+    # The budget is used up while the worker processes start, so they stop after their first iteration
+    bot = ParallelChessBotDFS(4, PositionEvaluator(), workers=2, tt_size_mb=1)
+    try:
+        move = bot.get_best_move(chess.Board(), time_limit_ms=50)
+    finally:
+        bot.close()
+    assert move in chess.Board().legal_moves
+    assert bot.completed_depth == 1
@@ -0,0 +1,53 @@
+import chess
+
+from persistent_cache import PersistentCache
+from position_evaluator import PositionEvaluator
+from transposition_table import TranspositionTable, EXACT, LOWER
+
+KEY = (1 << 64) - 12345  # Keys above 2^63 are stored as negative integers
+MOVE = chess.Move.from_uci("e2e4")
+
+
+def test_store_and_reload_keeps_the_deeper_entry(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = PersistentCache(path, "weights-a", batch_size=1)
+    cache.store(KEY, 5, 1.5, EXACT, MOVE)
+    cache.store(KEY, 3, -2.0, LOWER, None)  # Shallower result in a later batch
+    cache.close()
+
+    cache = PersistentCache(path, "weights-a")
+    assert cache.probe(KEY) == (5, 1.5, EXACT, MOVE)
+    cache.store(KEY, 7, 0.5, LOWER, None)
+    cache.close()
+
+    cache = PersistentCache(path, "weights-a")
+    assert cache.probe(KEY) == (7, 0.5, LOWER, None)
+    cache.close()
+
+
+def test_other_signature_empties_the_store(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = PersistentCache(path, "weights-a")
+    cache.store(KEY, 5, 1.5, EXACT, MOVE)
+    cache.close()
+
+    cache = PersistentCache(path, "weights-b")
+    assert cache.probe(KEY) is None
+    cache.close()
+
+
+def test_signature_follows_the_weights():
+    evaluator = PositionEvaluator()
+    signature = evaluator.signature()
+    assert PositionEvaluator().signature() == signature
+    evaluator.weights["center"] += 1
+    assert evaluator.signature() != signature
+
+
+def test_only_nodes_near_the_root_probe_the_store(tmp_path):
+    cache = PersistentCache(str(tmp_path / "cache.sqlite"), "weights-a", max_ply=1)
+    cache.store(KEY, 5, 1.5, EXACT, MOVE)
+    table = TranspositionTable(1, cache)
+    assert table.probe(KEY, 5, ply=2) is None
+    assert table.probe(KEY, 5, ply=1)[1:5] == (5, 1.5, EXACT, MOVE)
+    cache.close()
@@ -0,0 +1,86 @@
+import chess
+
+from iterative_deepening import CancellationToken
+from ponder import Ponderer
+
+
+class SlicedBot:
+    def __init__(self, slices, token):
+        """
+        Bot whose successive searches complete the given iterations [(depth, move UCI), ...]; the token is
+        cancelled after the last slice.
+        """
+        self.slices = list(slices)
+        self.token = token
+
+    def get_best_move(self, board, time_limit_ms=None, token=None, depth=None, node_limit=None, on_iteration=None):
+        iterations = self.slices.pop(0)
+        for iteration_depth, uci in iterations:
+            on_iteration(iteration_depth, chess.Move.from_uci(uci), 0)
+        if not self.slices:
+            self.token.cancel()
+        return chess.Move.from_uci(iterations[-1][1]) if iterations else None
+
+
+def ponder(slices, expected="e2e4"):
+    token = CancellationToken()
+    ponderer = Ponderer(SlicedBot(slices, token), slice_ms=0)
+    ponderer.ponder(chess.Board(), chess.Move.from_uci(expected), token)
+    return ponderer
+
+
+def test_deepest_iteration_is_kept():
+    ponderer = ponder([[(1, "e7e5"), (2, "e7e5"), (3, "c7c5")], [(1, "d7d5")]])
+    assert ponderer.ponder_move == chess.Move.from_uci("c7c5")
+    assert ponderer.ponder_depth == 3
+
+
+def test_deeper_slice_replaces_the_answer():
+    ponderer = ponder([[(1, "e7e5"), (2, "e7e5")], [(3, "c7c5"), (4, "e7e6")], []])
+    assert ponderer.ponder_move == chess.Move.from_uci("e7e6")
+
+
+def test_ponder_hit_answers_without_search():
+    ponderer = ponder([[(1, "e7e5"), (2, "c7c5")]])
+    board = chess.Board()
+    board.push_uci("e2e4")
+    assert ponderer.best_move(board, 100) == chess.Move.from_uci("c7c5")
+    assert (ponderer.hits, ponderer.misses) == (1, 0)
+    assert ponderer.ponder_move is None and ponderer.ponder_depth == 0
+
+
+class FixedDepthBot:
+    def __init__(self, depth, uci):
+        """
+        Bot whose searches complete the iterations up to depth, always with the same move.
+        """
+        self.depth = depth
+        self.move = chess.Move.from_uci(uci)
+        self.searches = 0
+
+    def get_best_move(self, board, time_limit_ms=None, token=None, depth=None, node_limit=None, on_iteration=None):
+        self.searches += 1
+        for iteration_depth in range(1, self.depth + 1):
+            on_iteration(iteration_depth, self.move, 0)
+        return self.move
+
+
+def test_shallow_ponder_hit_searches_again():
+    ponderer = ponder([[(1, "e7e5"), (2, "c7c5")]])
+    ponderer.search_depth = 4  # Depth of the previous normal search
+    ponderer.bot = FixedDepthBot(5, "e7e6")
+    board = chess.Board()
+    board.push_uci("e2e4")
+    assert ponderer.best_move(board, 100) == chess.Move.from_uci("e7e6")
+    assert (ponderer.hits, ponderer.misses) == (0, 1)
+    assert ponderer.search_depth == 5
+
+
+def test_shallow_ponder_hit_keeps_deeper_pondered_move():
+    ponderer = ponder([[(1, "e7e5"), (3, "c7c5")]])
+    ponderer.search_depth = 4
+    ponderer.bot = FixedDepthBot(2, "e7e6")
+    board = chess.Board()
+    board.push_uci("e2e4")
+    assert ponderer.best_move(board, 100) == chess.Move.from_uci("c7c5")
+    assert ponderer.bot.searches == 1
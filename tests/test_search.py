@@ -0,0 +1,86 @@
+import chess
+import pytest
+
+import zobrist
+from chess_bot_bds import ChessBotBDS
+from chess_bot_dfs import DRAW_SCORE, ChessBotDFS
+from chess_bot_pvs import ChessBotPVS
+from position_evaluator import PositionEvaluator
+from transposition_table import EXACT
+
+STALEMATE = "7k/5Q2/6K1/8/8/8/8/8 b - - 0 1"
+INSUFFICIENT_MATERIAL = "8/8/4k3/8/8/2NK4/8/8 b - - 0 1"
+FIFTY_MOVES = "4k3/8/8/8/8/8/4P3/R3K3 b - - 100 80"
+
+
+def node_score(bot, board, depth=2):
+    """
+    Score of a non-root node from the side to move's point of view.
+    """
+    key = zobrist.compute_hash(board)
+    if isinstance(bot, ChessBotPVS):
+        return bot.negamax(board, depth, float('-inf'), float('inf'), key, 1)
+    return bot.minimax(board, depth, float('-inf'), float('inf'), True, key, 1)
+
+
+@pytest.fixture(params=[ChessBotDFS, ChessBotPVS])
+def bot(request):
+    return request.param(2, PositionEvaluator())
+
+
+@pytest.mark.parametrize("fen", [STALEMATE, INSUFFICIENT_MATERIAL, FIFTY_MOVES])
+def test_draws_are_scored_as_draws(bot, fen):
+    assert node_score(bot, chess.Board(fen)) == DRAW_SCORE
+
+
+def test_repetition_is_detected_before_the_table(bot):
+    board = chess.Board()
+    for san in ("Nf3", "Nf6", "Ng1", "Ng8"):
+        board.push_san(san)
+    key = zobrist.compute_hash(board)
+    bot.transposition_table.store(key, 10, 5.0, EXACT, None)  # An exact score from another path
+    assert node_score(bot, board) == DRAW_SCORE
+
+
+def test_search_avoids_stalemate(bot):
+    board = chess.Board("7k/8/5QK1/8/8/8/8/8 w - - 0 1")
+    move = bot.get_best_move(board)
+    board.push(move)
+    assert board.is_checkmate()
+
+
+def test_shortest_mate_is_preferred(bot):
+    # Deeper iterations also find mates in two, whose final positions may evaluate better
+    board = chess.Board("6k1/8/6K1/8/8/8/8/R6Q w - - 0 1")
+    move, score = bot.search_root(board, 4)
+    board.push(move)
+    assert board.is_checkmate()
+    assert score == bot.mate_score - 1
+
+
+def test_bds_scores_a_proven_mate():
+    bds = ChessBotBDS(PositionEvaluator(), 2)
+    iterations = []
+    move = bds.get_best_move(chess.Board("6k1/8/6K1/8/8/8/8/R6Q w - - 0 1"), time_limit_ms=1000,
+                             on_iteration=lambda *iteration: iterations.append(iteration))
+    assert move == chess.Move.from_uci("a1a8")
+    assert iterations == [(1, move, bds.search_stats.score)]  # Deeper iterations cannot find a shorter mate
+    assert bds.search_stats.score == ChessBotDFS(1, bds.evaluator).mate_score - 1
+
+
+def test_bds_stops_deepening_at_the_node_cap():
+    bds = ChessBotBDS(PositionEvaluator(), 2, max_nodes=500)
+    iterations = []
+    bds.get_best_move(chess.Board(), time_limit_ms=5000, on_iteration=lambda *iteration: iterations.append(iteration))
+    assert bds.truncated
+    assert [depth for depth, _, _ in iterations] == [1, 2, 3]  # The third iteration reached the cap
+
+
+def test_root_entry_is_not_trusted_near_a_draw(bot):
+    board = chess.Board()
+    for san in ("Nf3", "Nf6", "Ng1", "Ng8"):
+        board.push_san(san)
+    stored = chess.Move.from_uci("a2a3")
+    bot.transposition_table.store(zobrist.compute_hash(board), 10, 5.0, EXACT, stored)
+    assert bot.search_root(chess.Board(board.fen()), 1) == (stored, 5.0)  # Same position without the history
+    assert bot.search_root(board, 1) != (stored, 5.0)
@@ -0,0 +1,66 @@
+import chess
+import pytest
+
+from see import SEE_VALUES, see, see_square
+
+# Position, move and exchange value with SEE_VALUES
+SEE_CASES = [
+    ("1k1r4/1pp4p/p7/4p3/8/P5P1/1PP4P/2K1R3 w - - 0 1", "e1e5", 1),  # Undefended pawn
+    ("1k1r3q/1ppn3p/p4b2/4p3/8/P2N2P1/1PP1R1BP/2K1Q3 w - - 0 1", "d3e5", -2),  # Knight lost for a pawn
+    ("4k3/8/2p5/3p4/4P3/8/8/4K3 w - - 0 1", "e4d5", 0),  # Pawn trade
+    ("4k3/8/4n3/8/8/8/8/4RK2 w - - 0 1", "e1e6", 3),  # Undefended knight
+    ("6k1/8/8/8/8/5q2/6P1/6K1 b - - 0 1", "f3g2", -8),  # The king recaptures
+    ("6k1/8/8/8/8/5q1b/6P1/6K1 b - - 0 1", "f3g2", 1),  # The king cannot recapture a defended queen
+    ("4k3/8/3p4/8/8/5N2/8/4K3 w - - 0 1", "f3e5", -3),  # Quiet move to a square attacked by a pawn
+]
+
+XRAY_CASES = [
+    ("3rk3/3r4/8/3n4/8/8/3R4/3RK3 w - - 0 1", "d2d5", -2),  # Doubled rooks: the x-ray of d8 wins the exchange
+    ("3rk3/8/8/3n4/8/8/3R4/3RK3 w - - 0 1", "d2d5", 3),  # The x-ray of d1 keeps the knight
+    ("4k3/8/5p2/4p3/8/8/1B6/Q3K3 w - - 0 1", "b2e5", -1.5),  # The queen behind the bishop recaptures
+    ("4k3/8/5p2/4p3/8/8/1B6/4K3 w - - 0 1", "b2e5", -2.5),  # Same exchange without the queen
+]
+
+EN_PASSANT_CASES = [
+    ("4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 1", "e5d6", 1),  # Undefended
+    ("4k3/2p5/8/3pP3/8/8/8/4K3 w - d6 0 1", "e5d6", 0),  # The c7 pawn recaptures
+    ("4k3/8/8/8/3Pp3/8/8/4K3 b - d3 0 1", "e4d3", 1),  # Black captures
+]
+
+PROMOTION_CASES = [
+    ("1r2k3/P7/8/8/8/8/8/4K3 w - - 0 1", "a7b8q", 13),  # Capture with promotion
+    ("1rk5/P7/8/8/8/8/8/4K3 w - - 0 1", "a7b8q", 4),  # The king takes the new queen
+    ("1r2k3/P7/8/8/8/8/8/4K3 w - - 0 1", "a7a8q", -1),  # Quiet promotion: the rook takes the queen
+    ("4k3/8/8/8/8/8/7p/4K1N1 b - - 0 1", "h2g1q", 11),  # Black promotes with capture
+]
+
+
+@pytest.mark.parametrize("fen, uci, expected", SEE_CASES + XRAY_CASES + EN_PASSANT_CASES + PROMOTION_CASES)
+def test_see(fen, uci, expected):
+    board = chess.Board(fen)
+    move = chess.Move.from_uci(uci)
+    assert move in board.legal_moves
+    assert see(board, move) == expected
+
+
+def test_see_leaves_board_unchanged():
+    board = chess.Board("3rk3/3r4/8/3n4/8/8/3R4/3RK3 w - - 0 1")
+    fen = board.fen()
+    see(board, chess.Move.from_uci("d2d5"))
+    assert board.fen() == fen
+
+
+def test_see_with_custom_values():
+    values = {**SEE_VALUES, chess.KNIGHT: 4}
+    board = chess.Board("1k1r3q/1ppn3p/p4b2/4p3/8/P2N2P1/1PP1R1BP/2K1Q3 w - - 0 1")
+    assert see(board, chess.Move.from_uci("d3e5"), values) == -3
+
+
+@pytest.mark.parametrize("fen, square, color, expected", [
+    ("4k3/8/8/3n4/4P3/8/8/4K3 w - - 0 1", chess.D5, chess.WHITE, 3),  # Hanging knight
+    ("4k3/8/2p5/3n4/8/8/8/3RK3 w - - 0 1", chess.D5, chess.WHITE, 0),  # Defended: the rook does not capture
+    ("4k3/8/2p5/3n4/4P3/8/8/3RK3 w - - 0 1", chess.D5, chess.WHITE, 3),  # The pawn wins a defended knight
+    ("4k3/8/8/3N4/8/8/8/4K3 w - - 0 1", chess.D5, chess.BLACK, 0),  # Not attacked
+])
+def test_see_square(fen, square, color, expected):
+    assert see_square(chess.Board(fen), square, color) == expected
@@ -0,0 +1,96 @@
+import random
+
+import chess
+import pytest
+
+from tablebase import GeneratedTable, Tablebase, TB_WIN
+
+# Longest wins with the attacker to move, in plies (mate in 10 and mate in 16)
+LONGEST_WIN = {chess.QUEEN: 19, chess.ROOK: 31}
+
+
+@pytest.fixture(scope="module", params=[chess.QUEEN, chess.ROOK], ids=["KQK", "KRK"])
+def table(request):
+    return GeneratedTable(request.param)
+
+
+def random_positions(piece_type, count, seed=0):
+    """
+    Legal positions of king and piece against king with either side to move.
+    """
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        board = chess.Board(None)
+        squares = rng.sample(chess.SQUARES, 3)
+        attacker = rng.choice(chess.COLORS)
+        board.set_piece_at(squares[0], chess.Piece(chess.KING, attacker))
+        board.set_piece_at(squares[1], chess.Piece(piece_type, attacker))
+        board.set_piece_at(squares[2], chess.Piece(chess.KING, not attacker))
+        board.turn = rng.choice(chess.COLORS)
+        if board.is_valid():
+            positions.append(board)
+    return positions
+
+
+def test_longest_win(table):
+    assert max(table.attacker_to_move) - 1 == LONGEST_WIN[table.piece_type]
+
+
+def test_distances_follow_the_legal_moves(table):
+    for board in random_positions(table.piece_type, 300):
+        wdl, distance = table.probe(board)
+        if board.is_checkmate():
+            assert (wdl, distance) == (-2, 0)
+            continue
+        results = [probe_after(table, board, move) for move in board.legal_moves]
+        if wdl == 0:
+            # No move of a drawn position wins, and the defender always has a move that keeps the draw
+            assert all(child[0] != -2 for child in results)
+            if results and not board.occupied_co[board.turn] & ~board.kings:
+                assert any(child[0] == 0 for child in results)
+        elif wdl == 2:
+            # The fastest move reaches a lost position of the opponent one ply closer to mate
+            assert min(child[1] for child in results if child[0] == -2) == distance - 1
+        else:
+            # Every move reaches a won position of the opponent, the longest one ply closer to mate
+            assert all(child[0] == 2 for child in results)
+            assert max(child[1] for child in results) == distance - 1
+
+
+def probe_after(table, board, move):
+    board.push(move)
+    try:
+        if chess.popcount(board.occupied) == 2:
+            return 0, None  # The piece was captured
+        return table.probe(board)
+    finally:
+        board.pop()
+
+
+def test_tablebase_uses_the_generated_tables():
+    tablebase = Tablebase()
+    assert tablebase.wait_for_tables(60)
+    board = chess.Board("8/8/8/8/8/2k5/8/K6Q w - - 0 1")
+    wdl, distance = tablebase.probe(board)
+    assert wdl == 2
+    assert tablebase.score(board) == TB_WIN - distance
+    board.push(tablebase.best_move(board))
+    assert tablebase.probe(board) == (-2, distance - 1)
+
+
+class MissingDTZ:
+    """
+    Syzygy tablebase with the WDL tables of every material but no DTZ tables.
+    """
+    def probe_wdl(self, board):
+        return 2
+
+    def probe_dtz(self, board):
+        raise KeyError("missing DTZ table")
+
+
+def test_missing_dtz_table_keeps_the_wdl_result():
+    tablebase = Tablebase()
+    tablebase.syzygy = MissingDTZ()
+    assert tablebase.probe(chess.Board("8/8/8/8/8/2k5/8/K6Q w - - 0 1")) == (2, None)
@@ -0,0 +1,97 @@
+import io
+
+import chess
+import pytest
+
+from tablebase import TB_WIN
+from uci import ENGINES, UCIEngine, parse_go, score_string
+
+# Positions where the side to move mates in one
+MATE_IN_ONE = [
+    "6k1/5ppp/8/8/8/8/5PPP/R5K1 w - - 0 1",
+    "6k1/8/6K1/8/8/8/8/R6Q w - - 0 1",
+]
+
+
+def run(commands):
+    """
+    Sends the commands to a new engine and waits for its search.
+
+    :return: Lines written by the engine.
+    """
+    output = io.StringIO()
+    engine = UCIEngine(output)
+    for command in commands:
+        engine.handle(command)
+    if engine.search_thread is not None:
+        engine.search_thread.join(60)
+        assert not engine.search_thread.is_alive()
+    engine.handle("quit")
+    return output.getvalue().splitlines()
+
+
+def best_move(lines):
+    moves = [line.split()[1] for line in lines if line.startswith("bestmove")]
+    assert len(moves) == 1
+    return chess.Move.from_uci(moves[0])
+
+
+def test_handshake():
+    lines = run(["uci", "isready"])
+    assert lines[0].startswith("id name")
+    assert "uciok" in lines and lines[-1] == "readyok"
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("fen", MATE_IN_ONE)
+@pytest.mark.parametrize("limit", ["depth 2", "movetime 300"])
+def test_go_finds_mate_in_one(engine, fen, limit):
+    lines = run(["setoption name OwnBook value false", f"setoption name Engine value {engine}",
+                 f"position fen {fen}", f"go {limit}"])
+    board = chess.Board(fen)
+    move = best_move(lines)
+    assert move in board.legal_moves
+    board.push(move)
+    assert board.is_checkmate()
+    assert not any(line.startswith("info string search failed") for line in lines)
+
+
+def test_go_after_moves():
+    lines = run(["setoption name OwnBook value false", "position startpos moves e2e4 e7e5", "go depth 1"])
+    board = chess.Board()
+    board.push_uci("e2e4")
+    board.push_uci("e7e5")
+    assert best_move(lines) in board.legal_moves
+    assert any(line.startswith("info depth 1 ") for line in lines)
+
+
+def test_invalid_position_is_ignored():
+    engine = UCIEngine(io.StringIO())
+    engine.handle("position startpos moves e2e4")
+    engine.handle("position startpos moves e2e4 e2e4")
+    engine.handle("position fen not-a-fen")
+    assert engine.board.move_stack == [chess.Move.from_uci("e2e4")]
+    assert engine.output.getvalue().count("info string invalid position ignored") == 2
+
+
+def test_score_string():
+    board = chess.Board("6k1/5ppp/8/8/8/8/5PPP/R5K1 w - - 0 1")
+    assert score_string(None, board, [], 1, 1) is None
+    assert score_string(1.5, board, [], 1, 100) == "cp 150"
+    assert score_string(50000, board, [chess.Move.from_uci("a1a8")], 1, 1) == "mate 1"
+    assert score_string(TB_WIN - 30, board, [], 1, 1) == f"cp {TB_WIN - 30}"
+
+
+def test_parse_go():
+    assert parse_go("wtime 1000 btime 2000 winc 10 movestogo 5".split()) == \
+        {"wtime": 1000, "btime": 2000, "winc": 10, "movestogo": 5}
+    assert parse_go(["infinite"]) == {"infinite": True}
+
+
+def test_threads_only_applies_to_dfs():
+    engine = UCIEngine(io.StringIO())
+    engine.handle("setoption name Threads value 2")
+    assert engine.workers() == 1
+    assert "info string Threads only applies to Engine dfs" in engine.output.getvalue()
+    engine.handle("setoption name Engine value dfs")
+    assert engine.workers() == 2
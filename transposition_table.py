@@ -0,0 +1,132 @@
+# Bound flags of stored scores
+EXACT = 0  # The score is the exact value of the position
+LOWER = 1  # The search failed high, the real value is at least the score
+UPPER = 2  # The search failed low, the real value is at most the score
+
+
+class TranspositionTable:
+    # Approximate size of one slot in bytes (list pointer, entry tuple, key, score and move objects)
+    ENTRY_SIZE = 256
+
+    def __init__(self, size_mb=16, persistent=None):
+        """
+        Fixed-capacity transposition table keyed by 64-bit Zobrist keys.
+
+        Every bucket has two slots: a depth-preferred slot that keeps the deepest entry
+        of the current search and an always-replace slot for the most recent entry.
+        Scores are stored from the point of view of the side to move.
+
+        :param size_mb: Memory budget of the table in megabytes.
+        :param persistent: Optional PersistentCache used as a second level for deep results.
+        """
+        self.size_mb = size_mb
+        self.persistent = persistent
+        self.num_buckets = max(1, int(size_mb * 1024 * 1024) // (2 * self.ENTRY_SIZE))
+        self.depth_slots = [None] * self.num_buckets  # Entries: (key, depth, score, flag, move, generation)
+        self.recent_slots = [None] * self.num_buckets
+        self.generation = 0  # Search counter used to age out entries of old searches
+        self.reset_stats()
+
+    def reset_stats(self):
+        """
+        Resets the probe statistics.
+        """
+        self.probes = 0
+        self.hits = 0
+        self.cutoffs = 0
+        self.stores = 0
+
+    def new_search(self):
+        """
+        Marks the start of a new search, so entries of older searches become replaceable.
+        """
+        self.generation += 1
+        self.reset_stats()
+
+    def clear(self):
+        """
+        Removes all entries from the table.
+        """
+        self.depth_slots = [None] * self.num_buckets
+        self.recent_slots = [None] * self.num_buckets
+
+    def peek(self, key):
+        """
+        Looks up a position in memory without counting the probe (for reporting, e.g. the principal variation).
+
+        :return: Entry tuple (key, depth, score, flag, move, generation) or None.
+        """
+        index = key % self.num_buckets
+        entry = self.depth_slots[index]
+        if entry is None or entry[0] != key:
+            entry = self.recent_slots[index]
+            if entry is not None and entry[0] != key:
+                entry = None
+        return entry
+
+    def probe(self, key, depth=0, ply=0):
+        """
+        Looks up a position.
+
+        :param key: Zobrist key of the position.
+        :param depth: Remaining depth of the node; the persistent cache is only consulted for deep nodes.
+        :param ply: Distance of the node from the root; the persistent cache is only consulted near the root.
+        :return: Entry tuple (key, depth, score, flag, move, generation) or None.
+        """
+        self.probes += 1
+        index = key % self.num_buckets
+        entry = self.peek(key)
+
+        # Deeper results of earlier sessions are looked up in the persistent cache
+        if (self.persistent is not None and depth >= self.persistent.min_depth and ply <= self.persistent.max_ply
+                and (entry is None or entry[1] < depth)):
+            stored = self.persistent.probe(key)
+            if stored is not None and (entry is None or stored[0] > entry[1]):
+                entry = (key,) + stored + (self.generation,)
+                self.depth_slots[index] = entry
+
+        if entry is not None:
+            self.hits += 1
+        return entry
+
+    def store(self, key, depth, score, flag, move):
+        """
+        Stores a search result using the depth-preferred / always-replace scheme.
+
+        :param key: Zobrist key of the position.
+        :param depth: Remaining search depth of the result.
+        :param score: Score from the point of view of the side to move.
+        :param flag: EXACT, LOWER or UPPER.
+        :param move: Best move found in the position (or None).
+        """
+        self.stores += 1
+        if self.persistent is not None:
+            self.persistent.store(key, depth, score, flag, move)
+        index = key % self.num_buckets
+        entry = (key, depth, score, flag, move, self.generation)
+
+        deep = self.depth_slots[index]
+        if deep is None or deep[0] == key or depth >= deep[1] or deep[5] != self.generation:
+            if deep is not None and deep[0] != key:
+                self.recent_slots[index] = deep  # The displaced entry is still worth keeping
+            self.depth_slots[index] = entry
+        else:
+            self.recent_slots[index] = entry
+
+    def record_cutoff(self):
+        """
+        Counts a probe whose stored bound was enough to cut off the search of a node.
+        """
+        self.cutoffs += 1
+
+    def hit_rate(self):
+        """
+        Share of probes that found the position in the table.
+        """
+        return self.hits / self.probes if self.probes else 0.0
+
+    def cutoff_rate(self):
+        """
+        Share of probes that ended the search of the node without expanding it.
+        """
+        return self.cutoffs / self.probes if self.probes else 0.0
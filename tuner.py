@@ -0,0 +1,250 @@
+import argparse
+import logging
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import chess
+import chess.pgn
+import numpy as np
+
+from position_evaluator import FEATURE_NAMES, VALUED_PIECE_TYPES, WEIGHTS_FILE, PositionEvaluator, save_weights
+
+logger = logging.getLogger(__name__)
+
+# Game results as the score of white
+RESULTS = {"1-0": 1.0, "0-1": 0.0, "1/2-1/2": 0.5}
+# Result at the end of an EPD line: a c9 "1-0" operation or a bracketed [1.0] / [0.5] / [0.0] label
+EPD_RESULT = re.compile(r'(?:c9\s+"(1-0|0-1|1/2-1/2)"\s*;?|\[(1\.0|0\.5|0\.0|1-0|0-1|1/2-1/2)\])\s*$')
+
+# Tuned parameters: piece values (the pawn is the unit and stays fixed) and term weights. The king safety weight
+# only matters for checkmates and is not tuned.
+TUNED_PIECE_TYPES = VALUED_PIECE_TYPES[1:]
+TUNED_WEIGHTS = ("material", "center", "pawns", "activity", "threats", "hanging")
+
+MATERIAL_COLUMNS = slice(0, 5)
+THREAT_COLUMNS = slice(9, 14)
+
+# Evaluator used for the feature extraction in the current (worker) process
+_evaluator = None
+
+
+def read_epd(path):
+    """
+    Labelled positions of an EPD file: every line ends with a c9 "1-0" operation or a [1.0] label.
+
+    :return: Generator of (FEN, score of white).
+    """
+    with open(path, encoding="utf-8") as epd:
+        for line_number, line in enumerate(epd, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            match = EPD_RESULT.search(line)
+            if match is None:
+                logger.warning("%s:%d: no result, line skipped", path, line_number)
+                continue
+            label = match.group(1) or match.group(2)
+            board = chess.Board()
+            board.set_epd(line[:match.start()].strip().rstrip(";"))
+            yield board.fen(), RESULTS[label] if label in RESULTS else float(label)
+
+
+def read_pgn(path, min_ply=8):
+    """
+    Positions of the main lines of decided and drawn games of a PGN file, labelled with the game result.
+
+    :param min_ply: Opening plies of every game that are skipped.
+    :return: Generator of (FEN, score of white).
+    """
+    with open(path, encoding="utf-8", errors="replace") as pgn:
+        while (game := chess.pgn.read_game(pgn)) is not None:
+            result = RESULTS.get(game.headers.get("Result"))
+            if result is None:
+                continue
+            board = game.board()
+            for ply, move in enumerate(game.mainline_moves(), 1):
+                board.push(move)
+                if ply >= min_ply:
+                    yield board.fen(), result
+
+
+def read_dataset(path, min_ply=8):
+    """
+    Labelled positions of a .pgn or .epd file.
+    """
+    return read_pgn(path, min_ply) if path.lower().endswith(".pgn") else read_epd(path)
+
+
+def _init_worker():
+    global _evaluator
+    _evaluator = PositionEvaluator()
+
+
+def _extract(fen):
+    return _evaluator.features(chess.Board(fen))
+
+
+def extract_features(path, cache_path=None, workers=1, min_ply=8):
+    """
+    Feature matrix of a dataset, computed once with PositionEvaluator.features and cached next to the dataset
+    (the cache is rebuilt when the dataset is newer or the features have changed).
+
+    :return: (features as an (N, len(FEATURE_NAMES)) array, scores of white as an (N,) array)
+    """
+    cache_path = cache_path or path + ".features.npz"
+    if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(path):
+        with np.load(cache_path) as cache:
+            if list(cache["names"]) == FEATURE_NAMES:
+                logger.info("Features loaded from %s", cache_path)
+                return cache["features"], cache["results"]
+
+    start = time.perf_counter()
+    fens, results = [], []
+    for fen, result in read_dataset(path, min_ply):
+        fens.append(fen)
+        results.append(result)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        features = np.array(list(executor.map(_extract, fens, chunksize=1000)), dtype=np.float64)
+    features = features.reshape(-1, len(FEATURE_NAMES))
+    results = np.array(results, dtype=np.float64)
+    logger.info("Features of %d positions extracted in %.1f s", len(fens), time.perf_counter() - start)
+
+    np.savez(cache_path, features=features, results=results, names=np.array(FEATURE_NAMES))
+    return features, results
+
+
+def initial_parameters(evaluator):
+    """
+    Parameter vector of the evaluator: the tuned piece values followed by the tuned weights.
+    """
+    return np.array([evaluator.piece_values[piece_type] for piece_type in TUNED_PIECE_TYPES]
+                    + [evaluator.weights[name] for name in TUNED_WEIGHTS], dtype=np.float64)
+
+
+def coefficients(parameters, evaluator):
+    """
+    Feature coefficients (see PositionEvaluator.feature_coefficients) of a parameter vector and their Jacobian.
+
+    :return: (coefficients as a (features,) array, Jacobian as a (features, parameters) array)
+    """
+    values = np.concatenate(([evaluator.piece_values[chess.PAWN]], parameters[:len(TUNED_PIECE_TYPES)]))
+    material, center, pawns, activity, threats, hanging = parameters[len(TUNED_PIECE_TYPES):]
+    king_safety = evaluator.weights["king_safety"]
+    coefficient = np.concatenate((values * material, [center, pawns, king_safety, activity], values * threats,
+                                  [hanging]))
+
+    jacobian = np.zeros((len(FEATURE_NAMES), len(parameters)))
+    weight_column = {name: len(TUNED_PIECE_TYPES) + index for index, name in enumerate(TUNED_WEIGHTS)}
+    for index in range(len(TUNED_PIECE_TYPES)):  # Values of the knight, bishop, rook and queen
+        jacobian[1 + index, index] = material
+        jacobian[THREAT_COLUMNS.start + 1 + index, index] = threats
+    jacobian[MATERIAL_COLUMNS, weight_column["material"]] = values
+    jacobian[THREAT_COLUMNS, weight_column["threats"]] = values
+    for name in ("center", "pawns", "activity", "hanging"):
+        jacobian[FEATURE_NAMES.index(name), weight_column[name]] = 1
+    return coefficient, jacobian
+
+
+def win_probability(features, coefficient, scale):
+    """
+    Expected score of white: a logistic function of the evaluation (the features are from black's point of view).
+    """
+    return 1 / (1 + np.exp(np.clip(scale * (features @ coefficient), -500, 500)))
+
+
+def mean_squared_error(features, results, coefficient, scale):
+    return float(np.mean((results - win_probability(features, coefficient, scale)) ** 2))
+
+
+def fit_scale(features, results, coefficient):
+    """
+    Scale of the logistic function that best fits the results with the given coefficients.
+    """
+    scales = np.logspace(-3, 1, 81)
+    errors = [mean_squared_error(features, results, coefficient, scale) for scale in scales]
+    best = int(np.argmin(errors))
+    # Refine between the neighbours of the best grid point with a golden-section search
+    low, high = scales[max(best - 1, 0)], scales[min(best + 1, len(scales) - 1)]
+    ratio = (5 ** 0.5 - 1) / 2
+    for _ in range(40):
+        left, right = high - ratio * (high - low), low + ratio * (high - low)
+        if mean_squared_error(features, results, coefficient, left) < \
+                mean_squared_error(features, results, coefficient, right):
+            high = right
+        else:
+            low = left
+    return (low + high) / 2
+
+
+def tune(features, results, evaluator, epochs=1000, learning_rate=0.05):
+    """
+    Texel tuning: minimizes the squared error between the game results and the win probabilities predicted
+    from the evaluation, with full-batch Adam gradient descent over the feature matrix.
+
+    :return: (tuned parameter vector, logistic scale, error before, error after)
+    """
+    parameters = initial_parameters(evaluator)
+    scale = fit_scale(features, results, coefficients(parameters, evaluator)[0])
+    initial_error = mean_squared_error(features, results, coefficients(parameters, evaluator)[0], scale)
+
+    first_moment = np.zeros_like(parameters)
+    second_moment = np.zeros_like(parameters)
+    beta1, beta2, epsilon = 0.9, 0.999, 1e-8
+    for epoch in range(1, epochs + 1):
+        coefficient, jacobian = coefficients(parameters, evaluator)
+        probability = win_probability(features, coefficient, scale)
+        # d error / d evaluation of every position; the probability falls as the evaluation for black rises
+        gradient_scores = 2 * (results - probability) * probability * (1 - probability) * scale / len(results)
+        gradient = jacobian.T @ (features.T @ gradient_scores)
+
+        first_moment = beta1 * first_moment + (1 - beta1) * gradient
+        second_moment = beta2 * second_moment + (1 - beta2) * gradient ** 2
+        step = first_moment / (1 - beta1 ** epoch) / (np.sqrt(second_moment / (1 - beta2 ** epoch)) + epsilon)
+        parameters -= learning_rate * step
+        if epoch % 100 == 0:
+            logger.info("Epoch %d: error %.6f", epoch, mean_squared_error(features, results, coefficient, scale))
+
+    final_error = mean_squared_error(features, results, coefficients(parameters, evaluator)[0], scale)
+    return parameters, scale, initial_error, final_error
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tunes the evaluation weights on positions labelled with results")
+    parser.add_argument("dataset", help="EPD file with c9 \"1-0\" or [1.0] labels, or PGN file of finished games")
+    parser.add_argument("-o", "--output", default=WEIGHTS_FILE, help="weights file written")
+    parser.add_argument("--weights", default=None, help="weights file the tuning starts from")
+    parser.add_argument("--cache", default=None, help="feature cache file (dataset.features.npz by default)")
+    parser.add_argument("--epochs", type=int, default=1000, help="gradient descent iterations")
+    parser.add_argument("--learning-rate", type=float, default=0.05, help="Adam step size")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="feature extraction processes")
+    parser.add_argument("--min-ply", type=int, default=8, help="opening plies of every PGN game that are skipped")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+
+    evaluator = PositionEvaluator(weights_file=args.weights)
+    features, results = extract_features(args.dataset, args.cache, args.workers, args.min_ply)
+    start = time.perf_counter()
+    parameters, scale, initial_error, final_error = tune(features, results, evaluator, args.epochs,
+                                                        args.learning_rate)
+    logger.info("Tuned in %.1f s: error %.6f -> %.6f", time.perf_counter() - start, initial_error, final_error)
+
+    piece_values = dict(evaluator.piece_values)
+    for piece_type, value in zip(TUNED_PIECE_TYPES, parameters):
+        piece_values[piece_type] = round(float(value), 4)
+    weights = dict(evaluator.weights)
+    for name, value in zip(TUNED_WEIGHTS, parameters[len(TUNED_PIECE_TYPES):]):
+        weights[name] = round(float(value), 4)
+    save_weights(args.output, piece_values, weights,
+                 tuning={"dataset": os.path.basename(args.dataset), "positions": len(results),
+                         "scale": round(scale, 6), "error_before": round(initial_error, 6),
+                         "error_after": round(final_error, 6)})
+    for name, (before, after) in zip(["value_" + chess.piece_name(piece_type) for piece_type in TUNED_PIECE_TYPES]
+                                     + list(TUNED_WEIGHTS), zip(initial_parameters(evaluator), parameters)):
+        print(f"{name:<14}{before:>8.3f} -> {after:.3f}")
+    print(f"Weights written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+import logging
+import os
+import sys
+import threading
+import time
+
+import chess
+
+import zobrist
+from chess_bot_controller import ChessBotController
+from constants import OPENING_BOOK_PATH, SYZYGY_PATH
+from iterative_deepening import MAX_DEPTH, CancellationToken
+from tablebase import TB_WIN
+from telemetry import searched_nodes
+
+logger = logging.getLogger(__name__)
+
+ENGINE_NAME = "Chess-Bot-AI"
+ENGINE_AUTHOR = "Chess-Bot-AI contributors"
+ENGINES = ("auto", "dfs", "pvs", "bfs", "bds")
+MOVES_TO_GO = 30  # Assumed number of moves until the next time control when the GUI does not send movestogo
+MOVE_OVERHEAD_MS = 50  # Time kept in reserve for the communication with the GUI
+MIN_MOVE_TIME_MS = 10
+
+
+def parse_go(tokens):
+    """
+    Parameters of a "go" command.
+
+    :param tokens: Words of the command after "go".
+    :return: Dictionary of the numeric parameters and the flags "infinite" and "ponder".
+    """
+    params = {}
+    index = 0
+    while index < len(tokens):
+        name = tokens[index]
+        if name in ("infinite", "ponder"):
+            params[name] = True
+        elif name == "searchmoves":
+            break  # Not supported; the moves up to the end of the line are ignored
+        elif index + 1 < len(tokens):
+            try:
+                params[name] = int(tokens[index + 1])
+            except ValueError:
+                pass
+            index += 1
+        index += 1
+    return params
+
+
+def time_budget(params, turn):
+    """
+    Time to spend on the move in milliseconds.
+
+    :return: The budget, or None if the search is not limited by time.
+    """
+    if "movetime" in params:
+        return params["movetime"]
+    time_left = params.get("wtime" if turn == chess.WHITE else "btime")
+    if time_left is None:
+        return None
+    increment = params.get("winc" if turn == chess.WHITE else "binc", 0)
+    budget = time_left / (params.get("movestogo") or MOVES_TO_GO) + increment * 3 // 4
+    return max(MIN_MOVE_TIME_MS, min(budget, time_left - MOVE_OVERHEAD_MS))
+
+
+def score_string(score, board, pv, depth, centipawns_per_unit):
+    """
+    Score of an iteration in UCI notation. The engines do not track the distance to mate: it is taken from
+    the principal variation if it ends in checkmate, otherwise the mate is reported within the iteration depth.
+    Tablebase wins (at most TB_WIN) are reported in centipawns, as Syzygy distances count plies to a zeroing
+    move rather than to mate.
+
+    :return: The score, or None if the engine gave no score for the iteration.
+    """
+    if score is None:
+        return None
+    if abs(score) > TB_WIN:
+        board = board.copy(stack=False)
+        for move in pv:
+            board.push(move)
+        plies = len(pv) if board.is_checkmate() else depth
+        mate = (plies + 1) // 2
+        return f"mate {mate if score > 0 else -mate}"
+    return f"cp {round(score * centipawns_per_unit)}"
+
+
+def principal_variation(bot, board, move, depth):
+    """
+    Follows the best moves stored in the transposition table of the bot after the root move.
+    """
+    pv = [move]
+    table = getattr(bot, "transposition_table", None)
+    if table is None:
+        return pv
+    board = board.copy(stack=False)
+    key = zobrist.push_move(board, move, zobrist.compute_hash(board))
+    seen = {key}
+    while len(pv) < depth:
+        entry = table.peek(key)
+        if entry is None or entry[4] is None or not board.is_legal(entry[4]):
+            break
+        key = zobrist.push_move(board, entry[4], key)
+        if key in seen:
+            break  # Repetition
+        seen.add(key)
+        pv.append(entry[4])
+    return pv
+
+
+class UCIEngine:
+    def __init__(self, output=None):
+        """
+        Universal Chess Interface front-end of ChessBotController for tournament managers and chess GUIs.
+        Commands are read on the calling thread while the search runs on a worker thread, so "stop" and
+        "ponderhit" are handled at once.
+
+        :param output: Stream of the protocol messages (sys.stdout by default).
+        """
+        self.output = output or sys.stdout
+        self.output_lock = threading.Lock()
+        self.options = {"Hash": 16, "Threads": 1, "Engine": "pvs", "OwnBook": True, "SyzygyPath": SYZYGY_PATH}
+        self.controller = None  # Created on first use and again after an option that requires it
+        self.board = chess.Board()
+        self.search_thread = None
+        self.token = None
+        self.ponder_timer = None  # Starts the clock of a pondering search after "ponderhit"
+        self.ponder_budget = None
+
+    def send(self, line):
+        with self.output_lock:
+            self.output.write(line + "\n")
+            self.output.flush()
+
+    def get_controller(self):
+        if self.controller is None:
+            self.controller = ChessBotController(dfs_depth=4, bfs_depth=3, bds_depth=2,
+                                                 tt_size_mb=self.options["Hash"],
+                                                 workers=self.workers(), engine=self.options["Engine"],
+                                                 book_path=OPENING_BOOK_PATH if self.options["OwnBook"] else None,
+                                                 syzygy_dir=self.options["SyzygyPath"])
+        return self.controller
+
+    def workers(self):
+        """
+        Number of search processes. Only the dfs engine has a parallel (root-split) search, so Threads is
+        ignored with the other engines and in auto mode.
+        """
+        return self.options["Threads"] if self.options["Engine"] == "dfs" else 1
+
+    def reset_controller(self):
+        if self.controller is not None:
+            self.controller.close()
+            self.controller = None
+
+    def handle(self, line):
+        """
+        Executes one command.
+
+        :return: False after "quit", True otherwise.
+        """
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, args = tokens[0], tokens[1:]
+
+        if command == "uci":
+            self.send(f"id name {ENGINE_NAME}")
+            self.send(f"id author {ENGINE_AUTHOR}")
+            self.send("option name Hash type spin default 16 min 1 max 4096")
+            self.send(f"option name Threads type spin default 1 min 1 max {os.cpu_count() or 1}")
+            self.send("option name Engine type combo default pvs " + " ".join(f"var {name}" for name in ENGINES))
+            self.send("option name OwnBook type check default true")
+            self.send(f"option name SyzygyPath type string default {SYZYGY_PATH}")
+            self.send("option name Ponder type check default false")
+            self.send("uciok")
+        elif command == "isready":
+            self.get_controller()
+            self.send("readyok")
+        elif command == "setoption":
+            self.set_option(args)
+        elif command == "ucinewgame":
+            self.stop()
+            self.reset_controller()  # Forget the transposition tables of the previous game
+            self.board = chess.Board()
+        elif command == "position":
+            self.stop()
+            self.set_position(args)
+        elif command == "go":
+            self.stop()
+            self.go(parse_go(args))
+        elif command == "stop":
+            self.stop()
+        elif command == "ponderhit":
+            self.ponder_hit()
+        elif command == "quit":
+            self.stop()
+            self.reset_controller()
+            return False
+        return True
+
+    def set_option(self, args):
+        """
+        setoption name <name> [value <value>]
+        """
+        if "name" not in args:
+            return
+        value_index = args.index("value") if "value" in args else len(args)
+        name = " ".join(args[args.index("name") + 1:value_index])
+        value = " ".join(args[value_index + 1:])
+        if name == "Hash":
+            self.options["Hash"] = max(1, int(value))
+        elif name == "Threads":
+            self.options["Threads"] = max(1, int(value))
+        elif name == "Engine" and value in ENGINES:
+            self.options["Engine"] = value
+        elif name == "OwnBook":
+            self.options["OwnBook"] = value.lower() == "true"
+        elif name == "SyzygyPath":
+            self.options["SyzygyPath"] = value or None
+        else:
+            return  # Unknown options (e.g. Ponder) need no change of the engine
+        if name in ("Threads", "Engine") and self.options["Threads"] > 1 and self.options["Engine"] != "dfs":
+            self.send("info string Threads only applies to Engine dfs")
+        self.stop()
+        self.reset_controller()
+
+    def set_position(self, args):
+        """
+        position [startpos | fen <fen>] [moves <move> ...]
+        """
+        moves_index = args.index("moves") if "moves" in args else len(args)
+        try:
+            if args and args[0] == "fen":
+                board = chess.Board(" ".join(args[1:moves_index]))
+            else:
+                board = chess.Board()
+            for uci in args[moves_index + 1:]:
+                board.push_uci(uci)
+        except ValueError as error:  # Invalid FEN, or an invalid or illegal move
+            self.send(f"info string invalid position ignored: {error}")
+            return
+        self.board = board
+
+    def go(self, params):
+        board = self.board.copy()
+        budget = time_budget(params, board.turn)
+        depth = params.get("depth")
+        node_limit = params.get("nodes")
+        if params.get("infinite") or params.get("ponder"):
+            # The time is not limited until "stop", or until the budget runs out after "ponderhit"
+            self.ponder_budget = budget if params.get("ponder") else None
+            budget = None
+            depth = depth or MAX_DEPTH
+        self.token = CancellationToken()
+        self.search_thread = threading.Thread(target=self.search, daemon=True,
+                                              args=(board, budget, depth, node_limit, self.token,
+                                                    bool(params.get("infinite") or params.get("ponder"))))
+        self.search_thread.start()
+
+    def search(self, board, time_limit_ms, depth, node_limit, token, wait_for_stop):
+        """
+        Runs the search and reports its iterations and result (worker thread). A "bestmove" is sent even if
+        the search fails, as the GUI waits for it.
+
+        :param wait_for_stop: The best move of an infinite or pondering search must not be sent before "stop"
+            (or before the clock started by "ponderhit" runs out).
+        """
+        try:
+            move = self.run_search(board.copy(), time_limit_ms, depth, node_limit, token)
+        except Exception as error:
+            logger.exception("Search failed")
+            self.send(f"info string search failed: {error}")
+            move = None
+        if move is None:
+            move = next(iter(board.legal_moves), None)
+        while wait_for_stop and not token.cancelled:
+            time.sleep(0.01)
+        self.send(f"bestmove {move.uci() if move is not None else '0000'}")
+
+    def run_search(self, board, time_limit_ms, depth, node_limit, token):
+        """
+        Searches the position, sending an "info" line after every iteration.
+
+        :return: The best move, or None if the search found none.
+        """
+        controller = self.get_controller()
+        bot = controller.choose_bot(board)
+        start = time.perf_counter()
+        centipawns_per_unit = 100 / controller.position_evaluator.material_weight
+
+        def on_iteration(iteration_depth, move, score):
+            elapsed = max(time.perf_counter() - start, 1e-6)
+            nodes = searched_nodes(bot)
+            pv = principal_variation(bot, board, move, iteration_depth)
+            score = score_string(score, board, pv, iteration_depth, centipawns_per_unit)
+            score = f" score {score}" if score is not None else ""
+            self.send(f"info depth {iteration_depth}{score} nodes {nodes} nps {int(nodes / elapsed)} "
+                      f"time {int(elapsed * 1000)} pv {' '.join(pv_move.uci() for pv_move in pv)}")
+
+        return controller.get_best_move(board, time_limit_ms, token, depth, node_limit, on_iteration)
+
+    def ponder_hit(self):
+        """
+        The expected move was played: the pondering search continues with the time of the move.
+        """
+        if self.search_thread is None or self.token is None:
+            return
+        if self.ponder_budget is not None:
+            self.ponder_timer = threading.Timer(self.ponder_budget / 1000, self.token.cancel)
+            self.ponder_timer.daemon = True
+            self.ponder_timer.start()
+
+    def stop(self):
+        """
+        Stops the running search and waits for its "bestmove".
+        """
+        if self.ponder_timer is not None:
+            self.ponder_timer.cancel()
+            self.ponder_timer = None
+        if self.search_thread is not None:
+            self.token.cancel()
+            self.search_thread.join()
+            self.search_thread = None
+
+    def loop(self, input_stream=None):
+        """
+        Reads commands until "quit" or the end of the input.
+        """
+        for line in input_stream or sys.stdin:
+            if not self.handle(line):
+                break
+        else:
+            self.stop()
+            self.reset_controller()
+
+
+def main():
+    # Debug output of the bots goes to stderr, stdout is reserved for the protocol
+    engine = UCIEngine(sys.stdout)
+    sys.stdout = sys.stderr
+    engine.loop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import chess
+import chess.polyglot
+
+
+# The Polyglot key layout is used so that the incremental keys match chess.polyglot.zobrist_hash
+_RANDOM = chess.polyglot.POLYGLOT_RANDOM_ARRAY
+_HASHER = chess.polyglot.ZobristHasher(_RANDOM)
+
+# PIECE_KEYS[color][piece_type][square]
+PIECE_KEYS = [
+    [[0] * 64] + [[_RANDOM[64 * (2 * (piece_type - 1) + color) + square] for square in chess.SQUARES]
+                  for piece_type in chess.PIECE_TYPES]
+    for color in (chess.BLACK, chess.WHITE)
+]
+TURN_KEY = _RANDOM[780]
+
+
+def compute_hash(board):
+    """
+    Computes the 64-bit Zobrist key of a position from scratch.
+
+    :param board: chess.Board object.
+    :return: Zobrist key (identical to chess.polyglot.zobrist_hash).
+    """
+    return _HASHER(board)
+
+
+def _state_key(board):
+    """
+    Part of the key that depends on castling rights and the en passant square.
+    """
+    return _HASHER.hash_castling(board) ^ _HASHER.hash_ep_square(board)
+
+
+def push_move(board, move, key):
+    """
+    Pushes a move onto the board and updates the Zobrist key incrementally.
+
+    :param board: chess.Board object (modified in place).
+    :param move: Move to make (chess.Move.null() is supported).
+    :param key: Zobrist key of the position before the move.
+    :return: Zobrist key of the position after the move.
+    """
+    key ^= _state_key(board)
+
+    if move:
+        us = board.turn
+        our_keys = PIECE_KEYS[us]
+        from_square = move.from_square
+        to_square = move.to_square
+        piece_type = board.piece_type_at(from_square)
+
+        if board.is_castling(move):
+            # The rook either stands on the target square (king takes rook notation) or in the corner
+            back_rank = from_square & 56
+            kingside = board.is_kingside_castling(move)
+            if board.piece_type_at(to_square) == chess.ROOK:
+                rook_from = to_square
+            else:
+                rook_from = back_rank + (7 if kingside else 0)
+            key ^= our_keys[chess.KING][from_square] ^ our_keys[chess.KING][back_rank + (6 if kingside else 2)]
+            key ^= our_keys[chess.ROOK][rook_from] ^ our_keys[chess.ROOK][back_rank + (5 if kingside else 3)]
+        else:
+            if board.is_en_passant(move):
+                captured_square = to_square - 8 if us == chess.WHITE else to_square + 8
+                key ^= PIECE_KEYS[not us][chess.PAWN][captured_square]
+            else:
+                captured_type = board.piece_type_at(to_square)
+                if captured_type:
+                    key ^= PIECE_KEYS[not us][captured_type][to_square]
+            key ^= our_keys[piece_type][from_square] ^ our_keys[move.promotion or piece_type][to_square]
+
+    board.push(move)
+    return key ^ _state_key(board) ^ TURN_KEY